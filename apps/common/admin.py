@@ -1,3 +1,22 @@
 from django.contrib import admin
+from .models import ReportJob
 
-# Register your models here.
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'report', 'company', 'requested_by', 'status', 'progress',
+        'created_at', 'finished_at', 'expires_at'
+    )
+    list_filter = ('status', 'report', 'company')
+    readonly_fields = (
+        'status', 'progress', 'cancel_requested', 'result', 'content_type',
+        'error', 'worker', 'started_at', 'finished_at', 'expires_at'
+    )
+    ordering = ('-created_at',)
+    actions = ('cancel_jobs',)
+
+    @admin.action(description="Cancel selected report jobs")
+    def cancel_jobs(self, request, queryset):
+        for job in queryset:
+            job.request_cancel()
@@ -0,0 +1,233 @@
+import contextvars
+import datetime
+import os
+import socket
+import tempfile
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.common.models import ReportJob
+from apps.core.context import company_context
+
+
+# =========================================================
+# Registry
+# =========================================================
+
+# `func(company, **params)` returns the result as bytes or an iterable
+# of bytes chunks. Params are the JSON values given at submission.
+Report = namedtuple('Report', 'name func extension content_type permission ttl')
+
+_reports = {}
+
+
+def register_report(name, extension, content_type, permission=None, ttl=None):
+    """
+    Decorator registering a report function that can be submitted as a
+    ReportJob. Users need `permission` to submit it; `ttl` (seconds)
+    overrides settings.REPORT_RESULT_TTL.
+    """
+    def decorator(func):
+        _reports[name] = Report(name, func, extension, content_type, permission, ttl)
+        return func
+    return decorator
+
+
+def get_report(name):
+    try:
+        return _reports[name]
+    except KeyError:
+        raise ValidationError(f"Unknown report {name}.")
+
+
+def registered_reports():
+    return sorted(_reports)
+
+
+def submit_report(name, company, params=None, user=None):
+    """
+    Queue a report for the worker; `params` is the dict of keyword
+    arguments passed to the report function. Returns the ReportJob.
+    """
+    get_report(name)
+    return ReportJob.objects.create(
+        company=company,
+        requested_by=user,
+        report=name,
+        params=params or {}
+    )
+
+
+# =========================================================
+# Progress and cancellation
+# =========================================================
+
+class JobCancelled(Exception):
+    pass
+
+
+class _Progress:
+    """
+    Progress of the running job; writes and cancellation checks are
+    throttled to one query per `interval` seconds.
+    """
+
+    def __init__(self, job_id, interval=1.0):
+        self.job_id = job_id
+        self.interval = interval
+        self.last_write = 0
+
+    def report(self, percent):
+        now = time.monotonic()
+        if now - self.last_write < self.interval:
+            return
+        self.last_write = now
+
+        ReportJob.objects.filter(pk=self.job_id).update(
+            progress=max(0, min(100, int(percent))),
+            updated_at=timezone.now()
+        )
+        if ReportJob.objects.filter(pk=self.job_id, cancel_requested=True).exists():
+            raise JobCancelled
+
+
+_current_progress = contextvars.ContextVar('report_job_progress', default=None)
+
+
+def report_progress(percent):
+    """
+    Record the progress (0-100) of the running report job and raise
+    JobCancelled if it was cancelled. A no-op outside a job, so report
+    code can call it unconditionally.
+    """
+    progress = _current_progress.get()
+    if progress is not None:
+        progress.report(percent)
+
+
+# =========================================================
+# Running
+# =========================================================
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_jobs(limit, worker=None, now=None):
+    """
+    Mark up to `limit` jobs as running and return their ids: queued
+    jobs, and running jobs whose worker has not sent a heartbeat for
+    settings.REPORT_JOB_STALE_AFTER seconds (it died mid-job).
+    Concurrent workers skip each other's locked rows.
+    """
+    if limit <= 0:
+        return []
+
+    now = now or timezone.now()
+    stale = now - datetime.timedelta(seconds=settings.REPORT_JOB_STALE_AFTER)
+
+    with transaction.atomic():
+        job_ids = list(
+            ReportJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status=ReportJob.STATUS_QUEUED)
+                | Q(status=ReportJob.STATUS_RUNNING, updated_at__lt=stale)
+            )
+            .order_by('created_at')
+            .values_list('pk', flat=True)[:limit]
+        )
+        ReportJob.objects.filter(pk__in=job_ids).update(
+            status=ReportJob.STATUS_RUNNING,
+            worker=worker or worker_name(),
+            progress=0,
+            started_at=now,
+            updated_at=now
+        )
+    return job_ids
+
+
+def heartbeat(job_ids):
+    """
+    Tell other workers that the running jobs `job_ids` are alive, so
+    claim_jobs does not reclaim them. Progress reports count too.
+    """
+    ReportJob.objects.filter(
+        pk__in=list(job_ids),
+        status=ReportJob.STATUS_RUNNING
+    ).update(updated_at=timezone.now())
+
+
+def _write_result(job, report, result):
+    if isinstance(result, bytes):
+        result = [result]
+
+    with tempfile.TemporaryFile() as handle:
+        for chunk in result:
+            handle.write(chunk)
+        handle.seek(0)
+        job.result.save(f"{report.name.replace('.', '-')}-{job.pk}.{report.extension}", File(handle), save=False)
+
+
+def run_job(job_id):
+    """
+    Run one claimed job in the current thread or process.
+    Returns the final status.
+    """
+    close_old_connections()
+    job = ReportJob.objects.select_related('company').get(pk=job_id)
+    progress = _Progress(job.pk)
+    token = _current_progress.set(progress)
+
+    try:
+        if job.cancel_requested:
+            raise JobCancelled
+        report = get_report(job.report)
+        with company_context(job.company):
+            _write_result(job, report, report.func(job.company, **job.params))
+    except JobCancelled:
+        job.status = ReportJob.STATUS_CANCELLED
+    except Exception as exc:
+        job.status = ReportJob.STATUS_FAILED
+        job.error = f"{type(exc).__name__}: {exc}"
+    else:
+        ttl = report.ttl or settings.REPORT_RESULT_TTL
+        job.status = ReportJob.STATUS_DONE
+        job.progress = 100
+        job.content_type = report.content_type
+        job.expires_at = timezone.now() + datetime.timedelta(seconds=ttl)
+    finally:
+        _current_progress.reset(token)
+
+    job.finished_at = timezone.now()
+    fields = ['status', 'result', 'content_type', 'error', 'finished_at', 'expires_at', 'updated_at']
+    if job.status == ReportJob.STATUS_DONE:
+        fields.append('progress')
+    job.save(update_fields=fields)
+    close_old_connections()
+    return job.status
+
+
+def expire_report_jobs(now=None):
+    """
+    Delete the result files of jobs past their TTL.
+    Returns the number of expired jobs.
+    """
+    now = now or timezone.now()
+    expired = 0
+    for job in ReportJob.objects.filter(
+        status=ReportJob.STATUS_DONE,
+        expires_at__lte=now
+    ).iterator():
+        job.result.delete(save=False)
+        job.status = ReportJob.STATUS_EXPIRED
+        job.save(update_fields=['status', 'result', 'updated_at'])
+        expired += 1
+    return expired
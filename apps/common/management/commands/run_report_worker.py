@@ -0,0 +1,91 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from apps.common.jobs import claim_jobs, expire_report_jobs, heartbeat, run_job, worker_name
+from apps.common.models import ReportJob
+from apps.common.processes import init_process
+
+
+class Command(BaseCommand):
+    help = "Run queued report jobs in a local thread or process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help="Concurrent jobs")
+        parser.add_argument(
+            '--processes',
+            action='store_true',
+            help="Use a process pool instead of threads (CPU-bound reports)"
+        )
+        parser.add_argument('--poll', type=float, default=2.0, help="Seconds between polls")
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Exit when the queue is empty"
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        name = worker_name()
+
+        if options['processes']:
+            # Spawned processes do not inherit this process's connections.
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_process
+            )
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers)
+
+        self.stdout.write(f"Report worker {name} started with {workers} workers.")
+        running = {}
+        last_expiry = 0
+        last_heartbeat = 0
+
+        with pool:
+            try:
+                while True:
+                    if time.monotonic() - last_expiry > 60:
+                        last_expiry = time.monotonic()
+                        expired = expire_report_jobs()
+                        if expired:
+                            self.stdout.write(f"Expired {expired} report results.")
+
+                    if running and time.monotonic() - last_heartbeat > 30:
+                        last_heartbeat = time.monotonic()
+                        heartbeat(running.values())
+
+                    for job_id in claim_jobs(workers - len(running), worker=name):
+                        running[pool.submit(run_job, job_id)] = job_id
+
+                    if not running:
+                        if options['once']:
+                            break
+                        connections.close_all()
+                        time.sleep(options['poll'])
+                        continue
+
+                    done, _ = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job_id = running.pop(future)
+                        try:
+                            status = future.result()
+                        except Exception as exc:
+                            ReportJob.objects.filter(
+                                pk=job_id,
+                                status=ReportJob.STATUS_RUNNING
+                            ).update(
+                                status=ReportJob.STATUS_FAILED,
+                                error=f"Worker crashed: {exc}",
+                                finished_at=timezone.now()
+                            )
+                            self.stderr.write(f"Report job {job_id} crashed: {exc}")
+                        else:
+                            self.stdout.write(f"Report job {job_id}: {status}.")
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping; waiting for running jobs.")
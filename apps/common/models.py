@@ -1,3 +1,99 @@
+from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+from apps.core.models import Company, CompanyQuerySet, TimeStampedModel
+
+
+# =========================================================
+# Report Jobs
+# =========================================================
+
+class ReportJob(TimeStampedModel):
+    """
+    A report run in the background by the report worker
+    (see apps.common.jobs and the run_report_worker command).
+    The finished result is kept as a file until `expires_at`.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CANCELLED = 'cancelled'
+    STATUS_EXPIRED = 'expired'
+
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_CANCELLED, 'Cancelled'),
+        (STATUS_EXPIRED, 'Expired'),
+    )
+
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name='report_jobs'
+    )
+    requested_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='report_jobs'
+    )
+
+    report = models.CharField(max_length=100)
+    params = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_QUEUED,
+        db_index=True
+    )
+    progress = models.PositiveSmallIntegerField(default=0)
+    cancel_requested = models.BooleanField(default=False)
+
+    result = models.FileField(upload_to='reports/%Y/%m/', blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+
+    worker = models.CharField(max_length=100, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    objects = CompanyQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('-created_at',)
+        verbose_name = "Report Job"
+        verbose_name_plural = "Report Jobs"
+        indexes = [
+            models.Index(fields=('status', 'created_at'), name='common_reportjob_queue'),
+        ]
+
+    def __str__(self):
+        return f"{self.report} #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status not in (self.STATUS_QUEUED, self.STATUS_RUNNING)
+
+    def request_cancel(self):
+        """
+        Cancel a queued job at once; ask a running job to stop at its
+        next progress report.
+        """
+        updated = ReportJob.objects.filter(
+            pk=self.pk,
+            status=self.STATUS_QUEUED
+        ).update(status=self.STATUS_CANCELLED, finished_at=timezone.now())
+        if not updated:
+            ReportJob.objects.filter(
+                pk=self.pk,
+                status=self.STATUS_RUNNING
+            ).update(cancel_requested=True)
+        self.refresh_from_db()
@@ -0,0 +1,8 @@
+import django
+
+
+# Initializer of spawned report worker processes. This module is
+# imported before Django is set up, so it must not import models.
+
+def init_process():
+    django.setup()
@@ -1,3 +1,122 @@
-from django.test import TestCase
+import datetime
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.core.testing import create_company, create_user, reset_caches
+
+from .jobs import (
+    claim_jobs,
+    expire_report_jobs,
+    heartbeat,
+    register_report,
+    report_progress,
+    run_job,
+    submit_report,
+)
+from .models import ReportJob
+
+
+@register_report('common_tests.echo', 'txt', 'text/plain')
+def echo_report(company, text='', chunks=1):
+    return [f"{company.code}:{text}".encode('utf-8')] * chunks
+
+
+@register_report('common_tests.cancelled', 'txt', 'text/plain')
+def cancelled_report(company):
+    ReportJob.objects.filter(company=company).update(cancel_requested=True)
+    report_progress(50)
+    return b"never written"
+
+
+@register_report('common_tests.broken', 'txt', 'text/plain')
+def broken_report(company):
+    raise ValueError("no data")
+
+
+class ReportJobTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        reset_caches()
+        self.company, _ = create_company()
+        self.user = create_user()
+
+    def _run(self, name, params=None):
+        job = submit_report(name, self.company, params=params, user=self.user)
+        self.assertEqual(claim_jobs(5, worker='test'), [job.pk])
+        run_job(job.pk)
+        job.refresh_from_db()
+        return job
+
+    def test_job_runs_from_queue_to_downloadable_result(self):
+        job = submit_report('common_tests.echo', self.company, params={'text': "hi", 'chunks': 2}, user=self.user)
+        self.assertEqual((job.status, job.requested_by), (ReportJob.STATUS_QUEUED, self.user))
+
+        self.assertEqual(claim_jobs(5, worker='test'), [job.pk])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker), (ReportJob.STATUS_RUNNING, 'test'))
+        self.assertEqual(claim_jobs(5, worker='other'), [])
+
+        self.assertEqual(run_job(job.pk), ReportJob.STATUS_DONE)
+        job.refresh_from_db()
+        self.assertEqual(job.progress, 100)
+        self.assertEqual(job.content_type, 'text/plain')
+        with job.result.open('rb') as handle:
+            self.assertEqual(handle.read(), b"BURJ:hiBURJ:hi")
+
+        self.assertEqual(expire_report_jobs(now=job.expires_at - datetime.timedelta(seconds=1)), 0)
+        self.assertEqual(expire_report_jobs(now=job.expires_at), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.STATUS_EXPIRED)
+        self.assertFalse(job.result)
+
+    def test_params_may_use_any_name(self):
+        job = submit_report(
+            'common_tests.echo',
+            self.company,
+            params={'name': "x", 'company': "y", 'user': "z"}
+        )
+        self.assertEqual(job.params, {'name': "x", 'company': "y", 'user': "z"})
+
+    def test_failures_and_cancellations_are_recorded(self):
+        job = self._run('common_tests.broken')
+        self.assertEqual(job.status, ReportJob.STATUS_FAILED)
+        self.assertEqual(job.error, "ValueError: no data")
+
+        job = self._run('common_tests.cancelled')
+        self.assertEqual(job.status, ReportJob.STATUS_CANCELLED)
+        self.assertFalse(job.result)
+
+        job = submit_report('common_tests.echo', self.company)
+        job.request_cancel()
+        self.assertEqual(job.status, ReportJob.STATUS_CANCELLED)
+        self.assertEqual(claim_jobs(5), [])
+
+    def test_running_jobs_without_heartbeat_are_reclaimed(self):
+        job = submit_report('common_tests.echo', self.company)
+        claim_jobs(5, worker='dead')
+
+        with override_settings(REPORT_JOB_STALE_AFTER=60):
+            later = timezone.now() + datetime.timedelta(seconds=30)
+            self.assertEqual(claim_jobs(5, worker='live', now=later), [])
+
+            heartbeat([job.pk])
+            later = timezone.now() + datetime.timedelta(seconds=90)
+            self.assertEqual(claim_jobs(5, worker='live', now=later), [job.pk])
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker), (ReportJob.STATUS_RUNNING, 'live'))
+        self.assertEqual(run_job(job.pk), ReportJob.STATUS_DONE)
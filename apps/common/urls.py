@@ -0,0 +1,28 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'common'
+
+urlpatterns = [
+    path(
+        'reports/jobs/',
+        views.report_job_submit,
+        name='report-job-submit'
+    ),
+    path(
+        'reports/jobs/<int:pk>/',
+        views.report_job_status,
+        name='report-job-status'
+    ),
+    path(
+        'reports/jobs/<int:pk>/cancel/',
+        views.report_job_cancel,
+        name='report-job-cancel'
+    ),
+    path(
+        'reports/jobs/<int:pk>/download/',
+        views.report_job_download,
+        name='report-job-download'
+    ),
+]
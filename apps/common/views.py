@@ -1,3 +1,91 @@
-from django.shortcuts import render
+import json
 
-# Create your views here.
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.http import FileResponse, Http404, HttpResponseBadRequest, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET, require_POST
+
+from apps.common.jobs import get_report, submit_report
+from apps.common.models import ReportJob
+
+
+def _job_json(job):
+    return {
+        'id': job.pk,
+        'report': job.report,
+        'params': job.params,
+        'status': job.status,
+        'progress': job.progress,
+        'error': job.error,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+        'expires_at': job.expires_at,
+    }
+
+
+def _get_job(request, pk):
+    """
+    A job of the user's company that the user submitted
+    (superusers see every job of the company).
+    """
+    if request.company is None:
+        raise Http404("No company for this user.")
+    jobs = ReportJob.objects.for_company(request.company)
+    if not request.user.is_superuser:
+        jobs = jobs.filter(requested_by=request.user)
+    return get_object_or_404(jobs, pk=pk)
+
+
+@require_POST
+@login_required
+def report_job_submit(request):
+    """
+    Queue a report. JSON body: {"report": name, "params": {...}}.
+    """
+    if request.company is None:
+        raise Http404("No company for this user.")
+
+    try:
+        body = json.loads(request.body)
+        report = get_report(body['report'])
+        params = body.get('params') or {}
+        if not isinstance(params, dict):
+            raise ValueError
+    except (ValueError, KeyError, TypeError, ValidationError):
+        return HttpResponseBadRequest("Invalid report or params.")
+
+    if report.permission and not request.user.has_perm(report.permission):
+        raise PermissionDenied
+
+    job = submit_report(report.name, request.company, params=params, user=request.user)
+    return JsonResponse(_job_json(job), status=202)
+
+
+@require_GET
+@login_required
+def report_job_status(request, pk):
+    return JsonResponse(_job_json(_get_job(request, pk)))
+
+
+@require_POST
+@login_required
+def report_job_cancel(request, pk):
+    job = _get_job(request, pk)
+    job.request_cancel()
+    return JsonResponse(_job_json(job))
+
+
+@require_GET
+@login_required
+def report_job_download(request, pk):
+    job = _get_job(request, pk)
+    if job.status != ReportJob.STATUS_DONE or not job.result:
+        raise Http404("Report result is not available.")
+
+    return FileResponse(
+        job.result.open('rb'),
+        as_attachment=True,
+        filename=job.result.name.rsplit('/', 1)[-1],
+        content_type=job.content_type
+    )
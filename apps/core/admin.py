@@ -47,6 +47,7 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'company', 'branch', 'is_active')
     list_filter = ('company', 'branch', 'is_active')
     search_fields = ('user__username',)
+    filter_horizontal = ('roles',)
 
 
 @admin.register(Role)
@@ -62,7 +63,8 @@ class RolePermissionAdmin(admin.ModelAdmin):
     list_filter = ('role',)
 @admin.register(DocumentType)
 class DocumentTypeAdmin(admin.ModelAdmin):
-    list_display = ('code', 'name')
+    list_display = ('code', 'name', 'is_gapless')
+    list_filter = ('is_gapless',)
     search_fields = ('code', 'name')
 
 
@@ -74,6 +76,7 @@ class DocumentSequenceAdmin(admin.ModelAdmin):
         'document_type',
         'prefix',
         'last_number',
+        'block_size',
         'is_active'
     )
     list_filter = ('company', 'fiscal_year', 'document_type', 'is_active')
@@ -0,0 +1,65 @@
+from django.contrib.auth.backends import BaseBackend
+from django.db.models import F
+
+from .cache import VersionedCache
+from .models import RolePermission
+
+role_permission_cache = VersionedCache(
+    'core.role_permissions',
+    maxsize=4096,
+    ttl=600
+)
+
+
+def compile_role_permissions(user):
+    """
+    Resolve the permissions granted by the user's active roles
+    in the profile company with one query.
+    Returns a frozenset of "app_label.codename" strings.
+    """
+    rows = RolePermission.objects.filter(
+        role__profiles__user=user,
+        role__profiles__is_active=True,
+        role__company=F('role__profiles__company'),
+        role__is_active=True,
+    ).values_list(
+        'permission__content_type__app_label',
+        'permission__codename'
+    )
+    return frozenset(f"{app_label}.{codename}" for app_label, codename in rows)
+
+
+def get_role_permissions(user):
+    return role_permission_cache.get(
+        user.pk,
+        lambda: compile_role_permissions(user)
+    )
+
+
+class RolePermissionBackend(BaseBackend):
+    """
+    Grants the Django permissions attached to the user's company roles.
+    Permission sets are compiled once and cached until a role, role
+    permission or user profile changes.
+    """
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return frozenset()
+
+        if not hasattr(user_obj, '_role_perm_cache'):
+            user_obj._role_perm_cache = get_role_permissions(user_obj)
+        return user_obj._role_perm_cache
+
+    def get_group_permissions(self, user_obj, obj=None):
+        return frozenset()
+
+    def has_perm(self, user_obj, perm, obj=None):
+        return perm in self.get_all_permissions(user_obj, obj)
+
+    def has_module_perms(self, user_obj, app_label):
+        prefix = f"{app_label}."
+        return any(
+            perm.startswith(prefix)
+            for perm in self.get_all_permissions(user_obj)
+        )
@@ -0,0 +1,144 @@
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache as shared_cache
+from django.db import transaction
+
+
+class VersionedCache:
+    """
+    Bounded per-process LRU cache for rarely changing rows.
+
+    Every cache has a version number stored in Django's cache backend.
+    invalidate() bumps it once the current transaction commits, and each
+    process drops its local entries as soon as it sees a new version.
+    Cross-process consistency therefore needs a shared cache backend
+    (see CACHES in settings) when running several workers.
+    """
+
+    def __init__(self, name, maxsize=256, ttl=None, check_interval=0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.check_interval = check_interval
+
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._version = None
+        self._checked_at = None
+        self._generation = 0
+
+    @property
+    def version_key(self):
+        return f"burj:cache-version:{self.name}"
+
+    def _shared_version(self):
+        version = shared_cache.get(self.version_key)
+        if version is None:
+            shared_cache.add(self.version_key, 1, timeout=None)
+            version = shared_cache.get(self.version_key, 1)
+        return version
+
+    def _sync(self):
+        """
+        Drop local entries if another process invalidated the cache.
+        Caller must hold self._lock.
+        """
+        now = time.monotonic()
+        if (
+            self._checked_at is not None
+            and now - self._checked_at < self.check_interval
+        ):
+            return
+
+        self._checked_at = now
+        version = self._shared_version()
+        if version != self._version:
+            self._entries.clear()
+            self._generation += 1
+            self._version = version
+
+    def get(self, key, loader):
+        """
+        Return the cached value for `key`, calling `loader()` on a miss.
+        Exceptions raised by the loader are not cached.
+        """
+        with self._lock:
+            self._sync()
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+            generation = self._generation
+
+        value = loader()
+
+        with self._lock:
+            # Do not store a value loaded before a concurrent invalidation.
+            if generation == self._generation:
+                expires_at = time.monotonic() + self.ttl if self.ttl else None
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+
+        return value
+
+    def clear_local(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def _bump_shared_version(self):
+        try:
+            shared_cache.incr(self.version_key)
+        except ValueError:
+            shared_cache.add(self.version_key, 1, timeout=None)
+        self.clear_local()
+
+    def invalidate(self):
+        """
+        Drop every entry in this process now and in all processes
+        once the current transaction commits.
+        """
+        self.clear_local()
+        transaction.on_commit(self._bump_shared_version)
+
+
+# ---------------------------------------------------------
+# Request-scoped memoization
+# ---------------------------------------------------------
+
+_request_memo = contextvars.ContextVar('request_memo', default=None)
+
+
+def start_request_memo():
+    _request_memo.set({})
+
+
+def clear_request_memo():
+    _request_memo.set(None)
+
+
+def request_memo(key, loader):
+    """
+    Memoize `loader()` for the rest of the current request.
+    Outside a request the loader is simply called.
+    """
+    memo = _request_memo.get()
+    if memo is None:
+        return loader()
+    if key not in memo:
+        memo[key] = loader()
+    return memo[key]
+
+
+def forget_request_memo():
+    memo = _request_memo.get()
+    if memo is not None:
+        memo.clear()
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+# Backends whose data is private to one process. The versions of the
+# process caches (see apps.core.cache.VersionedCache) kept there never
+# reach the other workers, so their caches would never be invalidated.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if settings.DEBUG:
+        return []
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in LOCAL_CACHE_BACKENDS:
+        return []
+    return [
+        Error(
+            f"The default cache backend {backend} is local to each process.",
+            hint=(
+                "Process caches are invalidated through the default cache; "
+                "set CACHE_BACKEND to a shared backend such as the database "
+                "or Redis cache."
+            ),
+            id='core.E001',
+        )
+    ]
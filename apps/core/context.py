@@ -0,0 +1,87 @@
+from collections import namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .cache import VersionedCache
+from .models import FiscalYear, UserProfile
+
+
+CompanyContext = namedtuple(
+    'CompanyContext',
+    ('company', 'branch', 'fiscal_year')
+)
+
+user_context_cache = VersionedCache('core.user_context', maxsize=4096, ttl=600)
+
+_current_context = ContextVar('company_context', default=None)
+
+
+def _load_user_context(user):
+    profile = (
+        UserProfile.objects
+        .select_related('company', 'branch')
+        .filter(user=user, is_active=True)
+        .first()
+    )
+    if profile is None:
+        return None
+
+    fiscal_year = FiscalYear.objects.filter(
+        company=profile.company,
+        is_active=True
+    ).first()
+
+    return CompanyContext(profile.company, profile.branch, fiscal_year)
+
+
+def resolve_user_context(user):
+    """
+    Return the CompanyContext of an authenticated user, or None
+    if the user has no active profile. Cached per user.
+    """
+    return user_context_cache.get(
+        user.pk,
+        lambda: _load_user_context(user)
+    )
+
+
+def get_current_context():
+    return _current_context.get()
+
+
+def get_current_company():
+    context = _current_context.get()
+    return context.company if context else None
+
+
+def get_current_branch():
+    context = _current_context.get()
+    return context.branch if context else None
+
+
+def get_current_fiscal_year():
+    context = _current_context.get()
+    return context.fiscal_year if context else None
+
+
+def set_current_context(context):
+    """
+    Activate `context` and return a token for reset_current_context().
+    """
+    return _current_context.set(context)
+
+
+def reset_current_context(token):
+    _current_context.reset(token)
+
+
+@contextmanager
+def company_context(company, branch=None, fiscal_year=None):
+    """
+    Activate a company outside of a request (commands, jobs, tests).
+    """
+    token = set_current_context(CompanyContext(company, branch, fiscal_year))
+    try:
+        yield
+    finally:
+        reset_current_context(token)
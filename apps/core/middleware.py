@@ -0,0 +1,31 @@
+from .context import (
+    reset_current_context,
+    resolve_user_context,
+    set_current_context,
+)
+
+
+class CompanyContextMiddleware:
+    """
+    Resolve the company, branch and active fiscal year of the user once
+    per request. Exposed as request.company_context / request.company
+    and through apps.core.context for services and querysets.
+    Must come after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        context = None
+        if request.user.is_authenticated:
+            context = resolve_user_context(request.user)
+
+        request.company_context = context
+        request.company = context.company if context else None
+
+        token = set_current_context(context)
+        try:
+            return self.get_response(request)
+        finally:
+            reset_current_context(token)
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_systemsettings_accounting_trigger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentsequence',
+            name='block_size',
+            field=models.PositiveIntegerField(default=100, help_text='Numbers reserved per worker for non-gapless document types'),
+        ),
+        migrations.AddField(
+            model_name='documenttype',
+            name='is_gapless',
+            field=models.BooleanField(default=True, help_text='If false, numbers are reserved in blocks and gaps are allowed'),
+        ),
+    ]
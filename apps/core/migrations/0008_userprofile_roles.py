@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_documenttype_is_gapless_documentsequence_block_size'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='roles',
+            field=models.ManyToManyField(blank=True, help_text='Roles of the user within the profile company', related_name='profiles', to='core.role'),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import datetime
+
 from django.db import models
 from django.contrib.auth.models import User, Permission
 
@@ -18,6 +20,23 @@ class TimeStampedModel(models.Model):
         abstract = True
 
 
+class CompanyQuerySet(models.QuerySet):
+    """
+    QuerySet for company-owned models.
+    for_company() defaults to the company of the current request
+    (see apps.core.context) and returns nothing without one.
+    """
+    company_field = 'company'
+
+    def for_company(self, company=None):
+        if company is None:
+            from .context import get_current_company
+            company = get_current_company()
+            if company is None:
+                return self.none()
+        return self.filter(**{self.company_field: company})
+
+
 # =========================================================
 # Organization Structure
 # =========================================================
@@ -51,6 +70,8 @@ class Branch(TimeStampedModel):
     code = models.CharField(max_length=50)
     is_active = models.BooleanField(default=True)
 
+    objects = CompanyQuerySet.as_manager()
+
     class Meta:
         unique_together = ('company', 'code')
         verbose_name_plural = "Branches"
@@ -76,6 +97,8 @@ class FiscalYear(TimeStampedModel):
     is_active = models.BooleanField(default=False)
     is_closed = models.BooleanField(default=False)
 
+    objects = CompanyQuerySet.as_manager()
+
     class Meta:
         unique_together = ('company', 'year')
         ordering = ['-year']
@@ -85,6 +108,23 @@ class FiscalYear(TimeStampedModel):
     def __str__(self):
         return f"{self.company.code} - {self.year}"
 
+    def period_of(self, date):
+        """
+        1-based calendar month number of `date` within the fiscal year.
+        """
+        return (
+            (date.year - self.start_date.year) * 12
+            + date.month - self.start_date.month + 1
+        )
+
+    def period_start(self, period):
+        """
+        First date of a 1-based period (see `period_of`).
+        """
+        month = self.start_date.month - 1 + period - 1
+        start = datetime.date(self.start_date.year + month // 12, month % 12 + 1, 1)
+        return max(start, self.start_date)
+
 
 # =========================================================
 # System Settings
@@ -144,6 +184,14 @@ class SystemSettings(TimeStampedModel):
     def __str__(self):
         return f"Settings - {self.company.code}"
 
+    @property
+    def posts_on_goods_receipt(self):
+        return self.accounting_trigger in ('GR', 'BOTH')
+
+    @property
+    def posts_on_vendor_invoice(self):
+        return self.accounting_trigger in ('VI', 'BOTH')
+
 
 # =========================================================
 # Users & RBAC
@@ -171,6 +219,12 @@ class UserProfile(TimeStampedModel):
         blank=True,
         related_name='users'
     )
+    roles = models.ManyToManyField(
+        'Role',
+        blank=True,
+        related_name='profiles',
+        help_text="Roles of the user within the profile company"
+    )
     is_active = models.BooleanField(default=True)
 
     class Meta:
@@ -194,6 +248,8 @@ class Role(TimeStampedModel):
     name = models.CharField(max_length=100)
     is_active = models.BooleanField(default=True)
 
+    objects = CompanyQuerySet.as_manager()
+
     class Meta:
         unique_together = ('company', 'name')
         verbose_name = "Role"
@@ -238,6 +294,10 @@ class DocumentType(TimeStampedModel):
     code = models.CharField(max_length=20, unique=True)
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
+    is_gapless = models.BooleanField(
+        default=True,
+        help_text="If false, numbers are reserved in blocks and gaps are allowed"
+    )
 
     class Meta:
         verbose_name = "Document Type"
@@ -273,6 +333,10 @@ class DocumentSequence(TimeStampedModel):
     )
     last_number = models.PositiveIntegerField(default=0)
     padding = models.PositiveSmallIntegerField(default=6)
+    block_size = models.PositiveIntegerField(
+        default=100,
+        help_text="Numbers reserved per worker for non-gapless document types"
+    )
     is_active = models.BooleanField(default=True)
 
     class Meta:
@@ -1,22 +1,349 @@
-from django.db import transaction
-from .models import DocumentSequence
+import datetime
+import os
+import threading
+from bisect import bisect_right
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from .cache import VersionedCache, request_memo
+from .models import DocumentSequence, DocumentType, FiscalYear, SystemSettings
+
+
+SequenceInfo = namedtuple(
+    'SequenceInfo',
+    ('id', 'prefix', 'padding', 'block_size')
+)
+
+document_type_cache = VersionedCache('core.document_types', maxsize=128)
+document_sequence_cache = VersionedCache('core.document_sequences', maxsize=2048)
+settings_cache = VersionedCache('core.system_settings', maxsize=512, ttl=300)
+fiscal_year_cache = VersionedCache('core.fiscal_years', maxsize=1024)
+
+
+def get_settings(company):
+    """
+    Return the SystemSettings of `company`.
+    Memoized for the current request and cached per process.
+    Companies without a settings record get unsaved defaults.
+    """
+    def load():
+        settings = SystemSettings.objects.filter(company=company).first()
+        return settings or SystemSettings(company=company)
+
+    return request_memo(
+        ('core.system_settings', company.pk),
+        lambda: settings_cache.get(company.pk, load)
+    )
+
+
+# Per-process pool of reserved number blocks for non-gapless document types.
+# Key: (company_id, fiscal_year_id, document_type_id)
+# Value: (prefix, padding, next_number, last_number)
+_blocks = {}
+_blocks_lock = threading.Lock()
+_blocks_pid = os.getpid()
+
+
+class FiscalYearIndex:
+    """
+    Fiscal years of one company sorted by start date,
+    searchable by date with a binary search.
+    """
+
+    def __init__(self, fiscal_years):
+        self.fiscal_years = sorted(fiscal_years, key=lambda fy: fy.start_date)
+        self._starts = [fy.start_date for fy in self.fiscal_years]
+
+    def find(self, date):
+        position = bisect_right(self._starts, date) - 1
+        if position < 0:
+            return None
+        fiscal_year = self.fiscal_years[position]
+        if date > fiscal_year.end_date:
+            return None
+        return fiscal_year
+
+
+def get_fiscal_year_index(company):
+    return fiscal_year_cache.get(
+        company.pk,
+        lambda: FiscalYearIndex(FiscalYear.objects.filter(company=company))
+    )
+
+
+def get_open_fiscal_year(company, date):
+    """
+    Return the fiscal year of `company` containing `date`.
+    Raises ValidationError if there is none or it is closed.
+    """
+    if isinstance(date, datetime.datetime):
+        date = date.date()
+
+    fiscal_year = get_fiscal_year_index(company).find(date)
+    if fiscal_year is None:
+        raise ValidationError(f"No fiscal year covers {date}.")
+    if fiscal_year.is_closed:
+        raise ValidationError(f"Fiscal year {fiscal_year.year} is closed.")
+    return fiscal_year
+
+
+# Row lock clauses that other readers may share. Other databases fall
+# back to select_for_update(), which serializes postings per year.
+SHARE_LOCK_CLAUSES = {
+    'postgresql': ' FOR SHARE',
+    'mysql': ' LOCK IN SHARE MODE',
+}
+
+
+def lock_open_fiscal_years(fiscal_year_ids):
+    """
+    Take a shared lock on fiscal years for the current posting
+    transaction and check, in the database, that they are still open.
+
+    Postings share the lock, so they never wait for each other, but
+    the exclusive lock of a year-end close conflicts with it: a posting
+    either commits before the year is closed, and is carried forward,
+    or waits for the close and is rejected.
+    Raises ValidationError if a year is closed.
+    """
+    fiscal_year_ids = set(fiscal_year_ids)
+    if not fiscal_year_ids:
+        return
+
+    fiscal_years = (
+        FiscalYear.objects
+        .filter(pk__in=fiscal_year_ids)
+        .order_by('pk')
+        .values_list('year', 'is_closed')
+    )
+    clause = SHARE_LOCK_CLAUSES.get(connection.vendor)
+    if clause:
+        sql, params = fiscal_years.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(sql + clause, params)
+            rows = cursor.fetchall()
+    else:
+        rows = list(fiscal_years.select_for_update())
+
+    for year, is_closed in rows:
+        if is_closed:
+            # The cached index of this process is out of date.
+            fiscal_year_cache.clear_local()
+            raise ValidationError(f"Fiscal year {year} is closed.")
+
+
+def get_document_type(code):
+    """
+    Return the DocumentType with `code` from the process cache.
+    """
+    return document_type_cache.get(
+        code,
+        lambda: DocumentType.objects.get(code=code)
+    )
+
+
+def get_sequence_info(company, fiscal_year, document_type):
+    """
+    Return cached prefix/padding metadata of the active sequence.
+    The counter itself is never cached.
+    """
+    def load():
+        sequence = DocumentSequence.objects.get(
+            company=company,
+            fiscal_year=fiscal_year,
+            document_type=document_type,
+            is_active=True
+        )
+        return SequenceInfo(
+            sequence.pk,
+            sequence.prefix,
+            sequence.padding,
+            sequence.block_size
+        )
+
+    return document_sequence_cache.get(
+        (company.pk, fiscal_year.pk, document_type.pk),
+        load
+    )
+
+
+def _format_number(prefix, padding, number):
+    return f"{prefix}-{str(number).zfill(padding)}"
+
+
+def _reserve_numbers(company, fiscal_year, document_type, count=None):
+    """
+    Advance the sequence with a single locking UPDATE.
+    Reserves `count` numbers, or the sequence block size when omitted.
+    Returns (sequence_info, first_number, last_number).
+    """
+    info = get_sequence_info(company, fiscal_year, document_type)
+    count = count or max(info.block_size, 1)
+
+    with transaction.atomic():
+        updated = DocumentSequence.objects.filter(
+            pk=info.id,
+            is_active=True
+        ).update(last_number=F('last_number') + count)
+
+        if not updated:
+            document_sequence_cache.clear_local()
+            raise DocumentSequence.DoesNotExist(
+                "No active document sequence found."
+            )
+
+        last_number = DocumentSequence.objects.filter(
+            pk=info.id
+        ).values_list('last_number', flat=True).get()
+
+    return info, last_number - count + 1, last_number
+
+
+def _reset_blocks_after_fork():
+    """
+    Blocks reserved by a parent process must not be reused by its children.
+    Caller must hold _blocks_lock.
+    """
+    global _blocks_pid
+    if _blocks_pid != os.getpid():
+        _blocks.clear()
+        _blocks_pid = os.getpid()
+
+
+def _publish_block(key, block):
+    with _blocks_lock:
+        _reset_blocks_after_fork()
+        _blocks[key] = block
+
+
+def _take_from_block(company, fiscal_year, document_type):
+    key = (company.pk, fiscal_year.pk, document_type.pk)
+
+    with _blocks_lock:
+        _reset_blocks_after_fork()
+        block = _blocks.get(key)
+        if block:
+            prefix, padding, number, last_number = block
+            if number < last_number:
+                _blocks[key] = (prefix, padding, number + 1, last_number)
+            else:
+                del _blocks[key]
+            return _format_number(prefix, padding, number)
+
+    sequence, number, last_number = _reserve_numbers(
+        company,
+        fiscal_year,
+        document_type
+    )
+
+    # The remainder only becomes usable once the reservation is committed,
+    # so a rolled back transaction can never hand out the same numbers twice.
+    if number < last_number:
+        remainder = (sequence.prefix, sequence.padding, number + 1, last_number)
+        transaction.on_commit(lambda: _publish_block(key, remainder))
+
+    return _format_number(sequence.prefix, sequence.padding, number)
 
 
 def get_next_document_number(company, fiscal_year, document_type):
     """
     Safely generate the next document number.
     Thread-safe and transaction-safe.
+
+    Gapless document types lock the sequence row for every number.
+    Other types hand out numbers from a block reserved per process,
+    so the row is only locked once per `block_size` documents.
+    """
+    if not document_type.is_gapless:
+        return _take_from_block(company, fiscal_year, document_type)
+
+    return get_next_document_numbers(company, fiscal_year, document_type, 1)[0]
+
+
+def get_next_document_numbers(company, fiscal_year, document_type, count):
+    """
+    Allocate `count` contiguous document numbers with a single row lock.
+    Used by bulk posting; for gapless types the caller must use every
+    number inside the same transaction.
     """
+    if count < 1:
+        return []
+
+    sequence, first_number, last_number = _reserve_numbers(
+        company,
+        fiscal_year,
+        document_type,
+        count=count
+    )
+    return [
+        _format_number(sequence.prefix, sequence.padding, number)
+        for number in range(first_number, last_number + 1)
+    ]
+
+
+def get_next_document_numbers_by_type(company, fiscal_year, counts):
+    """
+    Allocate numbers of several document types together, e.g. a
+    document and its journal entry. `counts` maps document types to
+    the number of numbers wanted; returns {document_type: [numbers]}.
+
+    Non-gapless types asking for a single number take it from the
+    process block like get_next_document_number. All other sequences
+    are advanced with one locking UPDATE and read back with one query.
+    """
+    numbers = {}
+    reserve = {}
+    for document_type, count in counts.items():
+        if count < 1:
+            numbers[document_type] = []
+        elif count == 1 and not document_type.is_gapless:
+            numbers[document_type] = [
+                _take_from_block(company, fiscal_year, document_type)
+            ]
+        else:
+            reserve[document_type] = count
+
+    if not reserve:
+        return numbers
+
+    infos = {
+        document_type: get_sequence_info(company, fiscal_year, document_type)
+        for document_type in reserve
+    }
+    sequence_ids = [info.id for info in infos.values()]
+
     with transaction.atomic():
-        sequence = DocumentSequence.objects.select_for_update().get(
-            company=company,
-            fiscal_year=fiscal_year,
-            document_type=document_type,
+        updated = DocumentSequence.objects.filter(
+            pk__in=sequence_ids,
             is_active=True
+        ).update(
+            last_number=F('last_number') + Case(
+                *[
+                    When(pk=info.id, then=Value(reserve[document_type]))
+                    for document_type, info in infos.items()
+                ],
+                output_field=PositiveIntegerField()
+            )
         )
 
-        sequence.last_number += 1
-        sequence.save(update_fields=['last_number'])
+        if updated != len(sequence_ids):
+            document_sequence_cache.clear_local()
+            raise DocumentSequence.DoesNotExist(
+                "No active document sequence found."
+            )
+
+        last_numbers = dict(
+            DocumentSequence.objects.filter(
+                pk__in=sequence_ids
+            ).values_list('pk', 'last_number')
+        )
 
-        number = str(sequence.last_number).zfill(sequence.padding)
-        return f"{sequence.prefix}-{number}"
+    for document_type, info in infos.items():
+        last_number = last_numbers[info.id]
+        numbers[document_type] = [
+            _format_number(info.prefix, info.padding, number)
+            for number in range(last_number - reserve[document_type] + 1, last_number + 1)
+        ]
+    return numbers
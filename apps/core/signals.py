@@ -0,0 +1,87 @@
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import role_permission_cache
+from .cache import clear_request_memo, forget_request_memo, start_request_memo
+from .context import user_context_cache
+from .models import (
+    Branch,
+    Company,
+    DocumentSequence,
+    DocumentType,
+    FiscalYear,
+    Role,
+    RolePermission,
+    SystemSettings,
+    UserProfile,
+)
+from .services import (
+    document_sequence_cache,
+    document_type_cache,
+    fiscal_year_cache,
+    settings_cache,
+)
+
+
+@receiver(request_started)
+def begin_request_memo(sender, **kwargs):
+    start_request_memo()
+
+
+@receiver(request_finished)
+def end_request_memo(sender, **kwargs):
+    clear_request_memo()
+
+
+@receiver(post_save, sender=DocumentType)
+@receiver(post_delete, sender=DocumentType)
+def invalidate_document_types(sender, **kwargs):
+    document_type_cache.invalidate()
+
+
+@receiver(post_save, sender=DocumentSequence)
+@receiver(post_delete, sender=DocumentSequence)
+def invalidate_document_sequences(sender, **kwargs):
+    # The counter is not cached, so bumping it needs no invalidation.
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) == {'last_number'}:
+        return
+    document_sequence_cache.invalidate()
+
+
+@receiver(post_save, sender=SystemSettings)
+@receiver(post_delete, sender=SystemSettings)
+def invalidate_system_settings(sender, **kwargs):
+    forget_request_memo()
+    settings_cache.invalidate()
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender=RolePermission)
+@receiver(post_delete, sender=RolePermission)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(m2m_changed, sender=UserProfile.roles.through)
+def invalidate_role_permissions(sender, **kwargs):
+    if kwargs.get('action', 'post_').startswith('post_'):
+        role_permission_cache.invalidate()
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+@receiver(post_save, sender=Branch)
+@receiver(post_delete, sender=Branch)
+@receiver(post_save, sender=FiscalYear)
+@receiver(post_delete, sender=FiscalYear)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_user_context(sender, **kwargs):
+    user_context_cache.invalidate()
+
+
+@receiver(post_save, sender=FiscalYear)
+@receiver(post_delete, sender=FiscalYear)
+def invalidate_fiscal_years(sender, **kwargs):
+    fiscal_year_cache.invalidate()
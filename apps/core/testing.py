@@ -0,0 +1,76 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from . import services
+from .context import user_context_cache
+from .backends import role_permission_cache
+from .models import Company, DocumentSequence, DocumentType, FiscalYear
+
+
+# Fixtures shared by the apps' test suites.
+
+def reset_caches():
+    """
+    Forget every per-process cache and reserved number block. Tests
+    reuse primary keys after each rollback, so cached rows of a
+    previous test would otherwise leak into the next one.
+    """
+    cache.clear()
+    for versioned_cache in (
+        services.document_type_cache,
+        services.document_sequence_cache,
+        services.settings_cache,
+        services.fiscal_year_cache,
+        user_context_cache,
+        role_permission_cache,
+    ):
+        versioned_cache.clear_local()
+    with services._blocks_lock:
+        services._blocks.clear()
+
+
+def create_document_types(codes=('JE', 'GR', 'VI', 'PO'), gapless=True):
+    return {
+        code: DocumentType.objects.get_or_create(
+            code=code,
+            defaults={'name': code, 'is_gapless': gapless}
+        )[0]
+        for code in codes
+    }
+
+
+def create_fiscal_year(company, year, is_active=True, is_closed=False, document_types=None):
+    """
+    A calendar fiscal year with one sequence per document type.
+    """
+    fiscal_year = FiscalYear.objects.create(
+        company=company,
+        year=year,
+        start_date=datetime.date(year, 1, 1),
+        end_date=datetime.date(year, 12, 31),
+        is_active=is_active,
+        is_closed=is_closed
+    )
+    for code, document_type in (document_types or create_document_types()).items():
+        DocumentSequence.objects.create(
+            company=company,
+            fiscal_year=fiscal_year,
+            document_type=document_type,
+            prefix=f"{company.code}-{code}-{year}"
+        )
+    return fiscal_year
+
+
+def create_company(code='BURJ', year=2026):
+    """
+    A company with an active fiscal year `year` and its sequences.
+    Returns (company, fiscal_year).
+    """
+    company = Company.objects.create(name=code.title(), code=code)
+    return company, create_fiscal_year(company, year)
+
+
+def create_user(username='user', **kwargs):
+    return get_user_model().objects.create(username=username, **kwargs)
@@ -1,3 +1,355 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from .backends import RolePermissionBackend
+from .cache import clear_request_memo, start_request_memo
+from .checks import check_shared_cache
+from .context import company_context, get_current_company
+from .middleware import CompanyContextMiddleware
+from .models import Branch, DocumentSequence, Role, RolePermission, SystemSettings, UserProfile
+from .services import (
+    _blocks,
+    document_type_cache,
+    get_document_type,
+    get_next_document_number,
+    get_next_document_numbers,
+    get_open_fiscal_year,
+    get_sequence_info,
+    get_settings,
+)
+from .testing import (
+    create_company,
+    create_document_types,
+    create_fiscal_year,
+    create_user,
+    reset_caches,
+)
+
+
+class BlockNumberingTests(TestCase):
+
+    def setUp(self):
+        reset_caches()
+        create_document_types(('JE',), gapless=True)
+        create_document_types(('PO',), gapless=False)
+        self.company, self.fiscal_year = create_company()
+        DocumentSequence.objects.filter(document_type__code='PO').update(block_size=10)
+
+    def _sequence(self, code):
+        return DocumentSequence.objects.get(company=self.company, document_type__code=code)
+
+    def _next(self, code):
+        return get_next_document_number(self.company, self.fiscal_year, get_document_type(code))
+
+    def test_non_gapless_numbers_come_from_a_reserved_block(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self._next('PO'), "BURJ-PO-2026-000001")
+        self.assertEqual(self._sequence('PO').last_number, 10)
+
+        with self.assertNumQueries(0):
+            numbers = [self._next('PO') for _ in range(9)]
+        self.assertEqual(numbers[-1], "BURJ-PO-2026-000010")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self._next('PO'), "BURJ-PO-2026-000011")
+        self.assertEqual(self._sequence('PO').last_number, 20)
+
+    def test_block_of_a_rolled_back_transaction_is_not_reused(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.assertEqual(self._next('PO'), "BURJ-PO-2026-000001")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+
+        self.assertEqual(_blocks, {})
+        self.assertEqual(self._sequence('PO').last_number, 0)
+
+    def test_gapless_numbers_advance_the_sequence_one_by_one(self):
+        self.assertEqual(self._next('JE'), "BURJ-JE-2026-000001")
+        self.assertEqual(self._next('JE'), "BURJ-JE-2026-000002")
+        self.assertEqual(self._sequence('JE').last_number, 2)
+        self.assertEqual(_blocks, {})
+
+
+class BatchNumberingTests(TestCase):
+
+    def setUp(self):
+        reset_caches()
+        self.document_type = create_document_types(('JE',))['JE']
+        self.company, self.fiscal_year = create_company()
+
+    def _sequence(self):
+        return DocumentSequence.objects.get(company=self.company, document_type=self.document_type)
+
+    def test_range_is_contiguous_and_reserved_with_one_update(self):
+        get_next_document_number(self.company, self.fiscal_year, self.document_type)
+
+        with self.assertNumQueries(4):
+            numbers = get_next_document_numbers(self.company, self.fiscal_year, self.document_type, 3)
+
+        self.assertEqual(numbers, [
+            "BURJ-JE-2026-000002",
+            "BURJ-JE-2026-000003",
+            "BURJ-JE-2026-000004",
+        ])
+        self.assertEqual(self._sequence().last_number, 4)
+
+    def test_empty_range_reserves_nothing(self):
+        self.assertEqual(
+            get_next_document_numbers(self.company, self.fiscal_year, self.document_type, 0),
+            []
+        )
+        self.assertEqual(self._sequence().last_number, 0)
+
+    def test_rolled_back_range_is_handed_out_again(self):
+        try:
+            with transaction.atomic():
+                get_next_document_numbers(self.company, self.fiscal_year, self.document_type, 5)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        self.assertEqual(self._sequence().last_number, 0)
+        self.assertEqual(
+            get_next_document_numbers(self.company, self.fiscal_year, self.document_type, 2),
+            ["BURJ-JE-2026-000001", "BURJ-JE-2026-000002"]
+        )
+
+
+class DocumentMetadataCacheTests(TestCase):
+
+    def setUp(self):
+        reset_caches()
+        self.document_type = create_document_types(('JE',))['JE']
+        self.company, self.fiscal_year = create_company()
+
+    def test_document_type_is_served_from_cache_until_saved(self):
+        get_document_type('JE')
+        with self.assertNumQueries(0):
+            self.assertTrue(get_document_type('JE').is_gapless)
+
+        self.document_type.is_gapless = False
+        self.document_type.save()
+
+        self.assertFalse(get_document_type('JE').is_gapless)
+
+    def test_saving_a_document_type_invalidates_other_processes_on_commit(self):
+        get_document_type('JE')
+        version = cache.get(document_type_cache.version_key)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.document_type.save()
+
+        self.assertEqual(cache.get(document_type_cache.version_key), version + 1)
+
+    def test_sequence_metadata_is_refreshed_when_the_sequence_changes(self):
+        sequence = DocumentSequence.objects.get(company=self.company, document_type=self.document_type)
+        get_sequence_info(self.company, self.fiscal_year, self.document_type)
+
+        sequence.last_number = 5
+        sequence.save(update_fields=['last_number'])
+        with self.assertNumQueries(0):
+            get_sequence_info(self.company, self.fiscal_year, self.document_type)
+
+        sequence.prefix = "NEW"
+        sequence.save()
+        self.assertEqual(
+            get_next_document_numbers(self.company, self.fiscal_year, self.document_type, 1),
+            ["NEW-000006"]
+        )
+
+
+class SettingsCacheTests(TestCase):
+
+    def setUp(self):
+        reset_caches()
+        self.company, _ = create_company()
+
+    def test_company_without_settings_gets_unsaved_defaults(self):
+        settings = get_settings(self.company)
+        self.assertIsNone(settings.pk)
+        self.assertEqual(settings.accounting_trigger, 'BOTH')
+
+    def test_settings_are_cached_until_saved(self):
+        settings = SystemSettings.objects.create(company=self.company, accounting_trigger='GR')
+        self.assertTrue(get_settings(self.company).posts_on_goods_receipt)
+        with self.assertNumQueries(0):
+            get_settings(self.company)
+
+        settings.accounting_trigger = 'VI'
+        settings.save()
+
+        self.assertFalse(get_settings(self.company).posts_on_goods_receipt)
+        self.assertTrue(get_settings(self.company).posts_on_vendor_invoice)
+
+    def test_settings_are_memoized_for_the_request(self):
+        start_request_memo()
+        try:
+            settings = get_settings(self.company)
+            reset_caches()
+            with self.assertNumQueries(0):
+                self.assertIs(get_settings(self.company), settings)
+        finally:
+            clear_request_memo()
+
+
+class RolePermissionBackendTests(TestCase):
+
+    def setUp(self):
+        reset_caches()
+        self.company, _ = create_company()
+        self.other_company, _ = create_company('OTHER')
+        self.user = create_user()
+        self.role = Role.objects.create(company=self.company, name="Accountant")
+        self.profile = UserProfile.objects.create(user=self.user, company=self.company)
+        self.profile.roles.add(self.role)
+        self.permission = Permission.objects.get(codename='view_journalline')
+
+    def _has_perm(self):
+        # A fresh user object, as in a new request.
+        return get_user_model().objects.get(pk=self.user.pk).has_perm('finance.view_journalline')
+
+    def test_role_permissions_are_granted_and_revoked(self):
+        self.assertFalse(self._has_perm())
+
+        grant = RolePermission.objects.create(role=self.role, permission=self.permission)
+        self.assertTrue(self._has_perm())
+
+        grant.delete()
+        self.assertFalse(self._has_perm())
+
+    def test_permissions_are_compiled_once_per_user(self):
+        RolePermission.objects.create(role=self.role, permission=self.permission)
+        self.assertTrue(self._has_perm())
+
+        backend = RolePermissionBackend()
+        user = get_user_model().objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(backend.has_perm(user, 'finance.view_journalline'))
+            self.assertTrue(backend.has_module_perms(user, 'finance'))
+
+    def test_inactive_roles_and_roles_of_other_companies_grant_nothing(self):
+        other_role = Role.objects.create(company=self.other_company, name="Accountant")
+        RolePermission.objects.create(role=other_role, permission=self.permission)
+        self.profile.roles.add(other_role)
+        self.assertFalse(self._has_perm())
+
+        RolePermission.objects.create(role=self.role, permission=self.permission)
+        self.assertTrue(self._has_perm())
+
+        self.role.is_active = False
+        self.role.save()
+        self.assertFalse(self._has_perm())
+
+
+class CompanyContextTests(TestCase):
+
+    def setUp(self):
+        reset_caches()
+        self.company, self.fiscal_year = create_company()
+        self.other_company, _ = create_company('OTHER')
+        self.user = create_user()
+        self.profile = UserProfile.objects.create(user=self.user, company=self.company)
+        self.seen = []
+        self.middleware = CompanyContextMiddleware(self._view)
+
+    def _view(self, request):
+        self.seen.append((request.company, get_current_company()))
+        return HttpResponse()
+
+    def _request(self, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        self.middleware(request)
+        return self.seen[-1]
+
+    def test_request_carries_the_company_of_the_user(self):
+        company, current = self._request(self.user)
+        self.assertEqual(company, self.company)
+        self.assertEqual(current, self.company)
+        self.assertIsNone(get_current_company())
+
+    def test_context_is_resolved_without_queries_after_the_first_request(self):
+        self._request(self.user)
+        with self.assertNumQueries(0):
+            company, _ = self._request(self.user)
+        self.assertEqual(company, self.company)
+
+    def test_moving_the_user_to_another_company_refreshes_the_context(self):
+        self._request(self.user)
+        self.profile.company = self.other_company
+        self.profile.save()
+        self.assertEqual(self._request(self.user)[0], self.other_company)
+
+    def test_anonymous_requests_have_no_company(self):
+        self.assertEqual(self._request(AnonymousUser()), (None, None))
+
+    def test_for_company_filters_by_the_current_company(self):
+        Branch.objects.create(company=self.company, code='HQ', name="Head office")
+        Branch.objects.create(company=self.other_company, code='HQ', name="Head office")
+
+        self.assertFalse(Branch.objects.for_company().exists())
+        with company_context(self.other_company):
+            self.assertEqual(
+                list(Branch.objects.for_company().values_list('company', flat=True)),
+                [self.other_company.pk]
+            )
+        self.assertEqual(Branch.objects.for_company(self.company).count(), 1)
+
+
+class FiscalYearIndexTests(TestCase):
+
+    def setUp(self):
+        reset_caches()
+        self.company, self.fiscal_year = create_company(year=2026)
+
+    def test_date_resolves_to_its_fiscal_year(self):
+        next_year = create_fiscal_year(self.company, 2027, is_active=False)
+
+        self.assertEqual(get_open_fiscal_year(self.company, datetime.date(2026, 1, 1)), self.fiscal_year)
+        self.assertEqual(get_open_fiscal_year(self.company, datetime.date(2026, 12, 31)), self.fiscal_year)
+        self.assertEqual(get_open_fiscal_year(self.company, datetime.date(2027, 6, 1)), next_year)
+        with self.assertNumQueries(0):
+            get_open_fiscal_year(self.company, datetime.datetime(2026, 5, 1, 13, 30))
+
+    def test_dates_outside_every_fiscal_year_are_rejected(self):
+        for date in (datetime.date(2025, 12, 31), datetime.date(2027, 1, 1)):
+            with self.assertRaisesMessage(ValidationError, f"No fiscal year covers {date}."):
+                get_open_fiscal_year(self.company, date)
+
+    def test_new_and_closed_fiscal_years_are_seen_at_once(self):
+        get_open_fiscal_year(self.company, datetime.date(2026, 3, 1))
+
+        create_fiscal_year(self.company, 2027, is_active=False)
+        self.assertEqual(get_open_fiscal_year(self.company, datetime.date(2027, 3, 1)).year, 2027)
+
+        self.fiscal_year.is_closed = True
+        self.fiscal_year.save()
+        with self.assertRaisesMessage(ValidationError, "Fiscal year 2026 is closed."):
+            get_open_fiscal_year(self.company, datetime.date(2026, 3, 1))
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+
+    def _check(self, backend, debug=False):
+        with override_settings(DEBUG=debug, CACHES={'default': {'BACKEND': backend}}):
+            return [error.id for error in check_shared_cache(None)]
+
+    def test_local_cache_backends_are_rejected_outside_debug(self):
+        self.assertEqual(self._check('django.core.cache.backends.locmem.LocMemCache'), ['core.E001'])
+        self.assertEqual(self._check('django.core.cache.backends.dummy.DummyCache'), ['core.E001'])
+        self.assertEqual(self._check('django.core.cache.backends.locmem.LocMemCache', debug=True), [])
+
+    def test_shared_cache_backends_are_accepted(self):
+        self.assertEqual(self._check('django.core.cache.backends.db.DatabaseCache'), [])
+        self.assertEqual(self._check('django.core.cache.backends.redis.RedisCache'), [])
@@ -1,10 +1,15 @@
+from django import forms
 from django.contrib import admin
+from django.core.exceptions import ValidationError
+from django.forms.models import BaseInlineFormSet
 from .models import AccountType, Account
 from .models import JournalEntry, JournalLine
+from .services.line_validation import get_journal_line_errors
 
 @admin.register(AccountType)
 class AccountTypeAdmin(admin.ModelAdmin):
-    list_display = ('code', 'name')
+    list_display = ('code', 'name', 'category')
+    list_filter = ('category',)
     search_fields = ('code', 'name')
 
 
@@ -14,11 +19,90 @@ class AccountAdmin(admin.ModelAdmin):
     list_filter = ('company', 'account_type', 'is_active')
     search_fields = ('code', 'name')
 
+class PrefetchedModelChoiceField(forms.ModelChoiceField):
+    """
+    Resolves submitted values from `prefetched` ({str(pk): object},
+    loaded from this field's queryset) instead of one query per form.
+    """
+    prefetched = None
+
+    def to_python(self, value):
+        if self.prefetched is not None and str(value) in self.prefetched:
+            return self.prefetched[str(value)]
+        return super().to_python(value)
+
+
+class JournalLineForm(forms.ModelForm):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # JournalLineFormSet.clean checks the lines of all forms at once.
+        self.instance.validated_as_set = True
+
+
+class JournalLineFormSet(BaseInlineFormSet):
+    """
+    Resolves the accounts, projects and cost centers of all submitted
+    lines with one query per model before the forms are cleaned, then
+    validates the lines together (see
+    apps.finance.services.line_validation).
+    """
+    reference_fields = ('account', 'project', 'cost_center')
+
+    def full_clean(self):
+        if self.is_bound:
+            self._prefetch_references()
+        super().full_clean()
+
+    def clean(self):
+        super().clean()
+        line_forms = [
+            form for form in self.forms
+            if form.is_valid()
+            and form.has_changed()
+            and not self._should_delete_form(form)
+        ]
+        errors = get_journal_line_errors([form.instance for form in line_forms])
+        for index, messages in errors.items():
+            for message in messages:
+                line_forms[index].add_error(None, message)
+
+    def _prefetch_references(self):
+        for name in self.reference_fields:
+            fields = [
+                form.fields[name]
+                for form in self.forms
+                if isinstance(form.fields.get(name), PrefetchedModelChoiceField)
+            ]
+            if not fields:
+                continue
+
+            values = {
+                str(form[name].data)
+                for form in self.forms
+                if name in form.fields
+            }
+            pks = [int(value) for value in values if value.isdigit()]
+            objects = {
+                str(pk): obj
+                for pk, obj in fields[0].queryset.in_bulk(pks).items()
+            }
+            for field in fields:
+                field.prefetched = objects
+
+
 class JournalLineInline(admin.TabularInline):
     model = JournalLine
+    form = JournalLineForm
+    formset = JournalLineFormSet
     extra = 1
     autocomplete_fields = ('account', 'project', 'cost_center')
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in JournalLineFormSet.reference_fields:
+            kwargs['form_class'] = PrefetchedModelChoiceField
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
 
 
 @admin.register(JournalEntry)
@@ -26,10 +110,11 @@ class JournalEntryAdmin(admin.ModelAdmin):
     list_display = (
         'document_number',
         'company',
+        'branch',
         'date',
         'is_posted'
     )
-    list_filter = ('company', 'is_posted')
+    list_filter = ('company', 'branch', 'is_posted')
     inlines = [JournalLineInline]
     readonly_fields = ('document_number',)
 
@@ -0,0 +1,98 @@
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+
+from apps.core.models import Company, FiscalYear
+from apps.finance.models import JournalLine
+from apps.finance.services.balances import compute_account_balances
+from apps.finance.services.ledger_analytics import MINOR_UNITS, load_ledger
+
+
+def _orm_period_matrix(company, fiscal_year):
+    matrix = defaultdict(int)
+    balances = compute_account_balances(company, fiscal_year)
+    for (_, _, account_id, period, _, _), (debit, credit) in balances.items():
+        matrix[(account_id, period)] += int((debit - credit) * MINOR_UNITS)
+    return {key: value for key, value in matrix.items() if value}
+
+
+def _orm_project_pivot(company, fiscal_year):
+    rows = (
+        JournalLine.objects
+        .filter(company=company, fiscal_year=fiscal_year, is_posted=True)
+        .values('project', 'cost_center')
+        .annotate(debit=Sum('debit'), credit=Sum('credit'))
+        .order_by()
+    )
+    pivot = {}
+    for row in rows:
+        net = int(((row['debit'] or 0) - (row['credit'] or 0)) * MINOR_UNITS)
+        if net:
+            pivot[(row['project'] or 0, row['cost_center'] or 0)] = net
+    return pivot
+
+
+def _numpy_period_matrix(frame):
+    account_ids, matrix = frame.period_matrix()
+    return {
+        (int(account_ids[row]), int(column) + 1): int(matrix[row, column])
+        for row, column in zip(*matrix.nonzero())
+    }
+
+
+def _numpy_project_pivot(frame):
+    project_ids, cost_center_ids, matrix = frame.pivot('project', 'cost_center')
+    return {
+        (int(project_ids[row]), int(cost_center_ids[column])): int(matrix[row, column])
+        for row, column in zip(*matrix.nonzero())
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the NumPy ledger analytics with the ORM aggregates on an "
+        "account × period matrix and a project × cost center pivot."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', required=True, help="Company code")
+        parser.add_argument('--year', type=int, required=True, help="Fiscal year")
+        parser.add_argument('--repeat', type=int, default=3, help="Best of N runs")
+
+    def _time(self, func, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return result, best
+
+    def handle(self, *args, **options):
+        try:
+            company = Company.objects.get(code=options['company'])
+            fiscal_year = FiscalYear.objects.get(company=company, year=options['year'])
+        except (Company.DoesNotExist, FiscalYear.DoesNotExist) as exc:
+            raise CommandError(str(exc))
+
+        repeat = max(1, options['repeat'])
+
+        frame, load_time = self._time(lambda: load_ledger(company, fiscal_year), repeat)
+        self.stdout.write(f"Loaded {len(frame)} lines into arrays in {load_time:.3f}s.")
+
+        benchmarks = (
+            ('account × period', _orm_period_matrix, _numpy_period_matrix),
+            ('project × cost center', _orm_project_pivot, _numpy_project_pivot),
+        )
+        for name, orm, vectorized in benchmarks:
+            expected, orm_time = self._time(lambda: orm(company, fiscal_year), repeat)
+            result, numpy_time = self._time(lambda: vectorized(frame), repeat)
+            if result != expected:
+                raise CommandError(f"{name}: NumPy and ORM results differ.")
+            self.stdout.write(
+                f"{name}: ORM {orm_time:.3f}s, "
+                f"NumPy {numpy_time:.3f}s (+{load_time:.3f}s load), "
+                f"{len(result)} cells match."
+            )
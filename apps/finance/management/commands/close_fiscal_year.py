@@ -0,0 +1,50 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.models import Company, FiscalYear
+from apps.finance.models import Account
+from apps.finance.services.year_end import close_fiscal_year
+
+
+class Command(BaseCommand):
+    help = "Close a fiscal year and post its opening balances into the next one."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', required=True, help="Company code")
+        parser.add_argument('--year', type=int, required=True, help="Fiscal year to close")
+        parser.add_argument('--next-year', type=int, help="Defaults to --year + 1")
+        parser.add_argument(
+            '--retained-earnings',
+            required=True,
+            help="Account code receiving the net result"
+        )
+        parser.add_argument('--document-type', default='JE')
+
+    def handle(self, *args, **options):
+        try:
+            company = Company.objects.get(code=options['company'])
+            fiscal_year = FiscalYear.objects.get(company=company, year=options['year'])
+            next_fiscal_year = FiscalYear.objects.get(
+                company=company,
+                year=options['next_year'] or options['year'] + 1
+            )
+            account = Account.objects.get(
+                company=company,
+                code=options['retained_earnings']
+            )
+        except (Company.DoesNotExist, FiscalYear.DoesNotExist, Account.DoesNotExist) as exc:
+            raise CommandError(str(exc))
+
+        try:
+            entry = close_fiscal_year(
+                fiscal_year,
+                next_fiscal_year,
+                account,
+                document_type_code=options['document_type']
+            )
+        except ValidationError as exc:
+            raise CommandError(" ".join(exc.messages))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Closed {fiscal_year}; opening entry {entry.document_number}."
+        ))
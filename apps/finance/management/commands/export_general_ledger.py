@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.models import Company, FiscalYear
+from apps.finance.services.gl_export import write_general_ledger
+
+
+class Command(BaseCommand):
+    help = "Export posted journal lines of a company to a gzip CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Output file, e.g. gl-2026.csv.gz")
+        parser.add_argument('--company', required=True, help="Company code")
+        parser.add_argument('--year', type=int, help="Fiscal year")
+
+    def handle(self, *args, **options):
+        try:
+            company = Company.objects.get(code=options['company'])
+        except Company.DoesNotExist:
+            raise CommandError(f"Unknown company {options['company']}.")
+
+        fiscal_year = None
+        if options['year']:
+            try:
+                fiscal_year = FiscalYear.objects.get(
+                    company=company,
+                    year=options['year']
+                )
+            except FiscalYear.DoesNotExist:
+                raise CommandError(f"Unknown fiscal year {options['year']}.")
+
+        count = write_general_ledger(
+            options['output'],
+            company,
+            fiscal_year=fiscal_year
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {count} lines to {options['output']}."
+        ))
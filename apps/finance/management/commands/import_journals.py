@@ -0,0 +1,67 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.models import Company
+from apps.finance.services.journal_import import COLUMNS, import_journals
+
+
+class Command(BaseCommand):
+    help = (
+        "Import posted journal entries from a CSV or JSONL file. "
+        f"Columns: {', '.join(COLUMNS)}."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSONL file")
+        parser.add_argument('--company', required=True, help="Company code")
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument(
+            '--format',
+            choices=('csv', 'jsonl'),
+            help="File format (defaults to the file extension)"
+        )
+        parser.add_argument(
+            '--document-type',
+            default='JE',
+            help="Document type used to number entries without a number"
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help="Checkpoint name (default: the absolute path of the file)"
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help="Skip the rows recorded in the checkpoint"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            company = Company.objects.get(code=options['company'])
+        except Company.DoesNotExist:
+            raise CommandError(f"Unknown company {options['company']}.")
+
+        def report(rows, entries, lines):
+            self.stdout.write(f"{rows} rows read, {entries} entries / {lines} lines imported")
+
+        try:
+            entries, lines = import_journals(
+                options['path'],
+                company,
+                chunk_size=options['chunk_size'],
+                document_type_code=options['document_type'],
+                checkpoint=options['checkpoint'],
+                resume=options['resume'],
+                file_format=options['format'],
+                on_chunk=report
+            )
+        except ValidationError as exc:
+            for message in exc.messages:
+                self.stderr.write(message)
+            raise CommandError("Import stopped; fix the file and rerun with --resume.")
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {entries} entries with {lines} lines."
+        ))
@@ -0,0 +1,81 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.models import Company, FiscalYear
+from apps.finance.services.partitioning import (
+    attach_partition,
+    create_partitions,
+    detach_partition,
+    is_partitioned,
+    list_partitions,
+    partition_journal_lines,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Manage fiscal year partitions of the journal line table (PostgreSQL only). "
+        "'convert' partitions the table once, 'create' adds partitions for new "
+        "fiscal years, 'detach'/'attach' archive or restore a closed year."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'action',
+            choices=['status', 'convert', 'create', 'detach', 'attach']
+        )
+        parser.add_argument('--company', help="Company code")
+        parser.add_argument('--year', type=int, help="Fiscal year (requires --company)")
+
+    def _fiscal_years(self, options):
+        fiscal_years = FiscalYear.objects.order_by('pk')
+        if options['company']:
+            try:
+                company = Company.objects.get(code=options['company'])
+            except Company.DoesNotExist:
+                raise CommandError(f"Unknown company {options['company']}.")
+            fiscal_years = fiscal_years.filter(company=company)
+        if options['year']:
+            if not options['company']:
+                raise CommandError("--year requires --company.")
+            fiscal_years = fiscal_years.filter(year=options['year'])
+        return fiscal_years
+
+    def _fiscal_year(self, options):
+        if not options['year']:
+            raise CommandError(f"{options['action']} requires --company and --year.")
+        fiscal_year = self._fiscal_years(options).first()
+        if fiscal_year is None:
+            raise CommandError(f"Unknown fiscal year {options['year']}.")
+        return fiscal_year
+
+    def handle(self, *args, **options):
+        action = options['action']
+
+        try:
+            if action == 'status':
+                if not is_partitioned():
+                    self.stdout.write("Journal lines are not partitioned.")
+                    return
+                for name in list_partitions():
+                    self.stdout.write(name)
+                return
+
+            if action == 'convert':
+                created = partition_journal_lines()
+            elif action == 'create':
+                created = create_partitions(self._fiscal_years(options))
+            elif action == 'detach':
+                name = detach_partition(self._fiscal_year(options))
+                self.stdout.write(self.style.SUCCESS(f"Detached {name}."))
+                return
+            else:
+                name = attach_partition(self._fiscal_year(options))
+                self.stdout.write(self.style.SUCCESS(f"Attached {name}."))
+                return
+        except ValidationError as exc:
+            raise CommandError(" ".join(exc.messages))
+
+        for name in created:
+            self.stdout.write(name)
+        self.stdout.write(self.style.SUCCESS(f"Created {len(created)} partitions."))
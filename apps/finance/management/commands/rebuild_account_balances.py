@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.models import Company, FiscalYear
+from apps.finance.services.balances import (
+    rebuild_account_balances,
+    verify_account_balances,
+)
+
+
+class Command(BaseCommand):
+    help = "Rebuild the account period balance table from posted journal lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help="Company code")
+        parser.add_argument('--year', type=int, help="Fiscal year (requires --company)")
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help="Only compare the table with the ledger, do not rebuild"
+        )
+
+    def handle(self, *args, **options):
+        company = None
+        fiscal_year = None
+
+        if options['company']:
+            try:
+                company = Company.objects.get(code=options['company'])
+            except Company.DoesNotExist:
+                raise CommandError(f"Unknown company {options['company']}.")
+
+        if options['year']:
+            if not company:
+                raise CommandError("--year requires --company.")
+            try:
+                fiscal_year = FiscalYear.objects.get(
+                    company=company,
+                    year=options['year']
+                )
+            except FiscalYear.DoesNotExist:
+                raise CommandError(f"Unknown fiscal year {options['year']}.")
+
+        if not options['verify_only']:
+            count = rebuild_account_balances(company, fiscal_year)
+            self.stdout.write(f"Wrote {count} balance rows.")
+
+        mismatches = verify_account_balances(company, fiscal_year)
+        for key, stored, expected in mismatches:
+            self.stderr.write(f"Mismatch {key}: stored {stored}, ledger {expected}")
+
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} balance rows do not match the ledger.")
+
+        self.stdout.write(self.style.SUCCESS("Account balances match the ledger."))
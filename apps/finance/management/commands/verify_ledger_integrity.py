@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.models import Company, FiscalYear
+from apps.finance.services.integrity import reseal_ledger, verify_ledger
+
+
+class Command(BaseCommand):
+    help = (
+        "Verify posted journal lines against their per-period seals. "
+        "Only periods changed since the last run are checked unless --full is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help="Company code")
+        parser.add_argument('--year', type=int, help="Fiscal year for --reseal (requires --company)")
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help="Check every period, including lines that were never sealed"
+        )
+        parser.add_argument(
+            '--reseal',
+            action='store_true',
+            help="Accept the current ledger and recompute the seals"
+        )
+
+    def handle(self, *args, **options):
+        company = None
+        fiscal_year = None
+
+        if options['company']:
+            try:
+                company = Company.objects.get(code=options['company'])
+            except Company.DoesNotExist:
+                raise CommandError(f"Unknown company {options['company']}.")
+
+        if options['year']:
+            if not company:
+                raise CommandError("--year requires --company.")
+            try:
+                fiscal_year = FiscalYear.objects.get(
+                    company=company,
+                    year=options['year']
+                )
+            except FiscalYear.DoesNotExist:
+                raise CommandError(f"Unknown fiscal year {options['year']}.")
+
+        if options['reseal']:
+            count = reseal_ledger(company, fiscal_year)
+            self.stdout.write(self.style.SUCCESS(f"Sealed {count} periods."))
+            return
+
+        checksums = verify_ledger(company, full=options['full'])
+        failed = [checksum for checksum in checksums if not checksum.is_valid]
+        for checksum in failed:
+            self.stderr.write(f"{checksum}: {checksum.problem}")
+
+        if failed:
+            raise CommandError(f"{len(failed)} of {len(checksums)} periods failed verification.")
+
+        self.stdout.write(self.style.SUCCESS(f"Verified {len(checksums)} periods."))
@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_userprofile_roles'),
+        ('finance', '0003_journalline_cost_center_journalline_project'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journalentry',
+            name='branch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='journal_entries', to='core.branch'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 6.0.1 on 2026-10-17 12:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+
+def build_balances(apps, schema_editor):
+    FiscalYear = apps.get_model('core', 'FiscalYear')
+    JournalLine = apps.get_model('finance', 'JournalLine')
+    AccountPeriodBalance = apps.get_model('finance', 'AccountPeriodBalance')
+
+    starts = dict(FiscalYear.objects.values_list('pk', 'start_date'))
+
+    rows = (
+        JournalLine.objects
+        .filter(journal_entry__is_posted=True)
+        .annotate(month=TruncMonth('journal_entry__date'))
+        .values(
+            'journal_entry__company',
+            'journal_entry__fiscal_year',
+            'month',
+            'account',
+            'project',
+            'cost_center',
+        )
+        .annotate(debit=Sum('debit'), credit=Sum('credit'))
+        .order_by()
+    )
+
+    balances = []
+    for row in rows:
+        start = starts[row['journal_entry__fiscal_year']]
+        month = row['month']
+        balances.append(AccountPeriodBalance(
+            company_id=row['journal_entry__company'],
+            fiscal_year_id=row['journal_entry__fiscal_year'],
+            account_id=row['account'],
+            period=(month.year - start.year) * 12 + month.month - start.month + 1,
+            project_id=row['project'],
+            cost_center_id=row['cost_center'],
+            debit=row['debit'] or 0,
+            credit=row['credit'] or 0,
+        ))
+
+    AccountPeriodBalance.objects.bulk_create(balances, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_userprofile_roles'),
+        ('finance', '0004_journalentry_branch'),
+        ('projects', '0002_projectcostcenter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountPeriodBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.PositiveSmallIntegerField()),
+                ('debit', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_balances', to='finance.account')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='account_balances', to='core.company')),
+                ('cost_center', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='account_balances', to='projects.projectcostcenter')),
+                ('fiscal_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='account_balances', to='core.fiscalyear')),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='account_balances', to='projects.project')),
+            ],
+            options={
+                'verbose_name': 'Account Period Balance',
+                'verbose_name_plural': 'Account Period Balances',
+                'constraints': [models.UniqueConstraint(fields=('company', 'fiscal_year', 'account', 'period', 'project', 'cost_center'), name='finance_unique_account_period_balance', nulls_distinct=False)],
+            },
+        ),
+        migrations.RunPython(build_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.0.1 on 2026-10-17 13:10
+
+from django.db import migrations, models
+
+
+def build_paths(apps, schema_editor):
+    Account = apps.get_model('finance', 'Account')
+
+    parents = dict(Account.objects.values_list('pk', 'parent_id'))
+    paths = {}
+
+    def path_of(pk):
+        if pk not in paths:
+            parent_id = parents[pk]
+            paths[pk] = (path_of(parent_id) if parent_id else '') + f"{pk}/"
+        return paths[pk]
+
+    accounts = []
+    for pk in parents:
+        path = path_of(pk)
+        accounts.append(Account(pk=pk, path=path, depth=path.count('/') - 1))
+
+    Account.objects.bulk_update(accounts, ['path', 'depth'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0005_accountperiodbalance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(build_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-17 14:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_userprofile_roles'),
+        ('finance', '0006_account_path'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='journalentry',
+            name='document_number',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddConstraint(
+            model_name='journalentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('document_number', ''), _negated=True), fields=('document_number',), name='finance_unique_journal_document_number'),
+        ),
+    ]
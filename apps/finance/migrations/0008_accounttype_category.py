@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0007_journalentry_document_number_unique_when_set'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accounttype',
+            name='category',
+            field=models.CharField(blank=True, choices=[('asset', 'Asset'), ('liability', 'Liability'), ('equity', 'Equity'), ('revenue', 'Revenue'), ('expense', 'Expense')], help_text='Balance sheet categories are carried forward at year end', max_length=20),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 6.0.1 on 2026-10-17 16:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+BATCH_SIZE = 10000
+
+
+def copy_entry_fields(apps, schema_editor):
+    """
+    Backfill the copied entry fields in batches of line ids,
+    one UPDATE per batch, each committed on its own.
+    """
+    JournalEntry = apps.get_model('finance', 'JournalEntry')
+    JournalLine = apps.get_model('finance', 'JournalLine')
+
+    def entry_field(name):
+        return Subquery(
+            JournalEntry.objects.filter(
+                pk=OuterRef('journal_entry_id')
+            ).values(name)[:1]
+        )
+
+    last_id = JournalLine.objects.aggregate(last=Max('id'))['last'] or 0
+    for start in range(0, last_id + 1, BATCH_SIZE):
+        JournalLine.objects.filter(
+            id__gte=start,
+            id__lt=start + BATCH_SIZE
+        ).update(
+            company_id=entry_field('company_id'),
+            fiscal_year_id=entry_field('fiscal_year_id'),
+            date=entry_field('date'),
+            is_posted=entry_field('is_posted')
+        )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_userprofile_roles'),
+        ('finance', '0008_accounttype_category'),
+        ('projects', '0002_projectcostcenter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journalline',
+            name='company',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='journal_lines', to='core.company'),
+        ),
+        migrations.AddField(
+            model_name='journalline',
+            name='date',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='journalline',
+            name='fiscal_year',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='journal_lines', to='core.fiscalyear'),
+        ),
+        migrations.AddField(
+            model_name='journalline',
+            name='is_posted',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(copy_entry_fields, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='journalline',
+            index=models.Index(fields=['company', 'fiscal_year', 'account'], include=('is_posted', 'debit', 'credit'), name='finance_jl_company_fy_account'),
+        ),
+        migrations.AddIndex(
+            model_name='journalline',
+            index=models.Index(fields=['company', 'project', 'cost_center', 'date'], include=('is_posted', 'debit', 'credit'), name='finance_jl_company_project_cc'),
+        ),
+    ]
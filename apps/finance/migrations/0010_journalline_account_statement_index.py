@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-17 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_userprofile_roles'),
+        ('finance', '0009_journalline_entry_fields'),
+        ('projects', '0002_projectcostcenter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='journalline',
+            index=models.Index(condition=models.Q(('is_posted', True)), fields=['account', 'fiscal_year', 'date', 'journal_entry', 'id'], include=('debit', 'credit'), name='finance_jl_account_statement'),
+        ),
+    ]
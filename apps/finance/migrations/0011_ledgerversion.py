@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-17 19:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_userprofile_roles'),
+        ('finance', '0010_journalline_account_statement_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_versions', to='core.company')),
+                ('fiscal_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_versions', to='core.fiscalyear')),
+            ],
+            options={
+                'verbose_name': 'Ledger Version',
+                'verbose_name_plural': 'Ledger Versions',
+                'constraints': [models.UniqueConstraint(fields=('company', 'fiscal_year'), name='finance_unique_ledger_version')],
+            },
+        ),
+    ]
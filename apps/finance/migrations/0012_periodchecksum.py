@@ -0,0 +1,37 @@
+# Generated by Django 6.0.1 on 2026-10-17 20:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_userprofile_roles'),
+        ('finance', '0011_ledgerversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodChecksum',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.PositiveSmallIntegerField()),
+                ('debit', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('line_count', models.PositiveIntegerField(default=0)),
+                ('digest', models.CharField(default='0000000000000000000000000000000000000000000000000000000000000000', max_length=64)),
+                ('is_dirty', models.BooleanField(default=False)),
+                ('is_valid', models.BooleanField(default=True)),
+                ('problem', models.TextField(blank=True)),
+                ('verified_at', models.DateTimeField(blank=True, null=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_checksums', to='core.company')),
+                ('fiscal_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_checksums', to='core.fiscalyear')),
+            ],
+            options={
+                'verbose_name': 'Period Checksum',
+                'verbose_name_plural': 'Period Checksums',
+                'constraints': [models.UniqueConstraint(fields=('company', 'fiscal_year', 'period'), name='finance_unique_period_checksum')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-17 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_userprofile_roles'),
+        ('finance', '0012_periodchecksum'),
+        ('projects', '0002_projectcostcenter'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='accountperiodbalance',
+            name='finance_unique_account_period_balance',
+        ),
+        migrations.AddConstraint(
+            model_name='accountperiodbalance',
+            constraint=models.UniqueConstraint(condition=models.Q(('cost_center__isnull', False), ('project__isnull', False)), fields=('company', 'fiscal_year', 'account', 'period', 'project', 'cost_center'), name='finance_unique_account_period_balance'),
+        ),
+        migrations.AddConstraint(
+            model_name='accountperiodbalance',
+            constraint=models.UniqueConstraint(condition=models.Q(('cost_center__isnull', True), ('project__isnull', False)), fields=('company', 'fiscal_year', 'account', 'period', 'project'), name='finance_unique_account_period_balance_project'),
+        ),
+        migrations.AddConstraint(
+            model_name='accountperiodbalance',
+            constraint=models.UniqueConstraint(condition=models.Q(('cost_center__isnull', False), ('project__isnull', True)), fields=('company', 'fiscal_year', 'account', 'period', 'cost_center'), name='finance_unique_account_period_balance_cost_center'),
+        ),
+        migrations.AddConstraint(
+            model_name='accountperiodbalance',
+            constraint=models.UniqueConstraint(condition=models.Q(('cost_center__isnull', True), ('project__isnull', True)), fields=('company', 'fiscal_year', 'account', 'period'), name='finance_unique_account_period_balance_unallocated'),
+        ),
+    ]
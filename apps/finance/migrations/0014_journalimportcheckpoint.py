@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-17 21:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_userprofile_roles'),
+        ('finance', '0013_accountperiodbalance_partial_unique_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JournalImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=255)),
+                ('source', models.CharField(max_length=500)),
+                ('rows', models.PositiveBigIntegerField(default=0)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='journal_import_checkpoints', to='core.company')),
+            ],
+            options={
+                'verbose_name': 'Journal Import Checkpoint',
+                'verbose_name_plural': 'Journal Import Checkpoints',
+                'constraints': [models.UniqueConstraint(fields=('company', 'name'), name='finance_unique_journal_import_checkpoint')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-17 22:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_userprofile_roles'),
+        ('finance', '0014_journalimportcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodChecksumDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.PositiveSmallIntegerField()),
+                ('debit', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('line_count', models.PositiveIntegerField(default=0)),
+                ('digest', models.CharField(default='0000000000000000000000000000000000000000000000000000000000000000', max_length=64)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_checksum_deltas', to='core.company')),
+                ('fiscal_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_checksum_deltas', to='core.fiscalyear')),
+            ],
+            options={
+                'verbose_name': 'Period Checksum Delta',
+                'verbose_name_plural': 'Period Checksum Deltas',
+                'indexes': [models.Index(fields=['company', 'fiscal_year', 'period'], name='finance_checksum_delta_period')],
+            },
+        ),
+    ]
@@ -1,19 +1,50 @@
-from django.db import models
-from apps.core.models import Company, TimeStampedModel
+from django.db import models, transaction
+from apps.core.models import Company, CompanyQuerySet, TimeStampedModel
 from django.core.exceptions import ValidationError
-from django.db.models import Sum
-from apps.core.models import FiscalYear
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Concat, Substr
+from apps.core.models import Branch, FiscalYear
 from apps.core.models import Company
 from apps.core.models import TimeStampedModel
-from apps.core.services import get_next_document_number
+from apps.core.services import (
+    get_next_document_number,
+    get_next_document_numbers,
+    get_open_fiscal_year,
+)
 from apps.projects.models import Project, ProjectCostCenter
 
 class AccountType(models.Model):
     """
     High-level accounting classification.
     """
+    CATEGORY_ASSET = 'asset'
+    CATEGORY_LIABILITY = 'liability'
+    CATEGORY_EQUITY = 'equity'
+    CATEGORY_REVENUE = 'revenue'
+    CATEGORY_EXPENSE = 'expense'
+
+    CATEGORY_CHOICES = (
+        (CATEGORY_ASSET, 'Asset'),
+        (CATEGORY_LIABILITY, 'Liability'),
+        (CATEGORY_EQUITY, 'Equity'),
+        (CATEGORY_REVENUE, 'Revenue'),
+        (CATEGORY_EXPENSE, 'Expense'),
+    )
+
+    BALANCE_SHEET_CATEGORIES = (
+        CATEGORY_ASSET,
+        CATEGORY_LIABILITY,
+        CATEGORY_EQUITY,
+    )
+
     code = models.CharField(max_length=20, unique=True)
     name = models.CharField(max_length=100)
+    category = models.CharField(
+        max_length=20,
+        choices=CATEGORY_CHOICES,
+        blank=True,
+        help_text="Balance sheet categories are carried forward at year end"
+    )
 
     class Meta:
         verbose_name = "Account Type"
@@ -23,10 +54,44 @@ class AccountType(models.Model):
         return self.name
 
 
+class AccountQuerySet(CompanyQuerySet):
+
+    def descendants_of(self, account, include_self=False):
+        descendants = self.filter(path__startswith=account.path)
+        if not include_self:
+            descendants = descendants.exclude(pk=account.pk)
+        return descendants
+
+    def ancestors_of(self, account, include_self=False):
+        ids = [int(pk) for pk in account.path.split('/') if pk]
+        if not include_self:
+            ids = ids[:-1]
+        return self.filter(pk__in=ids).order_by('depth')
+
+    def subtree_aggregate(self, account, **filters):
+        """
+        Debit/credit totals of `account` and all its descendants,
+        read from the account period balances in one query.
+        Extra filters apply to the balances (fiscal_year, period__lte, ...).
+        """
+        totals = AccountPeriodBalance.objects.filter(
+            account__path__startswith=account.path,
+            **filters
+        ).aggregate(
+            debit=Sum('debit'),
+            credit=Sum('credit')
+        )
+        return {
+            'debit': totals['debit'] or 0,
+            'credit': totals['credit'] or 0,
+        }
+
+
 class Account(TimeStampedModel):
     """
     Chart of Account node.
     Supports hierarchy via self-relation.
+    `path` materializes the ancestor ids ("1/7/42/") for subtree queries.
     """
     company = models.ForeignKey(
         Company,
@@ -56,6 +121,16 @@ class Account(TimeStampedModel):
         help_text="If false, cannot be used in journal entries"
     )
 
+    path = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        db_index=True
+    )
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    objects = AccountQuerySet.as_manager()
+
     class Meta:
         unique_together = ('company', 'code')
         ordering = ('code',)
@@ -64,6 +139,128 @@ class Account(TimeStampedModel):
 
     def __str__(self):
         return f"{self.code} - {self.name}"
+
+    def clean(self):
+        if self.parent_id and self.pk and self.parent.path.startswith(self.path):
+            raise ValidationError("Account cannot be moved under itself.")
+
+    def save(self, *args, **kwargs):
+        """
+        Keep the materialized path of the account and,
+        when it moves, of its whole subtree current.
+        """
+        old_path = self.path
+        parent_path = self.parent.path if self.parent_id else ''
+        if old_path and parent_path.startswith(old_path):
+            raise ValidationError("Account cannot be moved under itself.")
+
+        super().save(*args, **kwargs)
+
+        new_path = f"{parent_path}{self.pk}/"
+        if new_path == old_path:
+            return
+
+        new_depth = new_path.count('/') - 1
+        Account.objects.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+
+        if old_path:
+            Account.objects.filter(
+                path__startswith=old_path
+            ).exclude(pk=self.pk).update(
+                path=Concat(Value(new_path), Substr('path', len(old_path) + 1)),
+                depth=F('depth') + new_depth - self.depth
+            )
+
+        self.path = new_path
+        self.depth = new_depth
+
+
+class JournalEntryQuerySet(CompanyQuerySet):
+
+    def post_many(self, entries, document_type):
+        """
+        Post several draft entries at once.
+
+        Balances are checked with one grouped aggregate, document numbers
+        are reserved as one range per company and fiscal year, and the
+        entries are updated with bulk_update.
+        Returns {entry id: error message} for entries that were not posted.
+        Raises ValueError if an entry has not been saved.
+        """
+        from apps.finance.services.balances import apply_journal_entries
+
+        entries = list(entries)
+        if any(entry.pk is None for entry in entries):
+            raise ValueError("post_many() entries must be saved first.")
+        errors = {}
+
+        companies = Company.objects.in_bulk({entry.company_id for entry in entries})
+        totals = {
+            row['journal_entry']: row
+            for row in JournalLine.objects.filter(
+                journal_entry__in=entries
+            ).values('journal_entry').annotate(
+                debit=Sum('debit'),
+                credit=Sum('credit')
+            )
+        }
+
+        candidates = []
+        for entry in entries:
+            row = totals.get(entry.pk, {})
+            if (row.get('debit') or 0) != (row.get('credit') or 0):
+                errors[entry.pk] = "Journal entry is not balanced."
+                continue
+
+            try:
+                fiscal_year = get_open_fiscal_year(companies[entry.company_id], entry.date)
+            except ValidationError as exc:
+                errors[entry.pk] = exc.messages[0]
+                continue
+            if fiscal_year.pk != entry.fiscal_year_id:
+                errors[entry.pk] = "Entry date is outside the fiscal year."
+                continue
+
+            entry.company = companies[entry.company_id]
+            entry.fiscal_year = fiscal_year
+            candidates.append(entry)
+
+        with transaction.atomic():
+            unposted = set(
+                self.model.objects.select_for_update().filter(
+                    pk__in=[entry.pk for entry in candidates],
+                    is_posted=False
+                ).values_list('pk', flat=True)
+            )
+
+            groups = {}
+            for entry in candidates:
+                if entry.pk not in unposted:
+                    errors[entry.pk] = "Journal entry already posted."
+                    continue
+                groups.setdefault((entry.company, entry.fiscal_year), []).append(entry)
+
+            posted = []
+            for (company, fiscal_year), group in groups.items():
+                numbers = get_next_document_numbers(
+                    company, fiscal_year, document_type, len(group)
+                )
+                for entry, number in zip(group, numbers):
+                    entry.document_number = number
+                    entry.is_posted = True
+                posted.extend(group)
+
+            self.model.objects.bulk_update(
+                posted,
+                ['document_number', 'is_posted'],
+                batch_size=1000
+            )
+            JournalLine.objects.filter(journal_entry__in=posted).update(is_posted=True)
+            apply_journal_entries(posted)
+
+        return errors
+
+
 class JournalEntry(TimeStampedModel):
     """
     Accounting journal entry (header).
@@ -78,10 +275,16 @@ class JournalEntry(TimeStampedModel):
         on_delete=models.PROTECT,
         related_name='journal_entries'
     )
+    branch = models.ForeignKey(
+        Branch,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='journal_entries'
+    )
 
     document_number = models.CharField(
         max_length=100,
-        unique=True,
         blank=True
     )
     date = models.DateField()
@@ -89,8 +292,18 @@ class JournalEntry(TimeStampedModel):
 
     is_posted = models.BooleanField(default=False)
 
+    objects = JournalEntryQuerySet.as_manager()
+
     class Meta:
         ordering = ('-date',)
+        constraints = [
+            # Drafts have no number yet, so only numbered entries are unique.
+            models.UniqueConstraint(
+                fields=('document_number',),
+                condition=~models.Q(document_number=''),
+                name='finance_unique_journal_document_number'
+            ),
+        ]
         verbose_name = "Journal Entry"
         verbose_name_plural = "Journal Entries"
 
@@ -101,14 +314,46 @@ class JournalEntry(TimeStampedModel):
         if self.fiscal_year.company != self.company:
             raise ValidationError("Fiscal year does not belong to company.")
 
+        if self.fiscal_year.is_closed:
+            raise ValidationError("Fiscal year is closed.")
+
+    def save(self, *args, **kwargs):
+        """
+        Keep the entry fields copied onto the lines in sync.
+        """
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+
+        update_fields = kwargs.get('update_fields')
+        if adding or (
+            update_fields is not None
+            and not set(update_fields) & set(JournalLine.ENTRY_FIELDS)
+        ):
+            return
+
+        self.lines.update(
+            company=self.company_id,
+            fiscal_year=self.fiscal_year_id,
+            date=self.date,
+            is_posted=self.is_posted
+        )
+
+    @transaction.atomic
     def post(self, document_type):
         """
         Finalize the journal entry.
-        Generates document number and locks the entry.
+        Generates document number, locks the entry
+        and adds its lines to the account period balances.
         """
+        from apps.finance.services.balances import apply_journal_entries
+
         if self.is_posted:
             raise ValidationError("Journal entry already posted.")
 
+        fiscal_year = get_open_fiscal_year(self.company, self.date)
+        if fiscal_year.pk != self.fiscal_year_id:
+            raise ValidationError("Entry date is outside the fiscal year.")
+
         totals = self.lines.aggregate(
             debit=Sum('debit'),
             credit=Sum('credit')
@@ -125,6 +370,8 @@ class JournalEntry(TimeStampedModel):
         self.is_posted = True
         self.save(update_fields=['document_number', 'is_posted'])
 
+        apply_journal_entries([self])
+
 
 class JournalLine(models.Model):
     """
@@ -168,26 +415,299 @@ class JournalLine(models.Model):
         default=0
     )
 
+    # Copied from the journal entry so ledger queries need no join.
+    # Kept in sync by save() here and in JournalEntry.
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        null=True,
+        editable=False,
+        related_name='journal_lines'
+    )
+    fiscal_year = models.ForeignKey(
+        FiscalYear,
+        on_delete=models.PROTECT,
+        null=True,
+        editable=False,
+        related_name='journal_lines'
+    )
+    date = models.DateField(null=True, editable=False)
+    is_posted = models.BooleanField(default=False, editable=False)
+
+    ENTRY_FIELDS = ('company', 'fiscal_year', 'date', 'is_posted')
+
+    objects = CompanyQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Journal Line"
         verbose_name_plural = "Journal Lines"
+        indexes = [
+            models.Index(
+                fields=('company', 'fiscal_year', 'account'),
+                include=('is_posted', 'debit', 'credit'),
+                name='finance_jl_company_fy_account'
+            ),
+            models.Index(
+                fields=('company', 'project', 'cost_center', 'date'),
+                include=('is_posted', 'debit', 'credit'),
+                name='finance_jl_company_project_cc'
+            ),
+            models.Index(
+                fields=('account', 'fiscal_year', 'date', 'journal_entry', 'id'),
+                include=('debit', 'credit'),
+                condition=models.Q(is_posted=True),
+                name='finance_jl_account_statement'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.copy_entry_fields()
+        super().save(*args, **kwargs)
+
+    def copy_entry_fields(self):
+        """
+        Copy company, fiscal year, date and posted flag from the entry.
+        Call before bulk_create, which bypasses save().
+        """
+        entry = self.journal_entry
+        self.company_id = entry.company_id
+        self.fiscal_year_id = entry.fiscal_year_id
+        self.date = entry.date
+        self.is_posted = entry.is_posted
 
     def clean(self):
-        if self.debit and self.credit:
-            raise ValidationError("Line cannot have both debit and credit.")
+        """
+        To validate many lines, use
+        apps.finance.services.line_validation.validate_journal_lines,
+        which loads their references in bulk. Lines whose form set
+        validates them together are marked `validated_as_set` and
+        skipped here.
+        """
+        from apps.finance.services.line_validation import journal_line_errors
 
-        if not self.account.is_postable:
-            raise ValidationError("Account is not postable.")
+        if getattr(self, 'validated_as_set', False):
+            return
+        errors = journal_line_errors(self)
+        if errors:
+            raise ValidationError(errors)
 
-        if self.cost_center:
-            if not self.project:
-                raise ValidationError("Cost center requires a project.")
+    def __str__(self):
+        return f"{self.account} | D:{self.debit} C:{self.credit}"
 
-            if self.cost_center.project != self.project:
-                raise ValidationError("Cost center does not belong to selected project.")
 
-            if not self.cost_center.is_postable:
-                raise ValidationError("Cost center is not postable.")
+class AccountPeriodBalance(models.Model):
+    """
+    Posted debit/credit totals per account and fiscal period.
+    Maintained incrementally by the posting paths
+    (see apps.finance.services.balances).
+    """
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name='account_balances'
+    )
+    fiscal_year = models.ForeignKey(
+        FiscalYear,
+        on_delete=models.CASCADE,
+        related_name='account_balances'
+    )
+    account = models.ForeignKey(
+        Account,
+        on_delete=models.CASCADE,
+        related_name='period_balances'
+    )
+    period = models.PositiveSmallIntegerField()
+
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='account_balances'
+    )
+    cost_center = models.ForeignKey(
+        ProjectCostCenter,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='account_balances'
+    )
+
+    debit = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    class Meta:
+        # One partial constraint per combination of empty allocations:
+        # NULLs are distinct in a plain unique constraint, and SQLite
+        # does not support nulls_distinct=False.
+        constraints = [
+            models.UniqueConstraint(
+                fields=('company', 'fiscal_year', 'account', 'period', 'project', 'cost_center'),
+                condition=models.Q(project__isnull=False, cost_center__isnull=False),
+                name='finance_unique_account_period_balance'
+            ),
+            models.UniqueConstraint(
+                fields=('company', 'fiscal_year', 'account', 'period', 'project'),
+                condition=models.Q(project__isnull=False, cost_center__isnull=True),
+                name='finance_unique_account_period_balance_project'
+            ),
+            models.UniqueConstraint(
+                fields=('company', 'fiscal_year', 'account', 'period', 'cost_center'),
+                condition=models.Q(project__isnull=True, cost_center__isnull=False),
+                name='finance_unique_account_period_balance_cost_center'
+            ),
+            models.UniqueConstraint(
+                fields=('company', 'fiscal_year', 'account', 'period'),
+                condition=models.Q(project__isnull=True, cost_center__isnull=True),
+                name='finance_unique_account_period_balance_unallocated'
+            ),
+        ]
+        verbose_name = "Account Period Balance"
+        verbose_name_plural = "Account Period Balances"
 
     def __str__(self):
-        return f"{self.account} | D:{self.debit} C:{self.credit}"
+        return f"{self.account} | P{self.period} D:{self.debit} C:{self.credit}"
+
+
+class LedgerVersion(models.Model):
+    """
+    Counter bumped whenever postings change the ledger of a company's
+    fiscal year, or the company's accounts, projects or cost centers
+    change. Report results are cached under the current version
+    (see apps.finance.services.report_cache).
+    """
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name='ledger_versions'
+    )
+    fiscal_year = models.ForeignKey(
+        FiscalYear,
+        on_delete=models.CASCADE,
+        related_name='ledger_versions'
+    )
+    version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('company', 'fiscal_year'),
+                name='finance_unique_ledger_version'
+            ),
+        ]
+        verbose_name = "Ledger Version"
+        verbose_name_plural = "Ledger Versions"
+
+    def __str__(self):
+        return f"{self.fiscal_year} v{self.version}"
+
+
+class PeriodChecksum(models.Model):
+    """
+    Sealed totals and content digest of the posted lines of one fiscal
+    period. The posting paths seal their lines as PeriodChecksumDelta
+    rows, which the integrity verifier folds in before it recomputes
+    the period from the ledger and compares
+    (see apps.finance.services.integrity).
+    """
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name='period_checksums'
+    )
+    fiscal_year = models.ForeignKey(
+        FiscalYear,
+        on_delete=models.CASCADE,
+        related_name='period_checksums'
+    )
+    period = models.PositiveSmallIntegerField()
+
+    debit = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    line_count = models.PositiveIntegerField(default=0)
+    digest = models.CharField(max_length=64, default='0' * 64)
+
+    is_dirty = models.BooleanField(default=False)
+    is_valid = models.BooleanField(default=True)
+    problem = models.TextField(blank=True)
+    verified_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('company', 'fiscal_year', 'period'),
+                name='finance_unique_period_checksum'
+            ),
+        ]
+        verbose_name = "Period Checksum"
+        verbose_name_plural = "Period Checksums"
+
+    def __str__(self):
+        return f"{self.fiscal_year} P{self.period}"
+
+
+class JournalImportCheckpoint(TimeStampedModel):
+    """
+    Number of rows of an import file already imported. Saved in the
+    transaction of each imported chunk, so a resumed import never
+    imports a chunk twice (see apps.finance.services.journal_import).
+    """
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name='journal_import_checkpoints'
+    )
+    name = models.CharField(max_length=255)
+    source = models.CharField(max_length=500)
+    rows = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('company', 'name'),
+                name='finance_unique_journal_import_checkpoint'
+            ),
+        ]
+        verbose_name = "Journal Import Checkpoint"
+        verbose_name_plural = "Journal Import Checkpoints"
+
+    def __str__(self):
+        return f"{self.name} ({self.rows} rows)"
+
+
+class PeriodChecksumDelta(models.Model):
+    """
+    Seal of the lines one posting added to a fiscal period. Postings
+    only insert these rows, so they never wait on each other; the
+    integrity verifier folds them into the period's PeriodChecksum
+    (see apps.finance.services.integrity).
+    """
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name='period_checksum_deltas'
+    )
+    fiscal_year = models.ForeignKey(
+        FiscalYear,
+        on_delete=models.CASCADE,
+        related_name='period_checksum_deltas'
+    )
+    period = models.PositiveSmallIntegerField()
+
+    debit = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    line_count = models.PositiveIntegerField(default=0)
+    digest = models.CharField(max_length=64, default='0' * 64)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=('company', 'fiscal_year', 'period'),
+                name='finance_checksum_delta_period'
+            ),
+        ]
+        verbose_name = "Period Checksum Delta"
+        verbose_name_plural = "Period Checksum Deltas"
+
+    def __str__(self):
+        return f"{self.fiscal_year} P{self.period} +{self.line_count}"
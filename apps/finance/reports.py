@@ -0,0 +1,83 @@
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from apps.common.jobs import register_report, report_progress
+from apps.core.models import FiscalYear
+from apps.finance.models import JournalLine
+from apps.finance.services.gl_export import general_ledger_rows, iter_gzip_csv
+from apps.finance.services.project_profitability import get_project_profitability
+from apps.finance.services.trial_balance import get_trial_balance
+
+
+# Background versions of the finance reports (see apps.common.jobs).
+# Params are JSON values: fiscal years by `year`, dates as ISO strings.
+PERMISSION = 'finance.view_journalline'
+
+
+def _fiscal_year(company, year):
+    if year is None:
+        return None
+    fiscal_year = FiscalYear.objects.filter(company=company, year=year).first()
+    if fiscal_year is None:
+        raise ValidationError(f"Unknown fiscal year {year}.")
+    return fiscal_year
+
+
+def _date(value):
+    return datetime.date.fromisoformat(value) if value else None
+
+
+def _json(data):
+    return json.dumps(data, cls=DjangoJSONEncoder).encode('utf-8')
+
+
+@register_report('finance.trial_balance', 'json', 'application/json', permission=PERMISSION)
+def trial_balance_report(company, year, date_from=None, date_to=None, rollup=False):
+    rows = get_trial_balance(
+        company,
+        _fiscal_year(company, year),
+        date_from=_date(date_from),
+        date_to=_date(date_to),
+        rollup=rollup
+    )
+    return _json(rows)
+
+
+@register_report('finance.project_profitability', 'json', 'application/json', permission=PERMISSION)
+def project_profitability_report(company, year=None, date_from=None, date_to=None):
+    projects = get_project_profitability(
+        company,
+        fiscal_year=_fiscal_year(company, year),
+        date_from=_date(date_from),
+        date_to=_date(date_to)
+    )
+    return _json({'projects': projects})
+
+
+@register_report('finance.general_ledger', 'csv.gz', 'application/gzip', permission=PERMISSION)
+def general_ledger_report(company, year=None, date_from=None, date_to=None):
+    filters = dict(
+        fiscal_year=_fiscal_year(company, year),
+        date_from=_date(date_from),
+        date_to=_date(date_to)
+    )
+
+    lines = JournalLine.objects.filter(company=company, is_posted=True)
+    if filters['fiscal_year']:
+        lines = lines.filter(fiscal_year=filters['fiscal_year'])
+    if filters['date_from']:
+        lines = lines.filter(date__gte=filters['date_from'])
+    if filters['date_to']:
+        lines = lines.filter(date__lte=filters['date_to'])
+    total = lines.count() or 1
+
+    def rows():
+        for number, row in enumerate(general_ledger_rows(company, **filters), start=1):
+            if number % 5000 == 0:
+                report_progress(number * 100 // total)
+            yield row
+
+    return iter_gzip_csv(rows())
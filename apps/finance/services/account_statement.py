@@ -0,0 +1,194 @@
+import datetime
+
+from django.db.models import Q, Sum
+
+from apps.core.models import FiscalYear
+from apps.finance.models import AccountPeriodBalance, AccountType, JournalLine
+
+
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(date, entry_id, line_id):
+    return f"{date.isoformat()}.{entry_id}.{line_id}"
+
+
+def decode_cursor(cursor):
+    """
+    Parse a cursor into (date, entry_id, line_id); raises ValueError.
+    """
+    date, entry_id, line_id = cursor.split('.')
+    return datetime.date.fromisoformat(date), int(entry_id), int(line_id)
+
+
+def _through(date, entry_id=None, line_id=None):
+    """
+    Lines ordered at or before the key (date, entry_id, line_id);
+    without ids, every line up to and including `date`.
+    """
+    if entry_id is None:
+        return Q(date__lte=date)
+    return (
+        Q(date__lt=date)
+        | Q(date=date, journal_entry_id__lt=entry_id)
+        | Q(date=date, journal_entry_id=entry_id, id__lte=line_id)
+    )
+
+
+def _after(date, entry_id, line_id):
+    return (
+        Q(date__gt=date)
+        | Q(date=date, journal_entry_id__gt=entry_id)
+        | Q(date=date, journal_entry_id=entry_id, id__gt=line_id)
+    )
+
+
+def _posted_lines(account, fiscal_year):
+    return JournalLine.objects.filter(
+        account=account,
+        fiscal_year=fiscal_year,
+        is_posted=True
+    )
+
+
+def balance_through(account, fiscal_year, date, entry_id=None, line_id=None):
+    """
+    Debit minus credit of the account's posted lines up to a statement key.
+
+    Whole periods before the key's period are read from the account
+    period balance table, so only the lines of one month are summed.
+    """
+    period = fiscal_year.period_of(date)
+
+    totals = AccountPeriodBalance.objects.filter(
+        account=account,
+        fiscal_year=fiscal_year,
+        period__lt=period
+    ).aggregate(debit=Sum('debit'), credit=Sum('credit'))
+    balance = (totals['debit'] or 0) - (totals['credit'] or 0)
+
+    totals = _posted_lines(account, fiscal_year).filter(
+        _through(date, entry_id, line_id),
+        date__gte=fiscal_year.period_start(period)
+    ).aggregate(debit=Sum('debit'), credit=Sum('credit'))
+    return balance + (totals['debit'] or 0) - (totals['credit'] or 0)
+
+
+def brought_forward(account, fiscal_year):
+    """
+    Debit minus credit a balance sheet account brings into `fiscal_year`
+    from earlier years that are not closed yet.
+
+    Closing a year posts its balances as the opening entry of the next
+    one, so the walk back stops at the first closed year. Income
+    statement accounts start every year at zero.
+    """
+    if account.account_type.category not in AccountType.BALANCE_SHEET_CATEGORIES:
+        return 0
+
+    open_years = []
+    for pk, is_closed in FiscalYear.objects.filter(
+        company_id=fiscal_year.company_id,
+        end_date__lt=fiscal_year.start_date
+    ).order_by('-end_date').values_list('pk', 'is_closed'):
+        if is_closed:
+            break
+        open_years.append(pk)
+    if not open_years:
+        return 0
+
+    totals = AccountPeriodBalance.objects.filter(
+        account=account,
+        fiscal_year__in=open_years
+    ).aggregate(debit=Sum('debit'), credit=Sum('credit'))
+    return (totals['debit'] or 0) - (totals['credit'] or 0)
+
+
+def get_account_statement(
+    account,
+    fiscal_year,
+    date_from=None,
+    date_to=None,
+    cursor=None,
+    limit=100
+):
+    """
+    One page of an account statement with a running balance
+    (debit minus credit) within a fiscal year.
+
+    Pages are ordered by (date, entry id, line id) and continue after
+    `cursor`, the `next_cursor` of the previous page, so each page costs
+    the same however deep into the history it starts. The opening
+    balance of a page comes from `balance_through` instead of summing
+    the preceding pages, plus the balance `brought_forward` from
+    earlier years that are not closed.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    lines = _posted_lines(account, fiscal_year)
+
+    if cursor:
+        key = decode_cursor(cursor)
+        lines = lines.filter(_after(*key))
+        opening = balance_through(account, fiscal_year, *key)
+    elif date_from and date_from > fiscal_year.start_date:
+        lines = lines.filter(date__gte=date_from)
+        opening = balance_through(
+            account,
+            fiscal_year,
+            date_from - datetime.timedelta(days=1)
+        )
+    else:
+        opening = 0
+    opening += brought_forward(account, fiscal_year)
+
+    if date_to:
+        lines = lines.filter(date__lte=date_to)
+
+    rows = list(
+        lines
+        .order_by('date', 'journal_entry_id', 'id')
+        .values_list(
+            'id',
+            'journal_entry_id',
+            'date',
+            'journal_entry__document_number',
+            'journal_entry__description',
+            'project__code',
+            'cost_center__code',
+            'debit',
+            'credit',
+        )[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    balance = opening
+    results = []
+    for line_id, entry_id, date, number, description, project, cost_center, debit, credit in rows:
+        balance += debit - credit
+        results.append({
+            'line_id': line_id,
+            'entry_id': entry_id,
+            'date': date,
+            'document_number': number,
+            'description': description,
+            'project': project,
+            'cost_center': cost_center,
+            'debit': debit,
+            'credit': credit,
+            'balance': balance,
+        })
+
+    next_cursor = None
+    if has_more:
+        last = results[-1]
+        next_cursor = encode_cursor(last['date'], last['entry_id'], last['line_id'])
+
+    return {
+        'account_code': account.code,
+        'account_name': account.name,
+        'opening_balance': opening,
+        'closing_balance': balance,
+        'lines': results,
+        'next_cursor': next_cursor,
+    }
@@ -0,0 +1,267 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth
+
+from apps.core.models import FiscalYear
+from apps.core.services import lock_open_fiscal_years
+from apps.finance.models import AccountPeriodBalance, JournalLine, LedgerVersion
+from apps.finance.services.integrity import LINE_FIELDS, seal_lines, seal_rows, stored_date
+
+
+# Balance key:
+# (company_id, fiscal_year_id, account_id, period, project_id, cost_center_id)
+
+def _add(deltas, key, debit, credit):
+    totals = deltas[key]
+    totals[0] += debit or 0
+    totals[1] += credit or 0
+
+
+def bump_ledger_versions(pairs):
+    """
+    Increment the ledger version of every (company_id, fiscal_year_id)
+    pair, so cached reports of those years are recomputed.
+    """
+    for company_id, fiscal_year_id in sorted(set(pairs)):
+        lookup = dict(company_id=company_id, fiscal_year_id=fiscal_year_id)
+        for _ in range(2):
+            if LedgerVersion.objects.filter(**lookup).update(version=F('version') + 1):
+                break
+            try:
+                with transaction.atomic():
+                    LedgerVersion.objects.create(version=1, **lookup)
+                break
+            except IntegrityError:
+                # Created concurrently; retry the update.
+                continue
+
+
+def bump_chart_versions(company_id=None):
+    """
+    Increment the ledger version of every fiscal year of a company
+    (of every company without one). Reports also read account,
+    project and cost center names and hierarchies, which belong to
+    no fiscal year.
+    """
+    fiscal_years = FiscalYear.objects.all()
+    if company_id is not None:
+        fiscal_years = fiscal_years.filter(company_id=company_id)
+    bump_ledger_versions(fiscal_years.values_list('company', 'pk'))
+
+
+def _apply_deltas(deltas):
+    """
+    Add debit/credit deltas to the balance rows, creating missing ones.
+    Keys are processed in sorted order to avoid deadlocks between
+    concurrent postings.
+    """
+    with transaction.atomic():
+        for key in sorted(deltas, key=lambda k: tuple(v or 0 for v in k)):
+            debit, credit = deltas[key]
+            if not debit and not credit:
+                continue
+
+            company_id, fiscal_year_id, account_id, period, project_id, cost_center_id = key
+            lookup = dict(
+                company_id=company_id,
+                fiscal_year_id=fiscal_year_id,
+                account_id=account_id,
+                period=period,
+                project_id=project_id,
+                cost_center_id=cost_center_id,
+            )
+
+            for _ in range(2):
+                updated = AccountPeriodBalance.objects.filter(**lookup).update(
+                    debit=F('debit') + debit,
+                    credit=F('credit') + credit
+                )
+                if updated:
+                    break
+                try:
+                    with transaction.atomic():
+                        AccountPeriodBalance.objects.create(
+                            debit=debit,
+                            credit=credit,
+                            **lookup
+                        )
+                    break
+                except IntegrityError:
+                    # Created concurrently; retry the update.
+                    continue
+
+
+def apply_journal_lines(lines):
+    """
+    Add in-memory lines of freshly posted entries to the balance table
+    and the period seals, then bump the ledger versions. Every line
+    must be saved and have its journal entry attached.
+
+    Raises ValidationError if a fiscal year of the lines was closed
+    meanwhile (see lock_open_fiscal_years).
+
+    The ledger version row is shared by every posting of a fiscal year,
+    so it is bumped last to hold its lock for the shortest time; call
+    this as the last statement of the posting transaction.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for line in lines:
+        entry = line.journal_entry
+        key = (
+            entry.company_id,
+            entry.fiscal_year_id,
+            line.account_id,
+            entry.fiscal_year.period_of(stored_date(entry.date)),
+            line.project_id,
+            line.cost_center_id,
+        )
+        _add(deltas, key, line.debit, line.credit)
+
+    lock_open_fiscal_years(key[1] for key in deltas)
+    _apply_deltas(deltas)
+    seal_lines(lines)
+    bump_ledger_versions(key[:2] for key in deltas)
+
+
+def apply_journal_entries(entries):
+    """
+    Add the lines of freshly posted entries to the balance table and
+    the period seals, reading them with one query, then bump the ledger
+    versions (last, see apply_journal_lines).
+    """
+    fiscal_years = {entry.fiscal_year_id: entry.fiscal_year for entry in entries}
+
+    rows = list(
+        JournalLine.objects
+        .filter(journal_entry__in=entries)
+        .order_by()
+        .values_list(*LINE_FIELDS)
+    )
+
+    deltas = defaultdict(lambda: [0, 0])
+    for _, _, company_id, fiscal_year_id, date, account_id, project_id, cost_center_id, debit, credit in rows:
+        key = (
+            company_id,
+            fiscal_year_id,
+            account_id,
+            fiscal_years[fiscal_year_id].period_of(date),
+            project_id,
+            cost_center_id,
+        )
+        _add(deltas, key, debit, credit)
+
+    lock_open_fiscal_years(fiscal_years)
+    _apply_deltas(deltas)
+    seal_rows(rows, fiscal_years)
+    bump_ledger_versions(key[:2] for key in deltas)
+
+
+def compute_account_balances(company=None, fiscal_year=None):
+    """
+    Aggregate posted lines into balance keys straight from the ledger.
+    Returns {key: [debit, credit]}.
+    """
+    lines = JournalLine.objects.filter(is_posted=True)
+    fiscal_years = FiscalYear.objects.all()
+    if company:
+        lines = lines.filter(company=company)
+        fiscal_years = fiscal_years.filter(company=company)
+    if fiscal_year:
+        lines = lines.filter(fiscal_year=fiscal_year)
+        fiscal_years = fiscal_years.filter(pk=fiscal_year.pk)
+
+    fiscal_years = {fy.pk: fy for fy in fiscal_years}
+
+    rows = (
+        lines
+        .annotate(month=TruncMonth('date'))
+        .values(
+            'company',
+            'fiscal_year',
+            'month',
+            'account',
+            'project',
+            'cost_center',
+        )
+        .annotate(debit=Sum('debit'), credit=Sum('credit'))
+        .order_by()
+    )
+
+    balances = defaultdict(lambda: [0, 0])
+    for row in rows:
+        fiscal_year = fiscal_years[row['fiscal_year']]
+        key = (
+            row['company'],
+            row['fiscal_year'],
+            row['account'],
+            fiscal_year.period_of(row['month']),
+            row['project'],
+            row['cost_center'],
+        )
+        _add(balances, key, row['debit'], row['credit'])
+
+    return balances
+
+
+def _stored_balances(company=None, fiscal_year=None):
+    balances = AccountPeriodBalance.objects.all()
+    if company:
+        balances = balances.filter(company=company)
+    if fiscal_year:
+        balances = balances.filter(fiscal_year=fiscal_year)
+    return balances
+
+
+@transaction.atomic
+def rebuild_account_balances(company=None, fiscal_year=None):
+    """
+    Recreate the balance table from the ledger.
+    Returns the number of balance rows written.
+    """
+    stored = _stored_balances(company, fiscal_year)
+    years = set(stored.values_list('company', 'fiscal_year').distinct())
+    stored.delete()
+
+    balances = compute_account_balances(company, fiscal_year)
+    bump_ledger_versions(years | {key[:2] for key in balances})
+    rows = [
+        AccountPeriodBalance(
+            company_id=key[0],
+            fiscal_year_id=key[1],
+            account_id=key[2],
+            period=key[3],
+            project_id=key[4],
+            cost_center_id=key[5],
+            debit=debit,
+            credit=credit,
+        )
+        for key, (debit, credit) in balances.items()
+    ]
+    AccountPeriodBalance.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def verify_account_balances(company=None, fiscal_year=None):
+    """
+    Compare the balance table with the ledger.
+    Returns a list of (key, stored, expected) for every mismatch.
+    """
+    expected = compute_account_balances(company, fiscal_year)
+
+    stored = defaultdict(lambda: [0, 0])
+    for row in _stored_balances(company, fiscal_year).values_list(
+        'company', 'fiscal_year', 'account', 'period',
+        'project', 'cost_center', 'debit', 'credit'
+    ):
+        _add(stored, row[:6], row[6], row[7])
+
+    mismatches = []
+    for key in set(expected) | set(stored):
+        stored_totals = tuple(stored.get(key, (0, 0)))
+        expected_totals = tuple(expected.get(key, (0, 0)))
+        if stored_totals != expected_totals:
+            mismatches.append((key, stored_totals, expected_totals))
+
+    return mismatches
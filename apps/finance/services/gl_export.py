@@ -0,0 +1,113 @@
+import csv
+import gzip
+import io
+
+from apps.finance.models import JournalLine
+
+
+GL_COLUMNS = (
+    'date',
+    'document_number',
+    'description',
+    'account_code',
+    'account_name',
+    'project',
+    'cost_center',
+    'debit',
+    'credit',
+)
+
+
+def general_ledger_rows(
+    company,
+    fiscal_year=None,
+    date_from=None,
+    date_to=None,
+    chunk_size=5000
+):
+    """
+    Iterate posted journal lines as tuples in GL_COLUMNS order.
+    Uses .iterator(), which streams through a server-side (named)
+    cursor on PostgreSQL, so memory stays constant.
+    """
+    lines = JournalLine.objects.filter(
+        company=company,
+        is_posted=True
+    )
+
+    if fiscal_year:
+        lines = lines.filter(fiscal_year=fiscal_year)
+    if date_from:
+        lines = lines.filter(date__gte=date_from)
+    if date_to:
+        lines = lines.filter(date__lte=date_to)
+
+    return (
+        lines
+        .order_by('date', 'journal_entry_id', 'id')
+        .values_list(
+            'date',
+            'journal_entry__document_number',
+            'journal_entry__description',
+            'account__code',
+            'account__name',
+            'project__code',
+            'cost_center__code',
+            'debit',
+            'credit',
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def iter_gzip_csv(rows, header=GL_COLUMNS, batch_size=1000):
+    """
+    Encode rows as gzip-compressed CSV, yielding compressed chunks.
+    """
+    sink = io.BytesIO()
+    text = io.StringIO()
+    writer = csv.writer(text)
+
+    with gzip.GzipFile(fileobj=sink, mode='wb') as archive:
+
+        def flush():
+            archive.write(text.getvalue().encode('utf-8'))
+            text.seek(0)
+            text.truncate()
+            data = sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+            return data
+
+        writer.writerow(header)
+        pending = 0
+        for row in rows:
+            writer.writerow(row)
+            pending += 1
+            if pending >= batch_size:
+                pending = 0
+                data = flush()
+                if data:
+                    yield data
+
+        data = flush()
+        if data:
+            yield data
+
+    # Closing the archive writes the gzip trailer.
+    yield sink.getvalue()
+
+
+def write_general_ledger(path, company, **filters):
+    """
+    Write the general ledger to a gzip CSV file.
+    Returns the number of lines written.
+    """
+    count = 0
+    with gzip.open(path, 'wt', newline='', encoding='utf-8') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(GL_COLUMNS)
+        for row in general_ledger_rows(company, **filters):
+            writer.writerow(row)
+            count += 1
+    return count
@@ -0,0 +1,487 @@
+import datetime
+import hashlib
+import threading
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from apps.core.models import FiscalYear
+from apps.finance.models import (
+    AccountPeriodBalance,
+    JournalLine,
+    PeriodChecksum,
+    PeriodChecksumDelta,
+)
+
+
+# A period's digest is the sum, modulo 2**256, of the SHA-256 of every
+# posted line's content. The sum does not depend on line order and can
+# be extended line by line, so the posting paths seal new lines without
+# re-reading the period, while any later edit of a sealed line changes
+# the digest recomputed by the verifier.
+#
+# Postings insert their share as PeriodChecksumDelta rows instead of
+# updating the period's PeriodChecksum, which every posting of the
+# period would otherwise wait on; the verifier folds the deltas in.
+MODULUS = 2 ** 256
+
+# How often verify_period re-reads a period that postings keep changing.
+VERIFY_ATTEMPTS = 3
+
+LINE_FIELDS = (
+    'id',
+    'journal_entry_id',
+    'company_id',
+    'fiscal_year_id',
+    'date',
+    'account_id',
+    'project_id',
+    'cost_center_id',
+    'debit',
+    'credit',
+)
+
+
+def stored_date(value):
+    """
+    The date a DateField stores for `value`. Unsaved documents may
+    hold a datetime (e.g. a timezone.now default), which the database
+    keeps as its date in the current time zone.
+    """
+    if isinstance(value, datetime.datetime):
+        return JournalLine._meta.get_field('date').to_python(value)
+    return value
+
+
+def line_digest(
+    line_id,
+    entry_id,
+    company_id,
+    fiscal_year_id,
+    date,
+    account_id,
+    project_id,
+    cost_center_id,
+    debit,
+    credit
+):
+    content = (
+        f"{line_id}|{entry_id}|{company_id}|{fiscal_year_id}|{stored_date(date).isoformat()}|"
+        f"{account_id}|{project_id or ''}|{cost_center_id or ''}|"
+        f"{Decimal(debit):.2f}|{Decimal(credit):.2f}"
+    )
+    return int.from_bytes(hashlib.sha256(content.encode('utf-8')).digest(), 'big')
+
+
+def _summarize(rows, fiscal_years):
+    """
+    Totals per (company_id, fiscal_year_id, period) of rows in
+    LINE_FIELDS order: [debit, credit, line_count, digest].
+    """
+    totals = defaultdict(lambda: [0, 0, 0, 0])
+    for row in rows:
+        key = (row[2], row[3], fiscal_years[row[3]].period_of(row[4]))
+        summary = totals[key]
+        summary[0] += row[8]
+        summary[1] += row[9]
+        summary[2] += 1
+        summary[3] = (summary[3] + line_digest(*row)) % MODULUS
+    return totals
+
+
+def _hex(digest):
+    return f"{digest:064x}"
+
+
+# =========================================================
+# Sealing (posting paths)
+# =========================================================
+
+def seal_rows(rows, fiscal_years):
+    """
+    Seal freshly posted lines, given as LINE_FIELDS tuples, with one
+    PeriodChecksumDelta per period. Inserts only, so concurrent
+    postings into the same period do not wait on each other.
+    """
+    PeriodChecksumDelta.objects.bulk_create([
+        PeriodChecksumDelta(
+            company_id=company_id,
+            fiscal_year_id=fiscal_year_id,
+            period=period,
+            debit=debit,
+            credit=credit,
+            line_count=line_count,
+            digest=_hex(digest)
+        )
+        for (company_id, fiscal_year_id, period), (debit, credit, line_count, digest)
+        in sorted(_summarize(rows, fiscal_years).items())
+    ])
+
+
+def seal_lines(lines):
+    """
+    Seal in-memory lines of freshly posted entries.
+    Every line must be saved and have its journal entry attached.
+    """
+    rows = []
+    fiscal_years = {}
+    for line in lines:
+        entry = line.journal_entry
+        fiscal_years[entry.fiscal_year_id] = entry.fiscal_year
+        rows.append((
+            line.pk,
+            entry.pk,
+            entry.company_id,
+            entry.fiscal_year_id,
+            stored_date(entry.date),
+            line.account_id,
+            line.project_id,
+            line.cost_center_id,
+            line.debit,
+            line.credit,
+        ))
+    seal_rows(rows, fiscal_years)
+
+
+# =========================================================
+# Change tracking (edits outside the posting paths)
+# =========================================================
+
+# Periods edited by the current thread's open transaction.
+_dirty = threading.local()
+
+
+def _flush_dirty():
+    keys = getattr(_dirty, 'keys', set())
+    _dirty.keys = set()
+    if not keys:
+        return
+
+    fiscal_years = FiscalYear.objects.in_bulk({key[1] for key in keys})
+    condition = Q()
+    for company_id, fiscal_year_id, date in keys:
+        fiscal_year = fiscal_years.get(fiscal_year_id)
+        if fiscal_year is None:
+            continue
+        condition |= Q(
+            company_id=company_id,
+            fiscal_year_id=fiscal_year_id,
+            period=fiscal_year.period_of(date)
+        )
+    if condition:
+        PeriodChecksum.objects.filter(condition).update(is_dirty=True)
+
+
+def mark_dirty(company_id, fiscal_year_id, date):
+    """
+    Flag the period of `date` for re-verification once the current
+    transaction commits. The first callback to run flushes every
+    pending period in one UPDATE; the others find nothing to do.
+    """
+    if not (company_id and fiscal_year_id and date):
+        return
+    if not hasattr(_dirty, 'keys'):
+        _dirty.keys = set()
+    _dirty.keys.add((company_id, fiscal_year_id, date))
+    transaction.on_commit(_flush_dirty)
+
+
+# =========================================================
+# Verification
+# =========================================================
+
+def _period_lines(checksum):
+    fiscal_year = checksum.fiscal_year
+    lines = JournalLine.objects.filter(
+        company_id=checksum.company_id,
+        fiscal_year=fiscal_year,
+        is_posted=True,
+        date__gte=fiscal_year.period_start(checksum.period)
+    )
+    if checksum.period < fiscal_year.period_of(fiscal_year.end_date):
+        lines = lines.filter(date__lt=fiscal_year.period_start(checksum.period + 1))
+    return lines
+
+
+def _deltas(checksum):
+    return PeriodChecksumDelta.objects.filter(
+        company_id=checksum.company_id,
+        fiscal_year_id=checksum.fiscal_year_id,
+        period=checksum.period
+    )
+
+
+def _read_deltas(checksum):
+    """
+    {delta id: (debit, credit, line_count, digest)} of a period.
+    """
+    return {
+        pk: (debit, credit, line_count, int(digest, 16))
+        for pk, debit, credit, line_count, digest in _deltas(checksum).values_list(
+            'pk', 'debit', 'credit', 'line_count', 'digest'
+        )
+    }
+
+
+def _check(checksum, sealed):
+    """
+    Recompute one period from the ledger and compare it with the
+    `sealed` (debit, credit, line_count, digest). Returns its problems.
+    """
+    fiscal_year = checksum.fiscal_year
+    rows = _period_lines(checksum).order_by().values_list(*LINE_FIELDS)
+    key = (checksum.company_id, fiscal_year.pk, checksum.period)
+    debit, credit, line_count, digest = _summarize(
+        rows, {fiscal_year.pk: fiscal_year}
+    ).get(key, (0, 0, 0, 0))
+    sealed_debit, sealed_credit, sealed_count, sealed_digest = sealed
+
+    problems = []
+    if debit != credit:
+        problems.append(f"debits {debit} do not equal credits {credit}")
+    if line_count != sealed_count:
+        problems.append(f"{line_count} posted lines, {sealed_count} sealed")
+    if (debit, credit) != (sealed_debit, sealed_credit):
+        problems.append(
+            f"totals {debit}/{credit} differ from sealed {sealed_debit}/{sealed_credit}"
+        )
+    if digest != sealed_digest:
+        problems.append("line content differs from the sealed digest")
+
+    balances = AccountPeriodBalance.objects.filter(
+        company_id=checksum.company_id,
+        fiscal_year=fiscal_year,
+        period=checksum.period
+    ).aggregate(debit=Sum('debit'), credit=Sum('credit'))
+    if ((balances['debit'] or 0), (balances['credit'] or 0)) != (debit, credit):
+        problems.append("account period balances differ from the ledger")
+
+    return problems
+
+
+def verify_period(checksum):
+    """
+    Fold the period's pending deltas into its seal and verify it.
+
+    Postings are not blocked. A posting commits its lines, balances and
+    delta together, so the ledger read is consistent with the deltas
+    when they are the same before and after it; otherwise the period
+    is read again, and left pending after VERIFY_ATTEMPTS tries.
+    Returns the refreshed checksum.
+    """
+    with transaction.atomic():
+        checksum = (
+            PeriodChecksum.objects
+            .select_for_update()
+            .select_related('fiscal_year')
+            .get(pk=checksum.pk)
+        )
+
+        deltas = _read_deltas(checksum)
+        for _ in range(VERIFY_ATTEMPTS):
+            sealed = [checksum.debit, checksum.credit, checksum.line_count, int(checksum.digest, 16)]
+            for debit, credit, line_count, digest in deltas.values():
+                sealed[0] += debit
+                sealed[1] += credit
+                sealed[2] += line_count
+                sealed[3] = (sealed[3] + digest) % MODULUS
+
+            problems = _check(checksum, sealed)
+            deltas_after = _read_deltas(checksum)
+            if deltas_after == deltas:
+                break
+            deltas = deltas_after
+        else:
+            return checksum
+
+        checksum.debit, checksum.credit, checksum.line_count = sealed[:3]
+        checksum.digest = _hex(sealed[3])
+        checksum.is_valid = not problems
+        checksum.problem = "; ".join(problems)
+        checksum.is_dirty = False
+        checksum.verified_at = timezone.now()
+        checksum.save(update_fields=[
+            'debit', 'credit', 'line_count', 'digest',
+            'is_valid', 'problem', 'is_dirty', 'verified_at',
+        ])
+        PeriodChecksumDelta.objects.filter(pk__in=deltas).delete()
+    return checksum
+
+
+def _create_pending_checksums(company=None):
+    """
+    Create the seals of periods that only have deltas so far.
+    """
+    deltas = PeriodChecksumDelta.objects.all()
+    if company:
+        deltas = deltas.filter(company=company)
+    PeriodChecksum.objects.bulk_create(
+        [
+            PeriodChecksum(company_id=company_id, fiscal_year_id=fiscal_year_id, period=period)
+            for company_id, fiscal_year_id, period in sorted(
+                deltas.values_list('company', 'fiscal_year', 'period').distinct().order_by()
+            )
+        ],
+        ignore_conflicts=True
+    )
+
+
+def _pending(checksums):
+    """
+    Checksums flagged by an edit or with deltas to fold in.
+    """
+    return checksums.filter(
+        Q(is_dirty=True)
+        | Exists(PeriodChecksumDelta.objects.filter(
+            company=OuterRef('company'),
+            fiscal_year=OuterRef('fiscal_year'),
+            period=OuterRef('period')
+        ))
+    )
+
+
+def _ensure_checksums(company=None):
+    """
+    Create empty seals for periods that have posted lines but were
+    never sealed, so the verifier reports them.
+    """
+    lines = JournalLine.objects.filter(is_posted=True)
+    if company:
+        lines = lines.filter(company=company)
+
+    fiscal_years = FiscalYear.objects.all()
+    if company:
+        fiscal_years = fiscal_years.filter(company=company)
+    fiscal_years = {fiscal_year.pk: fiscal_year for fiscal_year in fiscal_years}
+
+    periods = {
+        (company_id, fiscal_year_id, fiscal_years[fiscal_year_id].period_of(month))
+        for company_id, fiscal_year_id, month in (
+            lines
+            .annotate(month=TruncMonth('date'))
+            .values_list('company', 'fiscal_year', 'month')
+            .distinct()
+            .order_by()
+        )
+    }
+    existing = set(
+        PeriodChecksum.objects.filter(
+            fiscal_year__in=fiscal_years
+        ).values_list('company', 'fiscal_year', 'period')
+    )
+    PeriodChecksum.objects.bulk_create(
+        [
+            PeriodChecksum(company_id=key[0], fiscal_year_id=key[1], period=key[2])
+            for key in sorted(periods - existing)
+        ],
+        ignore_conflicts=True
+    )
+
+
+def verify_ledger(company=None, full=False):
+    """
+    Verify the periods changed since the last run, or every period
+    with `full` (which also finds lines that were never sealed).
+    Returns the verified checksums.
+    """
+    _create_pending_checksums(company)
+    if full:
+        _ensure_checksums(company)
+
+    checksums = PeriodChecksum.objects.all()
+    if company:
+        checksums = checksums.filter(company=company)
+    if not full:
+        checksums = _pending(checksums)
+
+    return [
+        verify_period(checksum)
+        for checksum in checksums.order_by('company', 'fiscal_year', 'period')
+    ]
+
+
+@transaction.atomic
+def reseal_ledger(company=None, fiscal_year=None):
+    """
+    Recompute the seals from the current ledger, accepting it as
+    correct. Use it once to seal an existing ledger and after an
+    approved correction, while no postings are made.
+    Returns the number of sealed periods.
+    """
+    checksums = PeriodChecksum.objects.all()
+    deltas = PeriodChecksumDelta.objects.all()
+    lines = JournalLine.objects.filter(is_posted=True)
+    fiscal_years = FiscalYear.objects.all()
+    if company:
+        checksums = checksums.filter(company=company)
+        deltas = deltas.filter(company=company)
+        lines = lines.filter(company=company)
+        fiscal_years = fiscal_years.filter(company=company)
+    if fiscal_year:
+        checksums = checksums.filter(fiscal_year=fiscal_year)
+        deltas = deltas.filter(fiscal_year=fiscal_year)
+        lines = lines.filter(fiscal_year=fiscal_year)
+        fiscal_years = fiscal_years.filter(pk=fiscal_year.pk)
+
+    checksums.delete()
+    deltas.delete()
+    totals = _summarize(
+        lines.order_by().values_list(*LINE_FIELDS).iterator(chunk_size=5000),
+        {fiscal_year.pk: fiscal_year for fiscal_year in fiscal_years}
+    )
+    now = timezone.now()
+    PeriodChecksum.objects.bulk_create(
+        [
+            PeriodChecksum(
+                company_id=key[0],
+                fiscal_year_id=key[1],
+                period=key[2],
+                debit=debit,
+                credit=credit,
+                line_count=line_count,
+                digest=_hex(digest),
+                verified_at=now
+            )
+            for key, (debit, credit, line_count, digest) in sorted(totals.items())
+        ],
+        batch_size=1000
+    )
+    return len(totals)
+
+
+def ledger_health(company=None):
+    """
+    Stored verification state: failing periods, periods awaiting
+    verification and the time of the last verification.
+    """
+    checksums = PeriodChecksum.objects.all()
+    if company:
+        checksums = checksums.filter(company=company)
+
+    invalid = [
+        {
+            'company': company_code,
+            'year': year,
+            'period': period,
+            'problem': problem,
+        }
+        for company_code, year, period, problem in checksums.filter(
+            is_valid=False
+        ).order_by('company', 'fiscal_year', 'period').values_list(
+            'company__code', 'fiscal_year__year', 'period', 'problem'
+        )
+    ]
+    last_verified = checksums.order_by('-verified_at').values_list(
+        'verified_at', flat=True
+    ).first()
+
+    return {
+        'status': 'failing' if invalid else 'ok',
+        'invalid_periods': invalid,
+        'pending_periods': _pending(checksums).count(),
+        'last_verified_at': last_verified,
+    }
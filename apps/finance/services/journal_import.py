@@ -0,0 +1,327 @@
+import csv
+import datetime
+import json
+import os
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from apps.core.models import Branch
+from apps.core.services import (
+    get_document_type,
+    get_next_document_numbers,
+    get_open_fiscal_year,
+)
+from apps.finance.models import (
+    Account,
+    JournalEntry,
+    JournalImportCheckpoint,
+    JournalLine,
+)
+from apps.finance.services.balances import apply_journal_lines
+from apps.projects.models import Project, ProjectCostCenter
+
+
+# Columns of an import file. Rows of one entry share `entry_ref` and
+# must be consecutive. Entries without a document number are numbered
+# from the journal entry sequence.
+COLUMNS = (
+    'entry_ref',
+    'date',
+    'description',
+    'document_number',
+    'branch',
+    'account',
+    'debit',
+    'credit',
+    'project',
+    'cost_center',
+)
+
+
+def read_rows(path, file_format=None):
+    """
+    Stream rows of a CSV or JSONL file as dicts.
+    """
+    file_format = file_format or os.path.splitext(path)[1].lstrip('.').lower()
+
+    with open(path, newline='', encoding='utf-8') as handle:
+        if file_format == 'csv':
+            yield from csv.DictReader(handle)
+        elif file_format in ('jsonl', 'ndjson'):
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Unsupported import format: {file_format}")
+
+
+def iter_chunks(rows, chunk_size):
+    """
+    Group rows into chunks of about `chunk_size` rows without splitting
+    an entry. Yields (row_offset, rows) where row_offset is the number
+    of rows preceding the chunk.
+    """
+    chunk = []
+    offset = 0
+    for row in rows:
+        if len(chunk) >= chunk_size and row.get('entry_ref') != chunk[-1].get('entry_ref'):
+            yield offset, chunk
+            offset += len(chunk)
+            chunk = []
+        chunk.append(row)
+
+    if chunk:
+        yield offset, chunk
+
+
+def _amount(value):
+    amount = Decimal(str(value or 0).strip() or 0)
+    if amount < 0:
+        raise InvalidOperation
+    return amount
+
+
+class _References:
+    """
+    Accounts, projects, cost centers and branches referenced by one
+    chunk, loaded with one query per model.
+    """
+
+    def __init__(self, company, rows):
+        account_codes = {row['account'] for row in rows if row.get('account')}
+        project_codes = {row['project'] for row in rows if row.get('project')}
+        cost_center_codes = {row['cost_center'] for row in rows if row.get('cost_center')}
+        branch_codes = {row['branch'] for row in rows if row.get('branch')}
+
+        self.accounts = {
+            code: (pk, is_postable)
+            for pk, code, is_postable in Account.objects.filter(
+                company=company,
+                code__in=account_codes
+            ).values_list('pk', 'code', 'is_postable')
+        }
+        self.projects = dict(
+            Project.objects.filter(
+                company=company,
+                code__in=project_codes
+            ).values_list('code', 'pk')
+        )
+        self.cost_centers = {
+            (project_code, code): (pk, is_postable)
+            for pk, project_code, code, is_postable in ProjectCostCenter.objects.filter(
+                project__company=company,
+                project__code__in=project_codes,
+                code__in=cost_center_codes
+            ).values_list('pk', 'project__code', 'code', 'is_postable')
+        }
+        self.branches = dict(
+            Branch.objects.filter(
+                company=company,
+                code__in=branch_codes
+            ).values_list('code', 'pk')
+        )
+
+
+def _build_entries(company, row_offset, rows):
+    """
+    Validate a chunk in memory and build unsaved entries and lines.
+    Returns [(entry, [lines])] or raises ValidationError listing
+    every problem of the chunk.
+    """
+    refs = _References(company, rows)
+    errors = []
+    grouped = defaultdict(list)
+    order = []
+
+    for number, row in enumerate(rows, start=row_offset + 1):
+        ref = row.get('entry_ref')
+        if ref not in grouped:
+            order.append(ref)
+        grouped[ref].append((number, row))
+
+    built = []
+    for ref in order:
+        first_number, header = grouped[ref][0]
+
+        try:
+            date = datetime.date.fromisoformat(str(header.get('date', '')))
+            fiscal_year = get_open_fiscal_year(company, date)
+        except ValueError:
+            errors.append(f"Row {first_number}: invalid date {header.get('date')!r}.")
+            continue
+        except ValidationError as exc:
+            errors.append(f"Row {first_number}: {exc.messages[0]}")
+            continue
+
+        branch_id = None
+        if header.get('branch'):
+            branch_id = refs.branches.get(header['branch'])
+            if branch_id is None:
+                errors.append(f"Row {first_number}: unknown branch {header['branch']}.")
+
+        entry = JournalEntry(
+            company=company,
+            fiscal_year=fiscal_year,
+            branch_id=branch_id,
+            document_number=header.get('document_number') or '',
+            date=date,
+            description=(header.get('description') or '')[:255],
+            is_posted=True
+        )
+
+        lines = []
+        total_debit = total_credit = Decimal(0)
+        for number, row in grouped[ref]:
+            try:
+                debit = _amount(row.get('debit'))
+                credit = _amount(row.get('credit'))
+            except InvalidOperation:
+                errors.append(f"Row {number}: invalid amount.")
+                continue
+
+            if debit and credit:
+                errors.append(f"Row {number}: line cannot have both debit and credit.")
+
+            account = refs.accounts.get(row.get('account'))
+            if account is None:
+                errors.append(f"Row {number}: unknown account {row.get('account')}.")
+                continue
+            if not account[1]:
+                errors.append(f"Row {number}: account {row['account']} is not postable.")
+
+            project_id = None
+            if row.get('project'):
+                project_id = refs.projects.get(row['project'])
+                if project_id is None:
+                    errors.append(f"Row {number}: unknown project {row['project']}.")
+
+            cost_center_id = None
+            if row.get('cost_center'):
+                cost_center = refs.cost_centers.get((row.get('project'), row['cost_center']))
+                if not row.get('project'):
+                    errors.append(f"Row {number}: cost center requires a project.")
+                elif cost_center is None:
+                    errors.append(
+                        f"Row {number}: cost center {row['cost_center']} "
+                        f"does not belong to project {row['project']}."
+                    )
+                elif not cost_center[1]:
+                    errors.append(f"Row {number}: cost center {row['cost_center']} is not postable.")
+                else:
+                    cost_center_id = cost_center[0]
+
+            total_debit += debit
+            total_credit += credit
+            lines.append(JournalLine(
+                journal_entry=entry,
+                account_id=account[0],
+                project_id=project_id,
+                cost_center_id=cost_center_id,
+                debit=debit,
+                credit=credit
+            ))
+
+        if total_debit != total_credit:
+            errors.append(f"Row {first_number}: entry {ref} is not balanced.")
+
+        built.append((entry, lines))
+
+    if errors:
+        raise ValidationError(errors)
+
+    return built
+
+
+def _number_entries(company, entries, document_type):
+    unnumbered = defaultdict(list)
+    for entry in entries:
+        if not entry.document_number:
+            unnumbered[entry.fiscal_year].append(entry)
+
+    for fiscal_year, group in unnumbered.items():
+        numbers = get_next_document_numbers(
+            company, fiscal_year, document_type, len(group)
+        )
+        for entry, number in zip(group, numbers):
+            entry.document_number = number
+
+
+def _save_checkpoint(company, name, source_path, rows_done):
+    JournalImportCheckpoint.objects.update_or_create(
+        company=company,
+        name=name,
+        defaults={'source': os.path.abspath(source_path), 'rows': rows_done}
+    )
+
+
+def read_checkpoint(company, name, source_path):
+    """
+    Return the number of rows already imported from `source_path`.
+    """
+    checkpoint = JournalImportCheckpoint.objects.filter(company=company, name=name).first()
+    if checkpoint is None:
+        return 0
+    if checkpoint.source != os.path.abspath(source_path):
+        raise ValueError("Checkpoint belongs to a different import file.")
+    return checkpoint.rows
+
+
+def import_journals(
+    path,
+    company,
+    chunk_size=5000,
+    document_type_code='JE',
+    checkpoint=None,
+    resume=False,
+    file_format=None,
+    on_chunk=None
+):
+    """
+    Import posted journal entries from a CSV or JSONL file.
+
+    The file is streamed in chunks; each chunk's references are
+    prefetched, validated in memory and written with bulk_create in its
+    own transaction, which also saves the number of imported rows to
+    the `checkpoint` (default: the absolute path of the file) so an
+    interrupted import can resume.
+    Returns (entries, lines) imported by this run.
+    """
+    checkpoint = checkpoint or os.path.abspath(path)
+    skip = read_checkpoint(company, checkpoint, path) if resume else 0
+    document_type = get_document_type(document_type_code)
+
+    rows = read_rows(path, file_format)
+    for _ in range(skip):
+        next(rows, None)
+
+    entry_count = line_count = 0
+    for offset, chunk in iter_chunks(rows, chunk_size):
+        offset += skip
+        built = _build_entries(company, offset, chunk)
+        entries = [entry for entry, _ in built]
+        lines = [line for _, entry_lines in built for line in entry_lines]
+
+        try:
+            with transaction.atomic():
+                _number_entries(company, entries, document_type)
+                JournalEntry.objects.bulk_create(entries, batch_size=1000)
+                for line in lines:
+                    line.copy_entry_fields()
+                JournalLine.objects.bulk_create(lines, batch_size=2000)
+                apply_journal_lines(lines)
+                _save_checkpoint(company, checkpoint, path, offset + len(chunk))
+        except IntegrityError as exc:
+            raise ValidationError(
+                f"Rows {offset + 1}-{offset + len(chunk)}: {exc}"
+            )
+
+        entry_count += len(entries)
+        line_count += len(lines)
+
+        if on_chunk:
+            on_chunk(offset + len(chunk), entry_count, line_count)
+
+    return entry_count, line_count
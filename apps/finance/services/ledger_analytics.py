@@ -0,0 +1,147 @@
+from decimal import Decimal
+
+import numpy as np
+from django.db.models import BigIntegerField, F, Value
+from django.db.models.functions import Cast, Coalesce, ExtractMonth, ExtractYear, Round
+
+from apps.finance.models import JournalLine
+
+
+# Amounts are held as int64 minor units (cents for two decimal places)
+# so sums stay exact; convert back with `to_decimal` at the edges.
+AMOUNT_PLACES = JournalLine._meta.get_field('debit').decimal_places
+MINOR_UNITS = 10 ** AMOUNT_PLACES
+
+# Missing projects and cost centers are stored as 0.
+LEDGER_DTYPE = np.dtype([
+    ('account', np.int64),
+    ('project', np.int64),
+    ('cost_center', np.int64),
+    ('period', np.int64),
+    ('debit', np.int64),
+    ('credit', np.int64),
+])
+
+
+def _minor_units(field):
+    return Cast(Round(F(field) * MINOR_UNITS), BigIntegerField())
+
+
+def to_decimal(minor):
+    """
+    Convert minor units (a scalar or an array of any shape) to Decimal.
+    """
+    if np.ndim(minor) == 0:
+        return Decimal(int(minor)).scaleb(-AMOUNT_PLACES)
+    return [to_decimal(value) for value in minor]
+
+
+class LedgerFrame:
+    """
+    Posted journal lines of one fiscal year as a structured NumPy array
+    (see LEDGER_DTYPE), with vectorized group-bys and pivots.
+    """
+
+    def __init__(self, fiscal_year, data):
+        self.fiscal_year = fiscal_year
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def periods(self):
+        return self.fiscal_year.period_of(self.fiscal_year.end_date)
+
+    def amounts(self, value='net'):
+        if value == 'net':
+            return self.data['debit'] - self.data['credit']
+        return self.data[value]
+
+    def group_sum(self, *keys, value='net'):
+        """
+        Sum `value` ('net', 'debit' or 'credit') per distinct combination
+        of `keys`. Returns (groups, sums): an (n, len(keys)) array of key
+        values and the matching sums, ordered by key.
+        """
+        columns = np.column_stack([self.data[key] for key in keys])
+        groups, inverse = np.unique(columns, axis=0, return_inverse=True)
+        sums = np.zeros(len(groups), dtype=np.int64)
+        np.add.at(sums, inverse.ravel(), self.amounts(value))
+        return groups, sums
+
+    def pivot(self, rows, columns, value='net'):
+        """
+        Sum `value` into a matrix indexed by the distinct values of the
+        `rows` and `columns` fields. Returns (row_ids, column_ids, matrix).
+        """
+        row_ids, row_index = np.unique(self.data[rows], return_inverse=True)
+        column_ids, column_index = np.unique(self.data[columns], return_inverse=True)
+        matrix = np.zeros((len(row_ids), len(column_ids)), dtype=np.int64)
+        np.add.at(matrix, (row_index, column_index), self.amounts(value))
+        return row_ids, column_ids, matrix
+
+    def period_matrix(self, value='net', cumulative=False):
+        """
+        Account × period matrix covering every period of the fiscal year.
+        Returns (account_ids, matrix); with `cumulative`, each column holds
+        the year-to-date total.
+        """
+        account_ids, account_index = np.unique(self.data['account'], return_inverse=True)
+        matrix = np.zeros((len(account_ids), self.periods), dtype=np.int64)
+        np.add.at(matrix, (account_index, self.data['period'] - 1), self.amounts(value))
+        if cumulative:
+            matrix = np.cumsum(matrix, axis=1)
+        return account_ids, matrix
+
+
+def load_ledger(
+    company,
+    fiscal_year,
+    accounts=None,
+    projects=None,
+    date_from=None,
+    date_to=None,
+    chunk_size=20000
+):
+    """
+    Load posted journal lines into a LedgerFrame.
+
+    Minor units and periods are computed by the database and the rows
+    are streamed straight into the array, so no Decimal objects are
+    created per line.
+    """
+    lines = JournalLine.objects.filter(
+        company=company,
+        fiscal_year=fiscal_year,
+        is_posted=True
+    )
+    if accounts is not None:
+        lines = lines.filter(account__in=accounts)
+    if projects is not None:
+        lines = lines.filter(project__in=projects)
+    if date_from:
+        lines = lines.filter(date__gte=date_from)
+    if date_to:
+        lines = lines.filter(date__lte=date_to)
+
+    start = fiscal_year.start_date
+    period = (
+        (ExtractYear('date') - Value(start.year)) * 12
+        + ExtractMonth('date') - Value(start.month - 1)
+    )
+
+    rows = (
+        lines
+        .order_by()
+        .values_list(
+            'account_id',
+            Coalesce('project_id', Value(0)),
+            Coalesce('cost_center_id', Value(0)),
+            period,
+            _minor_units('debit'),
+            _minor_units('credit'),
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+    return LedgerFrame(fiscal_year, np.fromiter(rows, dtype=LEDGER_DTYPE))
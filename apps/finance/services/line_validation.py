@@ -0,0 +1,82 @@
+from django.core.exceptions import ValidationError
+
+from apps.finance.models import Account, JournalLine
+from apps.projects.models import ProjectCostCenter
+
+
+def load_line_references(lines):
+    """
+    Attach the accounts and cost centers of `lines` with one in_bulk
+    query per model, skipping relations that are already cached.
+    """
+    account_ids = set()
+    cost_center_ids = set()
+    for line in lines:
+        if line.account_id and not JournalLine.account.is_cached(line):
+            account_ids.add(line.account_id)
+        if line.cost_center_id and not JournalLine.cost_center.is_cached(line):
+            cost_center_ids.add(line.cost_center_id)
+
+    accounts = Account.objects.in_bulk(account_ids) if account_ids else {}
+    cost_centers = ProjectCostCenter.objects.in_bulk(cost_center_ids) if cost_center_ids else {}
+
+    for line in lines:
+        if line.account_id in accounts:
+            line.account = accounts[line.account_id]
+        if line.cost_center_id in cost_centers:
+            line.cost_center = cost_centers[line.cost_center_id]
+
+
+def journal_line_errors(line):
+    """
+    Problems of one line as a list of messages. Reads only the line's
+    account and cost center, so it issues no queries once they are
+    loaded (see load_line_references).
+    """
+    errors = []
+    if line.debit and line.credit:
+        errors.append("Line cannot have both debit and credit.")
+
+    if line.account_id and not line.account.is_postable:
+        errors.append("Account is not postable.")
+
+    if line.cost_center_id:
+        cost_center = line.cost_center
+        if not line.project_id:
+            errors.append("Cost center requires a project.")
+        elif cost_center.project_id != line.project_id:
+            errors.append("Cost center does not belong to selected project.")
+
+        if not cost_center.is_postable:
+            errors.append("Cost center is not postable.")
+
+    return errors
+
+
+def get_journal_line_errors(lines):
+    """
+    Validate a set of lines with two queries in total.
+    Returns {index of the line in `lines`: [messages]} for invalid lines.
+    """
+    lines = list(lines)
+    load_line_references(lines)
+    errors = {}
+    for index, line in enumerate(lines):
+        line_errors = journal_line_errors(line)
+        if line_errors:
+            errors[index] = line_errors
+    return errors
+
+
+def validate_journal_lines(lines):
+    """
+    Validate a set of lines and raise one ValidationError listing
+    every problem, numbered by line.
+    """
+    errors = get_journal_line_errors(lines)
+    if errors:
+        raise ValidationError([
+            f"Line {index + 1}: {message}"
+            for index, messages in sorted(errors.items())
+            for message in messages
+        ])
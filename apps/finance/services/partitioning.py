@@ -0,0 +1,235 @@
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from apps.core.models import FiscalYear
+from apps.finance.models import JournalLine
+
+
+# Journal lines can be LIST-partitioned by fiscal_year_id on PostgreSQL.
+# Every fiscal year gets its own partition; lines of years without one
+# land in the default partition until `create_partitions` moves them.
+TABLE = JournalLine._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+
+def _qn(name):
+    return connection.ops.quote_name(name)
+
+
+def _require_postgresql():
+    if connection.vendor != 'postgresql':
+        raise ValidationError("Journal line partitioning requires PostgreSQL.")
+
+
+def partition_name(fiscal_year_id):
+    return f"{TABLE}_fy{int(fiscal_year_id)}"
+
+
+def is_partitioned():
+    _require_postgresql()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass)",
+            [TABLE]
+        )
+        return cursor.fetchone()[0]
+
+
+def list_partitions():
+    """
+    Return the names of the partitions attached to the journal line table.
+    """
+    _require_postgresql()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = %s::regclass
+            ORDER BY c.relname
+            """,
+            [TABLE]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _create_partition(cursor, fiscal_year_id):
+    """
+    Create and attach the partition of one fiscal year, moving its lines
+    out of the default partition.
+    """
+    name = partition_name(fiscal_year_id)
+    cursor.execute(
+        f"CREATE TABLE {_qn(name)} "
+        f"(LIKE {_qn(TABLE)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    )
+    cursor.execute(
+        f"WITH moved AS ("
+        f"DELETE FROM {_qn(DEFAULT_PARTITION)} WHERE fiscal_year_id = %s RETURNING *"
+        f") INSERT INTO {_qn(name)} SELECT * FROM moved",
+        [fiscal_year_id]
+    )
+    cursor.execute(
+        f"ALTER TABLE {_qn(TABLE)} ATTACH PARTITION {_qn(name)} "
+        f"FOR VALUES IN ({int(fiscal_year_id)})"
+    )
+    return name
+
+
+@transaction.atomic
+def partition_journal_lines():
+    """
+    Convert the journal line table into a table partitioned by fiscal
+    year, with one partition per existing fiscal year and a default one.
+
+    Rows are copied inside one transaction holding an exclusive lock on
+    the table, so run it in a maintenance window. Indexes and foreign
+    keys are recreated after the copy; the primary key becomes
+    (id, fiscal_year_id) because PostgreSQL requires the partition key
+    in every unique index. Returns the names of the created partitions.
+    """
+    if is_partitioned():
+        raise ValidationError("Journal lines are already partitioned.")
+
+    old_table = f"{TABLE}_unpartitioned"
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {_qn(TABLE)} IN ACCESS EXCLUSIVE MODE")
+
+        cursor.execute(
+            "SELECT count(*) FROM pg_constraint WHERE confrelid = %s::regclass",
+            [TABLE]
+        )
+        if cursor.fetchone()[0]:
+            raise ValidationError("Other tables reference journal lines by foreign key.")
+
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {_qn(TABLE)} WHERE fiscal_year_id IS NULL)")
+        if cursor.fetchone()[0]:
+            raise ValidationError("Some journal lines have no fiscal year.")
+
+        # Definitions are read before the rename so they name the new table.
+        cursor.execute(
+            "SELECT pg_get_indexdef(indexrelid) FROM pg_index "
+            "WHERE indrelid = %s::regclass AND NOT indisprimary",
+            [TABLE]
+        )
+        index_definitions = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE]
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f"SELECT max(id) FROM {_qn(TABLE)}")
+        last_id = cursor.fetchone()[0]
+
+        cursor.execute(f"ALTER TABLE {_qn(TABLE)} RENAME TO {_qn(old_table)}")
+        cursor.execute(
+            f"CREATE TABLE {_qn(TABLE)} "
+            f"(LIKE {_qn(old_table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY LIST (fiscal_year_id)"
+        )
+        cursor.execute(f"ALTER TABLE {_qn(TABLE)} ALTER COLUMN id DROP DEFAULT")
+        cursor.execute(f"ALTER TABLE {_qn(TABLE)} ALTER COLUMN fiscal_year_id SET NOT NULL")
+        cursor.execute(f"CREATE TABLE {_qn(DEFAULT_PARTITION)} PARTITION OF {_qn(TABLE)} DEFAULT")
+
+        created = [DEFAULT_PARTITION]
+        for fiscal_year_id in FiscalYear.objects.order_by('pk').values_list('pk', flat=True):
+            created.append(_create_partition(cursor, fiscal_year_id))
+
+        cursor.execute(f"INSERT INTO {_qn(TABLE)} SELECT * FROM {_qn(old_table)}")
+
+        # Dropping the old table also drops its identity (or serial)
+        # sequence, whose name the new table's sequence takes over.
+        cursor.execute(f"DROP TABLE {_qn(old_table)}")
+
+        sequence = f"{TABLE}_id_seq"
+        cursor.execute(f"CREATE SEQUENCE {_qn(sequence)} OWNED BY {_qn(TABLE)}.id")
+        cursor.execute(
+            f"ALTER TABLE {_qn(TABLE)} ALTER COLUMN id SET DEFAULT nextval(%s::regclass)",
+            [sequence]
+        )
+        if last_id:
+            cursor.execute("SELECT setval(%s::regclass, %s)", [sequence, last_id])
+
+        cursor.execute(
+            f"ALTER TABLE {_qn(TABLE)} ADD CONSTRAINT {_qn(TABLE + '_pkey')} "
+            f"PRIMARY KEY (id, fiscal_year_id)"
+        )
+        for definition in index_definitions:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {_qn(TABLE)} ADD CONSTRAINT {_qn(name)} {definition}")
+
+        cursor.execute(f"ANALYZE {_qn(TABLE)}")
+
+    return created
+
+
+@transaction.atomic
+def create_partitions(fiscal_years=None):
+    """
+    Create the missing partitions of `fiscal_years` (default: all).
+    Run it after opening new fiscal years so their lines never land in
+    the default partition. Returns the names of the created partitions.
+    """
+    if not is_partitioned():
+        raise ValidationError("Journal lines are not partitioned.")
+
+    if fiscal_years is None:
+        fiscal_years = FiscalYear.objects.order_by('pk')
+
+    existing = set(list_partitions())
+    created = []
+    with connection.cursor() as cursor:
+        for fiscal_year in fiscal_years:
+            if partition_name(fiscal_year.pk) not in existing:
+                created.append(_create_partition(cursor, fiscal_year.pk))
+    return created
+
+
+def _check_archivable(fiscal_year):
+    if not is_partitioned():
+        raise ValidationError("Journal lines are not partitioned.")
+    if not fiscal_year.is_closed:
+        raise ValidationError(f"Fiscal year {fiscal_year.year} is not closed.")
+
+
+@transaction.atomic
+def detach_partition(fiscal_year):
+    """
+    Detach the partition of a closed fiscal year. The table is kept
+    under its name for archiving or dropping; its lines disappear from
+    ledger queries while the account period balances stay untouched.
+    Returns the partition name.
+    """
+    _check_archivable(fiscal_year)
+
+    name = partition_name(fiscal_year.pk)
+    if name not in list_partitions():
+        raise ValidationError(f"{name} is not attached.")
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {_qn(TABLE)} DETACH PARTITION {_qn(name)}")
+    return name
+
+
+@transaction.atomic
+def attach_partition(fiscal_year):
+    """
+    Re-attach a previously detached fiscal year partition.
+    Returns the partition name.
+    """
+    _check_archivable(fiscal_year)
+
+    name = partition_name(fiscal_year.pk)
+    if name in list_partitions():
+        raise ValidationError(f"{name} is already attached.")
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"ALTER TABLE {_qn(TABLE)} ATTACH PARTITION {_qn(name)} "
+            f"FOR VALUES IN ({int(fiscal_year.pk)})"
+        )
+    return name
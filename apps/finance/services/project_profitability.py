@@ -0,0 +1,137 @@
+from collections import defaultdict
+
+from django.db.models import Sum
+
+from apps.finance.models import AccountPeriodBalance, AccountType, JournalLine
+from apps.finance.services.report_cache import cached_report
+from apps.projects.models import Project, ProjectCostCenter
+
+
+def _actuals(company, fiscal_year=None, projects=None, date_from=None, date_to=None):
+    """
+    Debit/credit totals per (project, cost center, account category)
+    in one grouped query. Whole-period figures come from the account
+    period balance table; date filters fall back to the journal lines.
+    """
+    if date_from or date_to:
+        source = JournalLine.objects.filter(company=company, is_posted=True)
+        if date_from:
+            source = source.filter(date__gte=date_from)
+        if date_to:
+            source = source.filter(date__lte=date_to)
+    else:
+        source = AccountPeriodBalance.objects.filter(company=company)
+
+    source = source.filter(
+        project__isnull=False,
+        account__account_type__category__in=(
+            AccountType.CATEGORY_REVENUE,
+            AccountType.CATEGORY_EXPENSE,
+        )
+    )
+    if fiscal_year:
+        source = source.filter(fiscal_year=fiscal_year)
+    if projects is not None:
+        source = source.filter(project__in=projects)
+
+    return (
+        source
+        .values('project', 'cost_center', 'account__account_type__category')
+        .annotate(debit=Sum('debit'), credit=Sum('credit'))
+        .order_by()
+    )
+
+
+def _figures(revenue=0, cost=0):
+    return {'revenue': revenue, 'cost': cost, 'margin': revenue - cost}
+
+
+@cached_report()
+def get_project_profitability(
+    company,
+    fiscal_year=None,
+    projects=None,
+    date_from=None,
+    date_to=None
+):
+    """
+    Revenue, cost and margin per project and WBS cost center.
+
+    Actuals are aggregated per cost center in one grouped query and
+    rolled up the cost center tree in memory, so every cost center
+    reports its own figures and the totals of its whole subtree.
+    Revenue is credit minus debit on revenue accounts, cost is debit
+    minus credit on expense accounts; other categories are ignored.
+    Lines without a cost center are reported as the project's
+    `unallocated` figures.
+
+    Returns a list of projects ordered by code, each with its cost
+    centers in tree order (depth-first, by code).
+    """
+    own = defaultdict(lambda: [0, 0])
+    project_totals = defaultdict(lambda: [0, 0])
+    for row in _actuals(company, fiscal_year, projects, date_from, date_to):
+        debit = row['debit'] or 0
+        credit = row['credit'] or 0
+        if row['account__account_type__category'] == AccountType.CATEGORY_REVENUE:
+            index, amount = 0, credit - debit
+        else:
+            index, amount = 1, debit - credit
+        own[(row['project'], row['cost_center'])][index] += amount
+        project_totals[row['project']][index] += amount
+
+    project_ids = {project_id for project_id, _ in own}
+    if projects is not None:
+        project_ids |= {getattr(project, 'pk', project) for project in projects}
+
+    project_rows = Project.objects.filter(pk__in=project_ids).values('id', 'code', 'name')
+    cost_centers = {
+        cost_center['id']: cost_center
+        for cost_center in ProjectCostCenter.objects.filter(
+            project__in=project_ids
+        ).values('id', 'project_id', 'parent_id', 'code', 'name')
+    }
+
+    # Roll every cost center's own figures up to all its ancestors.
+    subtree = defaultdict(lambda: [0, 0])
+    for (project_id, cost_center_id), (revenue, cost) in own.items():
+        seen = set()
+        while cost_center_id and cost_center_id not in seen:
+            seen.add(cost_center_id)
+            subtree[cost_center_id][0] += revenue
+            subtree[cost_center_id][1] += cost
+            cost_center_id = cost_centers[cost_center_id]['parent_id']
+
+    children = defaultdict(list)
+    for cost_center in cost_centers.values():
+        children[(cost_center['project_id'], cost_center['parent_id'])].append(cost_center)
+    for siblings in children.values():
+        siblings.sort(key=lambda cost_center: cost_center['code'])
+
+    def tree(project_id, parent_id=None, depth=0):
+        for cost_center in children[(project_id, parent_id)]:
+            cost_center_id = cost_center['id']
+            yield {
+                'cost_center_id': cost_center_id,
+                'cost_center_code': cost_center['code'],
+                'cost_center_name': cost_center['name'],
+                'parent_id': parent_id,
+                'depth': depth,
+                'own': _figures(*own.get((project_id, cost_center_id), (0, 0))),
+                **_figures(*subtree.get(cost_center_id, (0, 0))),
+            }
+            yield from tree(project_id, cost_center_id, depth + 1)
+
+    results = []
+    for project in sorted(project_rows, key=lambda project: project['code']):
+        project_id = project['id']
+        results.append({
+            'project_id': project_id,
+            'project_code': project['code'],
+            'project_name': project['name'],
+            **_figures(*project_totals.get(project_id, (0, 0))),
+            'unallocated': _figures(*own.get((project_id, None), (0, 0))),
+            'cost_centers': list(tree(project_id)),
+        })
+
+    return results
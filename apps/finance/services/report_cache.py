@@ -0,0 +1,80 @@
+import datetime
+import functools
+import hashlib
+import inspect
+
+from django.core.cache import cache
+from django.db import models
+
+from apps.finance.models import LedgerVersion
+
+
+# Report results are cached under the ledger version of the company's
+# fiscal year, so a posting (which bumps the version in its own
+# transaction) makes every older result unreachable, as do edits of
+# the accounts, projects and cost centers the reports show (see
+# apps.finance.signals). The version is
+# read from the database on each call, before the report is computed,
+# so no process can serve or store a result under a newer version
+# than its data.
+
+def ledger_version(company, fiscal_year=None):
+    """
+    Current ledger version of a fiscal year, or a fingerprint of all
+    the company's versions without one.
+    """
+    versions = LedgerVersion.objects.filter(company=company)
+    if fiscal_year is not None:
+        return versions.filter(fiscal_year=fiscal_year).values_list(
+            'version', flat=True
+        ).first() or 0
+    return ",".join(
+        f"{fiscal_year_id}:{version}"
+        for fiscal_year_id, version in versions.order_by('fiscal_year').values_list(
+            'fiscal_year', 'version'
+        )
+    )
+
+
+def _key_part(value):
+    if isinstance(value, models.Model):
+        return f"{type(value).__name__}:{value.pk}"
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple, set, frozenset, models.QuerySet)):
+        return "[" + ",".join(sorted(_key_part(item) for item in value)) + "]"
+    return repr(value)
+
+
+def cached_report(timeout=3600):
+    """
+    Cache a report service's result per parameters and ledger version.
+    The service must take `company` and `fiscal_year` arguments; the
+    uncached function stays available as `__wrapped__`.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = bound.arguments
+            version = ledger_version(params['company'], params['fiscal_year'])
+
+            fingerprint = "|".join(
+                f"{key}={_key_part(value)}" for key, value in params.items()
+            )
+            key = "finance:report:" + hashlib.sha256(
+                f"{name}|{version}|{fingerprint}".encode('utf-8')
+            ).hexdigest()
+
+            result = cache.get(key)
+            if result is None:
+                result = func(*args, **kwargs)
+                cache.set(key, result, timeout)
+            return result
+
+        return wrapper
+    return decorator
@@ -1,30 +1,157 @@
 from django.db.models import Sum
-from apps.finance.models import JournalLine, Account
+from apps.finance.models import AccountPeriodBalance, JournalLine, Account
+from apps.finance.services.report_cache import cached_report
 
 
-def get_trial_balance(company, fiscal_year):
-    lines = (
-        JournalLine.objects
-        .filter(
-            journal_entry__company=company,
-            journal_entry__fiscal_year=fiscal_year,
-            journal_entry__is_posted=True
+def _posted_lines(
+    company,
+    fiscal_year,
+    date_from=None,
+    date_to=None,
+    branch=None,
+    project=None,
+    cost_center=None
+):
+    lines = JournalLine.objects.filter(
+        company=company,
+        fiscal_year=fiscal_year,
+        is_posted=True
+    )
+
+    if date_from:
+        lines = lines.filter(date__gte=date_from)
+    if date_to:
+        lines = lines.filter(date__lte=date_to)
+    if branch:
+        lines = lines.filter(journal_entry__branch=branch)
+    if project:
+        lines = lines.filter(project=project)
+    if cost_center:
+        lines = lines.filter(cost_center=cost_center)
+
+    return lines
+
+
+def _period_balances(company, fiscal_year, project=None, cost_center=None):
+    balances = AccountPeriodBalance.objects.filter(
+        company=company,
+        fiscal_year=fiscal_year
+    )
+
+    if project:
+        balances = balances.filter(project=project)
+    if cost_center:
+        balances = balances.filter(cost_center=cost_center)
+
+    return balances
+
+
+def _roll_up(company, rows):
+    """
+    Add every row's totals to all its ancestors and return one
+    subtotal row per non-postable account, merged with `rows`.
+    The chart of accounts is loaded with a single query.
+    """
+    accounts = {
+        account['id']: account
+        for account in Account.objects.filter(company=company).values(
+            'id', 'parent_id', 'code', 'name', 'is_postable'
         )
-        .values('account')
+    }
+
+    subtotals = {
+        account_id: {'debit': 0, 'credit': 0}
+        for account_id, account in accounts.items()
+        if not account['is_postable']
+    }
+
+    for row in rows:
+        parent_id = accounts[row['account_id']]['parent_id']
+        seen = set()
+        while parent_id and parent_id not in seen:
+            seen.add(parent_id)
+            if parent_id in subtotals:
+                subtotals[parent_id]['debit'] += row['debit']
+                subtotals[parent_id]['credit'] += row['credit']
+            parent_id = accounts[parent_id]['parent_id']
+
+    results = [dict(row, is_subtotal=False) for row in rows]
+    for account_id, totals in subtotals.items():
+        account = accounts[account_id]
+        results.append({
+            'account_id': account_id,
+            'account_code': account['code'],
+            'account_name': account['name'],
+            'debit': totals['debit'],
+            'credit': totals['credit'],
+            'is_subtotal': True,
+        })
+
+    results.sort(key=lambda row: row['account_code'])
+    return results
+
+
+@cached_report()
+def get_trial_balance(
+    company,
+    fiscal_year,
+    date_from=None,
+    date_to=None,
+    branch=None,
+    project=None,
+    cost_center=None,
+    rollup=False
+):
+    """
+    Debit/credit totals per account of posted journal lines,
+    computed in a single grouped query.
+
+    Whole-year balances are read from the account period balance table;
+    date and branch filters fall back to the journal lines.
+
+    With `rollup`, balances are also summed up the account hierarchy
+    and a subtotal row is returned for every non-postable account.
+    """
+    if date_from or date_to or branch:
+        source = _posted_lines(
+            company,
+            fiscal_year,
+            date_from=date_from,
+            date_to=date_to,
+            branch=branch,
+            project=project,
+            cost_center=cost_center
+        )
+    else:
+        source = _period_balances(
+            company,
+            fiscal_year,
+            project=project,
+            cost_center=cost_center
+        )
+
+    lines = (
+        source
+        .values('account', 'account__code', 'account__name')
         .annotate(
             debit=Sum('debit'),
             credit=Sum('credit')
         )
+        .order_by('account__code')
     )
 
-    results = []
-    for row in lines:
-        account = Account.objects.get(id=row['account'])
-        results.append({
-            'account_code': account.code,
-            'account_name': account.name,
+    results = [
+        {
+            'account_id': row['account'],
+            'account_code': row['account__code'],
+            'account_name': row['account__name'],
             'debit': row['debit'] or 0,
             'credit': row['credit'] or 0,
-        })
+        }
+        for row in lines
+    ]
+
+    if rollup:
+        return _roll_up(company, results)
 
     return results
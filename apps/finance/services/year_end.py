@@ -0,0 +1,136 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Sum
+
+from apps.core.models import FiscalYear
+from apps.core.services import get_document_type, get_next_document_numbers
+from apps.finance.models import AccountType, JournalEntry, JournalLine
+from apps.finance.services.balances import apply_journal_lines
+
+
+def compute_closing_balances(fiscal_year):
+    """
+    Net balance per (account, project, cost center) of a fiscal year,
+    computed in one aggregate query.
+    Returns [(account_id, category, project_id, cost_center_id, net)]
+    where net is debit minus credit.
+    """
+    rows = (
+        JournalLine.objects
+        .filter(
+            fiscal_year=fiscal_year,
+            is_posted=True
+        )
+        .values(
+            'account',
+            'account__code',
+            'account__account_type__category',
+            'project',
+            'cost_center',
+        )
+        .annotate(debit=Sum('debit'), credit=Sum('credit'))
+        .order_by('account__code', 'project', 'cost_center')
+    )
+
+    missing = sorted({
+        row['account__code'] for row in rows
+        if not row['account__account_type__category']
+    })
+    if missing:
+        raise ValidationError(
+            "Account types without a category: accounts " + ", ".join(missing)
+        )
+
+    return [
+        (
+            row['account'],
+            row['account__account_type__category'],
+            row['project'],
+            row['cost_center'],
+            (row['debit'] or 0) - (row['credit'] or 0),
+        )
+        for row in rows
+    ]
+
+
+def _line(entry, account_id, net, project_id=None, cost_center_id=None):
+    return JournalLine(
+        journal_entry=entry,
+        account_id=account_id,
+        project_id=project_id,
+        cost_center_id=cost_center_id,
+        debit=net if net > 0 else 0,
+        credit=-net if net < 0 else 0
+    )
+
+
+@transaction.atomic
+def close_fiscal_year(
+    fiscal_year,
+    next_fiscal_year,
+    retained_earnings_account,
+    document_type_code='JE'
+):
+    """
+    Close `fiscal_year` and carry its balances into `next_fiscal_year`.
+
+    Balance sheet accounts are carried forward per account, project and
+    cost center; the net result of revenue and expense accounts goes to
+    `retained_earnings_account`. The balances are written as one posted
+    opening entry dated on the first day of the next year, after which
+    the closed year rejects further postings.
+    Returns the opening journal entry.
+    """
+    # Conflicts with the shared lock every posting takes on its fiscal
+    # year: postings in progress commit first and are carried forward,
+    # later ones wait and are rejected.
+    fiscal_year = FiscalYear.objects.select_for_update().get(pk=fiscal_year.pk)
+
+    if fiscal_year.is_closed:
+        raise ValidationError("Fiscal year is already closed.")
+    if next_fiscal_year.company_id != fiscal_year.company_id:
+        raise ValidationError("Next fiscal year belongs to another company.")
+    if next_fiscal_year.is_closed:
+        raise ValidationError("Next fiscal year is closed.")
+    if next_fiscal_year.start_date <= fiscal_year.end_date:
+        raise ValidationError("Next fiscal year must start after the closed year.")
+    if retained_earnings_account.company_id != fiscal_year.company_id:
+        raise ValidationError("Retained earnings account belongs to another company.")
+    if not retained_earnings_account.is_postable:
+        raise ValidationError("Retained earnings account is not postable.")
+
+    entry = JournalEntry(
+        company=fiscal_year.company,
+        fiscal_year=next_fiscal_year,
+        document_number=get_next_document_numbers(
+            fiscal_year.company,
+            next_fiscal_year,
+            get_document_type(document_type_code),
+            1
+        )[0],
+        date=next_fiscal_year.start_date,
+        description=f"Opening balances from {fiscal_year.year}",
+        is_posted=True
+    )
+    entry.save()
+
+    lines = []
+    result = 0
+    for account_id, category, project_id, cost_center_id, net in compute_closing_balances(fiscal_year):
+        if category not in AccountType.BALANCE_SHEET_CATEGORIES:
+            result += net
+        elif net:
+            lines.append(_line(entry, account_id, net, project_id, cost_center_id))
+
+    if result:
+        lines.append(_line(entry, retained_earnings_account.pk, result))
+
+    for line in lines:
+        line.copy_entry_fields()
+    JournalLine.objects.bulk_create(lines, batch_size=2000)
+    apply_journal_lines(lines)
+
+    fiscal_year.is_closed = True
+    fiscal_year.save(update_fields=['is_closed'])
+
+    return entry
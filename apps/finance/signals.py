@@ -0,0 +1,51 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.projects.models import Project, ProjectCostCenter
+
+from .models import Account, AccountType, JournalEntry, JournalLine
+from .services.balances import bump_chart_versions
+from .services.integrity import mark_dirty
+
+
+# Edits of posted entries and lines outside the posting paths flag
+# their periods for the integrity verifier.
+
+@receiver(post_save, sender=JournalLine)
+@receiver(post_delete, sender=JournalLine)
+def flag_journal_line_period(sender, instance, **kwargs):
+    if instance.is_posted:
+        mark_dirty(instance.company_id, instance.fiscal_year_id, instance.date)
+
+
+@receiver(post_save, sender=JournalEntry)
+@receiver(post_delete, sender=JournalEntry)
+def flag_journal_entry_period(sender, instance, created=False, **kwargs):
+    # A new entry has no lines yet; its posting path seals them.
+    if created:
+        return
+    mark_dirty(instance.company_id, instance.fiscal_year_id, instance.date)
+
+
+# Cached reports show the names and hierarchies of accounts, projects
+# and cost centers; editing them invalidates the company's reports.
+
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def invalidate_company_reports(sender, instance, **kwargs):
+    bump_chart_versions(instance.company_id)
+
+
+@receiver(post_save, sender=ProjectCostCenter)
+@receiver(post_delete, sender=ProjectCostCenter)
+def invalidate_cost_center_reports(sender, instance, **kwargs):
+    bump_chart_versions(instance.project.company_id)
+
+
+@receiver(post_save, sender=AccountType)
+@receiver(post_delete, sender=AccountType)
+def invalidate_all_reports(sender, instance, **kwargs):
+    # Account types are shared by every company.
+    bump_chart_versions()
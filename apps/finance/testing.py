@@ -0,0 +1,81 @@
+import datetime
+
+from apps.core.services import get_document_type
+
+from .models import Account, AccountType, JournalEntry, JournalLine
+
+
+# Fixtures shared by the finance and procurement test suites.
+
+def create_account_types():
+    """
+    One account type per category: {category: AccountType}.
+    """
+    return {
+        category: AccountType.objects.get_or_create(
+            code=category.upper(),
+            defaults={'name': name, 'category': category}
+        )[0]
+        for category, name in AccountType.CATEGORY_CHOICES
+    }
+
+
+# (code, category, parent code, postable)
+CHART = (
+    ('1000', 'asset', None, False),
+    ('1100', 'asset', '1000', True),
+    ('1200', 'asset', '1000', True),
+    ('2000', 'liability', None, False),
+    ('2100', 'liability', '2000', True),
+    ('3100', 'equity', None, True),
+    ('4100', 'revenue', None, True),
+    ('5000', 'expense', None, False),
+    ('5100', 'expense', '5000', True),
+    ('5200', 'expense', '5000', True),
+)
+
+
+def create_chart(company):
+    """
+    A small chart of accounts: {code: Account}.
+    1000 Assets (1100 Cash, 1200 Receivables), 2000 Liabilities
+    (2100 Payables), 3100 Retained earnings, 4100 Revenue and
+    5000 Expenses (5100 Materials, 5200 Labour).
+    """
+    types = create_account_types()
+    accounts = {}
+    for code, category, parent, postable in CHART:
+        accounts[code] = Account.objects.create(
+            company=company,
+            account_type=types[category],
+            code=code,
+            name=f"Account {code}",
+            parent=accounts.get(parent),
+            is_postable=postable
+        )
+    return accounts
+
+
+def create_entry(company, fiscal_year, lines, date=datetime.date(2026, 3, 5), post=True):
+    """
+    A journal entry with `lines` of (account, debit, credit[, project,
+    cost_center]), posted through JournalEntry.post unless `post` is false.
+    """
+    entry = JournalEntry.objects.create(
+        company=company,
+        fiscal_year=fiscal_year,
+        date=date,
+        description="Test entry"
+    )
+    for account, debit, credit, *allocation in lines:
+        JournalLine.objects.create(
+            journal_entry=entry,
+            account=account,
+            debit=debit,
+            credit=credit,
+            project=allocation[0] if allocation else None,
+            cost_center=allocation[1] if len(allocation) > 1 else None
+        )
+    if post:
+        entry.post(get_document_type('JE'))
+    return entry
@@ -1,3 +1,1220 @@
-from django.test import TestCase
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+from decimal import Decimal
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import Permission
+from django.core.exceptions import BadRequest, ValidationError
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum
+from django.http import Http404
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.core.models import FiscalYear
+from apps.core.services import get_document_type, get_open_fiscal_year
+from apps.core.testing import create_company, create_fiscal_year, create_user, reset_caches
+from apps.projects.models import Project, ProjectCostCenter
+
+from . import views
+from .admin import JournalLineInline
+from .models import (
+    Account,
+    AccountPeriodBalance,
+    JournalEntry,
+    JournalImportCheckpoint,
+    JournalLine,
+    PeriodChecksum,
+    PeriodChecksumDelta,
+)
+from .services import integrity, journal_import, partitioning
+from .services.account_statement import get_account_statement
+from .services.balances import rebuild_account_balances, verify_account_balances
+from .services.gl_export import GL_COLUMNS, general_ledger_rows, iter_gzip_csv
+from .services.journal_import import COLUMNS, import_journals
+from .services.ledger_analytics import load_ledger, to_decimal
+from .services.line_validation import get_journal_line_errors, validate_journal_lines
+from .services.project_profitability import get_project_profitability
+from .services.report_cache import ledger_version
+from .services.trial_balance import get_trial_balance
+from .services.year_end import close_fiscal_year
+from .testing import create_chart, create_entry
+
+
+class FinanceTestCase(TestCase):
+    """
+    A company with an open 2026 fiscal year and the test chart of
+    accounts (see apps.finance.testing).
+    """
+
+    def setUp(self):
+        reset_caches()
+        self.company, self.fiscal_year = create_company()
+        self.accounts = create_chart(self.company)
+
+    def post(self, *lines, date=datetime.date(2026, 3, 5)):
+        """
+        Post an entry of (account code, debit, credit[, project, cost_center]) lines.
+        """
+        return create_entry(
+            self.company,
+            self.fiscal_year,
+            [(self.accounts[code], *rest) for code, *rest in lines],
+            date=date
+        )
+
+
+def _totals(rows):
+    return {
+        row['account_code']: (Decimal(row['debit']), Decimal(row['credit']))
+        for row in rows
+    }
+
+
+class TrialBalanceTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.post(('1100', 100, 0), ('4100', 0, 100), date=datetime.date(2026, 2, 10))
+        self.post(('5100', 30, 0), ('1100', 0, 30), date=datetime.date(2026, 3, 10))
+        self.post(('5200', 20, 0), ('2100', 0, 20), date=datetime.date(2026, 4, 10))
+
+    def test_totals_per_account_in_one_query(self):
+        with self.assertNumQueries(1):
+            rows = get_trial_balance.__wrapped__(self.company, self.fiscal_year)
+
+        self.assertEqual(_totals(rows), {
+            '1100': (100, 30),
+            '2100': (0, 20),
+            '4100': (0, 100),
+            '5100': (30, 0),
+            '5200': (20, 0),
+        })
+
+    def test_roll_up_adds_subtotals_of_parent_accounts(self):
+        rows = get_trial_balance(self.company, self.fiscal_year, rollup=True)
+
+        subtotals = _totals(row for row in rows if row['is_subtotal'])
+        self.assertEqual(subtotals, {
+            '1000': (100, 30),
+            '2000': (0, 20),
+            '5000': (50, 0),
+        })
+        self.assertEqual([row['account_code'] for row in rows], sorted(row['account_code'] for row in rows))
+
+    def test_date_range_reads_the_journal_lines(self):
+        rows = get_trial_balance(
+            self.company,
+            self.fiscal_year,
+            date_from=datetime.date(2026, 3, 1),
+            date_to=datetime.date(2026, 3, 31)
+        )
+        self.assertEqual(_totals(rows), {'1100': (0, 30), '5100': (30, 0)})
+
+
+class AccountBalanceTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = Project.objects.create(
+            company=self.company,
+            fiscal_year=self.fiscal_year,
+            code='P1',
+            name="Tower",
+            start_date=datetime.date(2026, 1, 1)
+        )
+        self.cost_center = ProjectCostCenter.objects.create(
+            project=self.project,
+            code='CC1',
+            name="Civil"
+        )
+        self.post(('1100', 100, 0), ('4100', 0, 100), date=datetime.date(2026, 2, 10))
+        self.post(
+            ('5100', 30, 0, self.project, self.cost_center),
+            ('5200', 20, 0, self.project),
+            ('1100', 0, 50),
+            date=datetime.date(2026, 3, 10)
+        )
+        self.post(('5100', 5, 0, self.project, self.cost_center), ('1100', 0, 5), date=datetime.date(2026, 3, 20))
+
+    def _balance(self, code, period, project=None, cost_center=None):
+        balance = AccountPeriodBalance.objects.get(
+            account=self.accounts[code],
+            period=period,
+            project=project,
+            cost_center=cost_center
+        )
+        return balance.debit, balance.credit
+
+    def test_posting_keeps_the_balances_equal_to_the_ledger(self):
+        self.assertEqual(verify_account_balances(self.company), [])
+        self.assertEqual(self._balance('1100', 2), (100, 0))
+        self.assertEqual(self._balance('1100', 3), (0, 55))
+        self.assertEqual(self._balance('5100', 3, self.project, self.cost_center), (35, 0))
+        self.assertEqual(self._balance('5200', 3, self.project), (20, 0))
+
+    def test_rebuild_restores_a_tampered_table(self):
+        AccountPeriodBalance.objects.filter(account=self.accounts['1100'], period=3).update(credit=1)
+        AccountPeriodBalance.objects.filter(account=self.accounts['4100']).delete()
+
+        mismatches = verify_account_balances(self.company, self.fiscal_year)
+        self.assertEqual(len(mismatches), 2)
+
+        self.assertEqual(rebuild_account_balances(self.company, self.fiscal_year), 5)
+        self.assertEqual(verify_account_balances(self.company), [])
+        self.assertEqual(self._balance('1100', 3), (0, 55))
+
+    def test_each_balance_key_has_one_row_even_without_allocations(self):
+        for project, cost_center in (
+            (None, None),
+            (self.project, None),
+            (self.project, self.cost_center),
+        ):
+            with self.subTest(project=project, cost_center=cost_center):
+                with self.assertRaises(IntegrityError), transaction.atomic():
+                    AccountPeriodBalance.objects.create(
+                        company=self.company,
+                        fiscal_year=self.fiscal_year,
+                        account=self.accounts['5100' if cost_center else '5200' if project else '1100'],
+                        period=3,
+                        project=project,
+                        cost_center=cost_center
+                    )
+
+
+class AccountTreeTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.materials = self.accounts['5100']
+        self.steel = Account.objects.create(
+            company=self.company,
+            account_type=self.materials.account_type,
+            code='5110',
+            name="Steel",
+            parent=self.materials
+        )
+
+    def _paths(self, *codes):
+        return {
+            code: (path, depth)
+            for code, path, depth in Account.objects.filter(
+                company=self.company,
+                code__in=codes
+            ).values_list('code', 'path', 'depth')
+        }
+
+    def test_moving_an_account_rewrites_the_paths_of_its_subtree(self):
+        expenses, liabilities = self.accounts['5000'], self.accounts['2000']
+        self.assertEqual(self.steel.path, f"{expenses.pk}/{self.materials.pk}/{self.steel.pk}/")
+
+        expenses.parent = liabilities
+        expenses.save()
+
+        prefix = f"{liabilities.pk}/{expenses.pk}/"
+        self.assertEqual(self._paths('5000', '5100', '5110', '5200'), {
+            '5000': (prefix, 1),
+            '5100': (f"{prefix}{self.materials.pk}/", 2),
+            '5110': (f"{prefix}{self.materials.pk}/{self.steel.pk}/", 3),
+            '5200': (f"{prefix}{self.accounts['5200'].pk}/", 2),
+        })
+        self.assertEqual(
+            set(Account.objects.descendants_of(liabilities).values_list('code', flat=True)),
+            {'2100', '5000', '5100', '5110', '5200'}
+        )
+
+        expenses.parent = None
+        expenses.save()
+        self.assertEqual(self._paths('5000', '5110'), {
+            '5000': (f"{expenses.pk}/", 0),
+            '5110': (f"{expenses.pk}/{self.materials.pk}/{self.steel.pk}/", 2),
+        })
+
+    def test_account_cannot_be_moved_under_itself(self):
+        for parent in (self.materials, self.steel):
+            with self.subTest(parent=parent.code):
+                account = Account.objects.get(pk=self.materials.pk)
+                account.parent = Account.objects.get(pk=parent.pk)
+                with self.assertRaisesMessage(ValidationError, "Account cannot be moved under itself."):
+                    account.clean()
+                with self.assertRaisesMessage(ValidationError, "Account cannot be moved under itself."):
+                    account.save()
+
+        self.assertEqual(Account.objects.get(pk=self.materials.pk).parent_id, self.accounts['5000'].pk)
+
+
+class JournalImportTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'journals.csv')
+
+    def _write(self, *entries):
+        # entries: (ref, date, [(account, debit, credit)])
+        with open(self.path, 'w', newline='', encoding='utf-8') as handle:
+            writer = csv.DictWriter(handle, fieldnames=COLUMNS)
+            writer.writeheader()
+            for ref, date, lines in entries:
+                for account, debit, credit in lines:
+                    writer.writerow({
+                        'entry_ref': ref,
+                        'date': date,
+                        'description': f"Entry {ref}",
+                        'account': account,
+                        'debit': debit,
+                        'credit': credit,
+                    })
+
+    def _entries(self, account='4100'):
+        return [
+            ('E1', '2026-01-15', [('1100', 10, 0), ('4100', 0, 10)]),
+            ('E2', '2026-02-15', [('1100', 20, 0), ('4100', 0, 20)]),
+            ('E3', '2026-03-15', [('1100', 30, 0), (account, 0, 30)]),
+        ]
+
+    def _import(self, **kwargs):
+        return import_journals(self.path, self.company, chunk_size=2, **kwargs)
+
+    def _checkpoint(self):
+        return JournalImportCheckpoint.objects.get(company=self.company).rows
+
+    def test_import_writes_numbered_posted_entries_and_balances(self):
+        self._write(*self._entries())
+
+        self.assertEqual(self._import(), (3, 6))
+
+        self.assertEqual(
+            list(JournalEntry.objects.order_by('date').values_list('document_number', 'is_posted')),
+            [
+                ("BURJ-JE-2026-000001", True),
+                ("BURJ-JE-2026-000002", True),
+                ("BURJ-JE-2026-000003", True),
+            ]
+        )
+        self.assertEqual(self._checkpoint(), 6)
+        self.assertEqual(verify_account_balances(self.company), [])
+
+    def test_invalid_chunk_stops_the_import_and_resume_continues_after_it(self):
+        self._write(*self._entries(account='9999'))
+
+        with self.assertRaisesMessage(ValidationError, "Row 6: unknown account 9999."):
+            self._import()
+        self.assertEqual(JournalEntry.objects.count(), 2)
+        self.assertEqual(self._checkpoint(), 4)
+
+        self._write(*self._entries())
+        self.assertEqual(self._import(resume=True), (1, 2))
+
+        self.assertEqual(JournalEntry.objects.count(), 3)
+        self.assertEqual(JournalLine.objects.filter(account__code='1100').count(), 3)
+        self.assertEqual(self._checkpoint(), 6)
+        self.assertEqual(verify_account_balances(self.company), [])
+
+    def test_checkpoint_is_rolled_back_with_its_chunk(self):
+        self._write(*self._entries())
+        apply_journal_lines = journal_import.apply_journal_lines
+
+        def fail_on_second_chunk(lines):
+            if JournalEntry.objects.count() > 1:
+                raise IntegrityError("crash")
+            apply_journal_lines(lines)
+
+        with mock.patch.object(journal_import, 'apply_journal_lines', fail_on_second_chunk):
+            with self.assertRaisesMessage(ValidationError, "Rows 3-4: crash"):
+                self._import()
+        self.assertEqual(self._checkpoint(), 2)
+
+        self.assertEqual(self._import(resume=True), (2, 4))
+        self.assertEqual(
+            sorted(JournalEntry.objects.values_list('description', flat=True)),
+            ["Entry E1", "Entry E2", "Entry E3"]
+        )
+
+    def test_checkpoint_of_another_file_is_refused(self):
+        self._write(*self._entries())
+        self._import(checkpoint='journals')
+
+        with self.assertRaisesMessage(ValueError, "Checkpoint belongs to a different import file."):
+            import_journals(f"{self.path}.other", self.company, checkpoint='journals', resume=True)
+
+
+class PostManyTests(FinanceTestCase):
+
+    def draft(self, *lines, date=datetime.date(2026, 3, 5), fiscal_year=None):
+        return create_entry(
+            self.company,
+            fiscal_year or self.fiscal_year,
+            [(self.accounts[code], *rest) for code, *rest in lines],
+            date=date,
+            post=False
+        )
+
+    def test_valid_entries_are_posted_and_the_others_reported(self):
+        first = self.draft(('1100', 10, 0), ('4100', 0, 10))
+        unbalanced = self.draft(('1100', 10, 0), ('4100', 0, 9))
+        posted = self.post(('1100', 5, 0), ('4100', 0, 5))
+        outside = self.draft(('1100', 1, 0), ('4100', 0, 1), date=datetime.date(2027, 1, 5))
+        next_year = create_fiscal_year(self.company, 2027, is_active=False)
+        wrong_year = self.draft(('1100', 1, 0), ('4100', 0, 1), fiscal_year=next_year)
+        second = self.draft(('5100', 7, 0), ('1100', 0, 7))
+
+        errors = JournalEntry.objects.post_many(
+            [first, unbalanced, posted, outside, wrong_year, second],
+            get_document_type('JE')
+        )
+
+        self.assertEqual(errors, {
+            unbalanced.pk: "Journal entry is not balanced.",
+            posted.pk: "Journal entry already posted.",
+            outside.pk: "Entry date is outside the fiscal year.",
+            wrong_year.pk: "Entry date is outside the fiscal year.",
+        })
+        self.assertEqual(
+            dict(JournalEntry.objects.filter(is_posted=True).values_list('pk', 'document_number')),
+            {
+                posted.pk: "BURJ-JE-2026-000001",
+                first.pk: "BURJ-JE-2026-000002",
+                second.pk: "BURJ-JE-2026-000003",
+            }
+        )
+        self.assertFalse(JournalLine.objects.filter(journal_entry=unbalanced, is_posted=True).exists())
+        self.assertEqual(verify_account_balances(self.company), [])
+
+    def test_unsaved_entries_are_refused(self):
+        saved = self.draft(('1100', 10, 0), ('4100', 0, 10))
+        unsaved = JournalEntry(company=self.company, fiscal_year=self.fiscal_year, date=datetime.date(2026, 3, 5))
+
+        with self.assertRaisesMessage(ValueError, "post_many() entries must be saved first."):
+            JournalEntry.objects.post_many([saved, unsaved], get_document_type('JE'))
+        self.assertFalse(JournalEntry.objects.filter(is_posted=True).exists())
+
+
+class GeneralLedgerExportTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.post(('1100', 100, 0), ('4100', 0, 100), date=datetime.date(2026, 2, 10))
+        self.post(('5100', 30, 0), ('1100', 0, 30), date=datetime.date(2026, 3, 10))
+        create_entry(self.company, self.fiscal_year, [(self.accounts['1100'], 1, 0)], post=False)
+
+    def _rows(self, **filters):
+        return [
+            ['' if value is None else str(value) for value in row]
+            for row in general_ledger_rows(self.company, chunk_size=2, **filters)
+        ]
+
+    def test_rows_are_posted_lines_in_ledger_order(self):
+        rows = self._rows()
+        self.assertEqual(
+            [(row[0], row[1], row[3], row[7], row[8]) for row in rows],
+            [
+                ('2026-02-10', "BURJ-JE-2026-000001", '1100', '100.00', '0.00'),
+                ('2026-02-10', "BURJ-JE-2026-000001", '4100', '0.00', '100.00'),
+                ('2026-03-10', "BURJ-JE-2026-000002", '5100', '30.00', '0.00'),
+                ('2026-03-10', "BURJ-JE-2026-000002", '1100', '0.00', '30.00'),
+            ]
+        )
+        self.assertEqual(
+            len(self._rows(fiscal_year=self.fiscal_year, date_from=datetime.date(2026, 3, 1))),
+            2
+        )
+
+    def test_gzip_stream_and_file_hold_the_same_csv(self):
+        streamed = b''.join(iter_gzip_csv(general_ledger_rows(self.company), batch_size=1))
+        streamed = list(csv.reader(gzip.decompress(streamed).decode('utf-8').splitlines()))
+        self.assertEqual(streamed[0], list(GL_COLUMNS))
+        self.assertEqual(streamed[1:], self._rows())
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'gl.csv.gz')
+        call_command('export_general_ledger', path, company='BURJ', year=2026, stdout=io.StringIO())
+        with gzip.open(path, 'rt', newline='', encoding='utf-8') as handle:
+            self.assertEqual(list(csv.reader(handle)), streamed)
+
+
+class YearEndCloseTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.next_year = create_fiscal_year(self.company, 2027, is_active=False)
+        self.project = Project.objects.create(
+            company=self.company,
+            fiscal_year=self.fiscal_year,
+            code='P1',
+            name="Tower",
+            start_date=datetime.date(2026, 1, 1)
+        )
+        self.post(('1100', 500, 0), ('4100', 0, 500))
+        self.post(('5100', 120, 0, self.project), ('2100', 0, 120))
+        self.post(('2100', 20, 0), ('1100', 0, 20))
+
+    def _close(self):
+        return close_fiscal_year(self.fiscal_year, self.next_year, self.accounts['3100'])
+
+    def test_balances_are_carried_forward_and_the_result_retained(self):
+        entry = self._close()
+
+        self.assertEqual(entry.fiscal_year, self.next_year)
+        self.assertEqual(entry.date, datetime.date(2027, 1, 1))
+        self.assertEqual(entry.document_number, "BURJ-JE-2027-000001")
+        self.assertEqual(
+            sorted(entry.lines.values_list('account__code', 'debit', 'credit')),
+            [
+                ('1100', Decimal('480.00'), Decimal('0.00')),
+                ('2100', Decimal('0.00'), Decimal('100.00')),
+                ('3100', Decimal('0.00'), Decimal('380.00')),
+            ]
+        )
+        self.assertEqual(entry.lines.filter(is_posted=True, fiscal_year=self.next_year).count(), 3)
+        self.assertEqual(verify_account_balances(self.company), [])
+
+        self.fiscal_year.refresh_from_db()
+        self.assertTrue(self.fiscal_year.is_closed)
+        with self.assertRaisesMessage(ValidationError, "Fiscal year 2026 is closed."):
+            self.post(('1100', 1, 0), ('4100', 0, 1))
+
+    def test_postings_are_rejected_by_a_year_closed_in_another_process(self):
+        get_open_fiscal_year(self.company, datetime.date(2026, 3, 5))
+        # Closed elsewhere: this process's fiscal year cache is not told.
+        FiscalYear.objects.filter(pk=self.fiscal_year.pk).update(is_closed=True)
+        lines = JournalLine.objects.filter(is_posted=True).count()
+
+        with self.assertRaisesMessage(ValidationError, "Fiscal year 2026 is closed."):
+            self.post(('1100', 1, 0), ('4100', 0, 1))
+
+        self.assertEqual(JournalLine.objects.filter(is_posted=True).count(), lines)
+        with self.assertRaisesMessage(ValidationError, "Fiscal year 2026 is closed."):
+            get_open_fiscal_year(self.company, datetime.date(2026, 3, 5))
+
+    def test_year_can_be_closed_only_once(self):
+        self._close()
+        with self.assertRaisesMessage(ValidationError, "Fiscal year is already closed."):
+            self._close()
+        self.assertEqual(JournalEntry.objects.filter(fiscal_year=self.next_year).count(), 1)
+
+    def test_close_command_reports_invalid_arguments(self):
+        with self.assertRaisesMessage(CommandError, "Retained earnings account is not postable."):
+            call_command('close_fiscal_year', company='BURJ', year=2026, retained_earnings='1000')
+
+        call_command('close_fiscal_year', company='BURJ', year=2026, retained_earnings='3100', stdout=io.StringIO())
+        self.assertTrue(JournalEntry.objects.filter(fiscal_year=self.next_year, is_posted=True).exists())
+
+
+class JournalLineEntryFieldsTests(FinanceTestCase):
+
+    def _line_fields(self, entry):
+        return set(entry.lines.values_list('company', 'fiscal_year', 'date', 'is_posted'))
+
+    def test_lines_copy_the_fields_of_their_entry(self):
+        entry = create_entry(
+            self.company,
+            self.fiscal_year,
+            [(self.accounts['1100'], 10, 0), (self.accounts['4100'], 0, 10)],
+            post=False
+        )
+        self.assertEqual(
+            self._line_fields(entry),
+            {(self.company.pk, self.fiscal_year.pk, datetime.date(2026, 3, 5), False)}
+        )
+
+        entry.date = datetime.date(2026, 4, 1)
+        entry.save()
+        entry.post(get_document_type('JE'))
+
+        self.assertEqual(
+            self._line_fields(entry),
+            {(self.company.pk, self.fiscal_year.pk, datetime.date(2026, 4, 1), True)}
+        )
+
+    def test_saving_unrelated_entry_fields_does_not_touch_the_lines(self):
+        entry = self.post(('1100', 10, 0), ('4100', 0, 10))
+        with self.assertNumQueries(1):
+            entry.description = "Renamed"
+            entry.save(update_fields=['description'])
+
+
+class JournalLineValidationTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = Project.objects.create(
+            company=self.company,
+            fiscal_year=self.fiscal_year,
+            code='P1',
+            name="Tower",
+            start_date=datetime.date(2026, 1, 1)
+        )
+        self.other_project = Project.objects.create(
+            company=self.company,
+            fiscal_year=self.fiscal_year,
+            code='P2',
+            name="Mall",
+            start_date=datetime.date(2026, 1, 1)
+        )
+        self.cost_center = ProjectCostCenter.objects.create(project=self.project, code='CC1', name="Civil")
+        self.entry = create_entry(self.company, self.fiscal_year, [], post=False)
+
+    def _lines(self):
+        # Fresh lines with nothing cached, as submitted by a form or an API.
+        cash, revenue, group = self.accounts['1100'], self.accounts['4100'], self.accounts['1000']
+        return [
+            JournalLine(journal_entry=self.entry, account_id=cash.pk, debit=10),
+            JournalLine(journal_entry=self.entry, account_id=revenue.pk, credit=10),
+            JournalLine(journal_entry=self.entry, account_id=group.pk, debit=5, credit=5),
+            JournalLine(journal_entry=self.entry, account_id=cash.pk, debit=1, cost_center_id=self.cost_center.pk),
+            JournalLine(
+                journal_entry=self.entry,
+                account_id=cash.pk,
+                debit=1,
+                project_id=self.other_project.pk,
+                cost_center_id=self.cost_center.pk
+            ),
+        ]
+
+    def test_all_problems_are_reported_with_two_queries(self):
+        lines = self._lines() * 100
+        with self.assertNumQueries(2):
+            errors = get_journal_line_errors(lines)
+
+        self.assertEqual(len(errors), 300)
+        self.assertEqual(errors[2], [
+            "Line cannot have both debit and credit.",
+            "Account is not postable.",
+        ])
+        self.assertEqual(errors[3], ["Cost center requires a project."])
+        self.assertEqual(errors[4], ["Cost center does not belong to selected project."])
+        self.assertNotIn(0, errors)
+
+    def test_validation_error_numbers_the_lines(self):
+        with self.assertRaises(ValidationError) as raised:
+            validate_journal_lines(self._lines())
+        self.assertEqual(raised.exception.messages, [
+            "Line 3: Line cannot have both debit and credit.",
+            "Line 3: Account is not postable.",
+            "Line 4: Cost center requires a project.",
+            "Line 5: Cost center does not belong to selected project.",
+        ])
+
+        validate_journal_lines(self._lines()[:2])
+
+    def test_cached_references_are_not_loaded_again(self):
+        lines = [
+            JournalLine(journal_entry=self.entry, account=self.accounts['1100'], debit=10),
+            JournalLine(journal_entry=self.entry, account=self.accounts['4100'], credit=10),
+        ]
+        with self.assertNumQueries(0):
+            self.assertEqual(get_journal_line_errors(lines), {})
+
+    def test_single_line_is_validated_by_its_clean(self):
+        line = self._lines()[3]
+        with self.assertRaisesMessage(ValidationError, "Cost center requires a project."):
+            line.clean()
+
+    def test_admin_formset_validates_the_lines_together(self):
+        inline = JournalLineInline(JournalEntry, admin.site)
+        request = RequestFactory().post('/')
+        request.user = create_user(is_superuser=True, is_active=True)
+        FormSet = inline.get_formset(request, self.entry)
+        prefix = FormSet.get_default_prefix()
+
+        count = 50
+        data = {
+            f'{prefix}-TOTAL_FORMS': str(count),
+            f'{prefix}-INITIAL_FORMS': '0',
+        }
+        for index in range(count):
+            data.update({
+                f'{prefix}-{index}-account': str(self.accounts['1100'].pk),
+                f'{prefix}-{index}-project': str(self.project.pk),
+                f'{prefix}-{index}-cost_center': str(self.cost_center.pk),
+                f'{prefix}-{index}-debit': '1',
+                f'{prefix}-{index}-credit': '0',
+            })
+        data[f'{prefix}-0-account'] = str(self.accounts['1000'].pk)
+        data[f'{prefix}-1-project'] = str(self.other_project.pk)
+
+        formset = FormSet(data, instance=self.entry, prefix=prefix)
+        # One query per reference field resolves the submitted values;
+        # model validation checks that each line's references exist.
+        with self.assertNumQueries(3 + 3 * count):
+            self.assertFalse(formset.is_valid())
+
+        self.assertEqual(formset.errors[0], {'__all__': ["Account is not postable."]})
+        self.assertEqual(formset.errors[1], {'__all__': ["Cost center does not belong to selected project."]})
+        self.assertEqual(formset.errors[2:], [{}] * (count - 2))
+
+
+@skipIf(connection.vendor == 'postgresql', "Partitioning is supported")
+class PartitioningUnsupportedTests(FinanceTestCase):
+
+    def test_partitioning_is_refused_outside_postgresql(self):
+        with self.assertRaisesMessage(ValidationError, "Journal line partitioning requires PostgreSQL."):
+            partitioning.partition_journal_lines()
+        with self.assertRaisesMessage(CommandError, "Journal line partitioning requires PostgreSQL."):
+            call_command('partition_journal_lines', 'status')
+
+
+@skipUnless(connection.vendor == 'postgresql', "Partitioning requires PostgreSQL")
+class PartitioningTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.post(('1100', 100, 0), ('4100', 0, 100))
+
+    def _count(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {connection.ops.quote_name(table)}")
+            return cursor.fetchone()[0]
+
+    def test_table_is_converted_with_one_partition_per_fiscal_year(self):
+        partition = partitioning.partition_name(self.fiscal_year.pk)
+
+        self.assertFalse(partitioning.is_partitioned())
+        self.assertEqual(
+            partitioning.partition_journal_lines(),
+            [partitioning.DEFAULT_PARTITION, partition]
+        )
+
+        self.assertTrue(partitioning.is_partitioned())
+        self.assertEqual(partitioning.list_partitions(), [partitioning.DEFAULT_PARTITION, partition])
+        self.assertEqual(self._count(partition), 2)
+        self.assertEqual(self._count(partitioning.DEFAULT_PARTITION), 0)
+
+        # New lines get ids from the recreated sequence.
+        self.post(('5100', 30, 0), ('1100', 0, 30))
+        self.assertEqual(self._count(partition), 4)
+        self.assertEqual(JournalLine.objects.values('pk').distinct().count(), 4)
+        self.assertEqual(verify_account_balances(self.company), [])
+
+        with self.assertRaisesMessage(ValidationError, "Journal lines are already partitioned."):
+            partitioning.partition_journal_lines()
+
+    def test_new_fiscal_years_get_their_partition(self):
+        partitioning.partition_journal_lines()
+        next_year = create_fiscal_year(self.company, 2027, is_active=False)
+        self.post(('1100', 10, 0), ('4100', 0, 10), date=datetime.date(2027, 2, 1))
+        self.assertEqual(self._count(partitioning.DEFAULT_PARTITION), 2)
+
+        self.assertEqual(partitioning.create_partitions(), [partitioning.partition_name(next_year.pk)])
+        self.assertEqual(partitioning.create_partitions(), [])
+
+        self.assertEqual(self._count(partitioning.DEFAULT_PARTITION), 0)
+        self.assertEqual(self._count(partitioning.partition_name(next_year.pk)), 2)
+        self.assertEqual(JournalLine.objects.filter(fiscal_year=next_year).count(), 2)
+
+    def test_closed_year_is_detached_and_attached_again(self):
+        partitioning.partition_journal_lines()
+
+        with self.assertRaisesMessage(ValidationError, "Fiscal year 2026 is not closed."):
+            partitioning.detach_partition(self.fiscal_year)
+
+        self.fiscal_year.is_closed = True
+        self.fiscal_year.save()
+
+        name = partitioning.detach_partition(self.fiscal_year)
+        self.assertNotIn(name, partitioning.list_partitions())
+        self.assertFalse(JournalLine.objects.filter(fiscal_year=self.fiscal_year).exists())
+        self.assertEqual(self._count(name), 2)
+        with self.assertRaisesMessage(ValidationError, f"{name} is not attached."):
+            partitioning.detach_partition(self.fiscal_year)
+
+        self.assertEqual(partitioning.attach_partition(self.fiscal_year), name)
+        self.assertEqual(JournalLine.objects.filter(fiscal_year=self.fiscal_year).count(), 2)
+        with self.assertRaisesMessage(ValidationError, f"{name} is already attached."):
+            partitioning.attach_partition(self.fiscal_year)
+
+
+class ProjectProfitabilityTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = Project.objects.create(
+            company=self.company,
+            fiscal_year=self.fiscal_year,
+            code='P1',
+            name="Tower",
+            start_date=datetime.date(2026, 1, 1)
+        )
+        self.structure = self._cost_center('A', is_postable=False)
+        self.foundations = self._cost_center('A1', parent=self.structure)
+        self.finishes = self._cost_center('B')
+
+        self.post(('1200', 1000, 0), ('4100', 0, 1000, self.project, self.structure))
+        self.post(('5100', 300, 0, self.project, self.foundations), ('2100', 0, 300))
+        self.post(('5200', 100, 0, self.project), ('2100', 0, 100))
+        self.post(('5100', 50, 0, self.project, self.finishes), ('2100', 0, 50), date=datetime.date(2026, 6, 1))
+
+    def _cost_center(self, code, parent=None, is_postable=True):
+        return ProjectCostCenter.objects.create(
+            project=self.project,
+            code=code,
+            name=f"Cost center {code}",
+            parent=parent,
+            is_postable=is_postable
+        )
+
+    def _figures(self, row):
+        return row['revenue'], row['cost'], row['margin']
+
+    def test_cost_centers_report_own_and_subtree_figures(self):
+        [project] = get_project_profitability(self.company, fiscal_year=self.fiscal_year)
+
+        self.assertEqual(self._figures(project), (1000, 450, 550))
+        self.assertEqual(self._figures(project['unallocated']), (0, 100, -100))
+        self.assertEqual(
+            [
+                (row['cost_center_code'], row['depth'], self._figures(row), self._figures(row['own']))
+                for row in project['cost_centers']
+            ],
+            [
+                ('A', 0, (1000, 300, 700), (1000, 0, 1000)),
+                ('A1', 1, (0, 300, -300), (0, 300, -300)),
+                ('B', 0, (0, 50, -50), (0, 50, -50)),
+            ]
+        )
+
+    def test_date_range_reads_the_journal_lines(self):
+        [project] = get_project_profitability(
+            self.company,
+            date_from=datetime.date(2026, 1, 1),
+            date_to=datetime.date(2026, 5, 31)
+        )
+        self.assertEqual(self._figures(project), (1000, 400, 600))
+        self.assertEqual(self._figures(project['cost_centers'][-1]), (0, 0, 0))
+
+    def test_requested_projects_without_actuals_are_listed(self):
+        idle = Project.objects.create(
+            company=self.company,
+            fiscal_year=self.fiscal_year,
+            code='P2',
+            name="Idle",
+            start_date=datetime.date(2026, 1, 1)
+        )
+        [project] = get_project_profitability(self.company, projects=[idle])
+        self.assertEqual((project['project_code'], self._figures(project)), ('P2', (0, 0, 0)))
+
+
+class ReportViewTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user('accountant')
+        self.user.user_permissions.add(Permission.objects.get(codename='view_journalline'))
+        self.post(('1100', 100, 0), ('4100', 0, 100))
+
+    def _get(self, view, *args, company=True, **params):
+        request = RequestFactory().get('/', params)
+        request.user = self.user
+        request.company = self.company if company else None
+        return view(request, *args)
+
+    def test_reports_of_the_users_company(self):
+        response = self._get(views.general_ledger_export, year=2026)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="gl-BURJ-2026.csv.gz"')
+        self.assertEqual(len(gzip.decompress(b''.join(response.streaming_content)).splitlines()), 3)
+
+        response = self._get(views.project_profitability, date_from='2026-01-01')
+        self.assertEqual(json.loads(response.content), {'projects': []})
+
+        response = self._get(views.account_statement, '1100', year=2026)
+        self.assertEqual(len(json.loads(response.content)['lines']), 1)
+
+    def test_invalid_query_parameters_are_bad_requests(self):
+        for view, args, params, message in (
+            (views.general_ledger_export, (), {'year': 'last'}, "Invalid year or date."),
+            (views.project_profitability, (), {'date_from': '2026-13-01'}, "Invalid year or date."),
+            (views.account_statement, ('1100',), {}, "Missing year."),
+            (views.account_statement, ('1100',), {'year': 2026, 'cursor': 'x'}, "Invalid cursor or limit."),
+            (views.account_statement, ('1100',), {'year': 2026, 'limit': 'all'}, "Invalid cursor or limit."),
+        ):
+            with self.subTest(view=view.__name__, params=params):
+                with self.assertRaisesMessage(BadRequest, message):
+                    self._get(view, *args, **params)
+
+    def test_unknown_company_year_or_account_is_not_found(self):
+        for view, args, params, company, message in (
+            (views.project_profitability, (), {'year': 2030}, True, "Unknown fiscal year."),
+            (views.account_statement, ('9999',), {'year': 2026}, True, "Unknown account."),
+            (views.general_ledger_export, (), {}, False, "No company for this user."),
+            (views.ledger_integrity_health, (), {}, False, "No company for this user."),
+        ):
+            with self.subTest(view=view.__name__, params=params):
+                with self.assertRaisesMessage(Http404, message):
+                    self._get(view, *args, company=company, **params)
+
+
+class AccountStatementTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for month, amount in ((1, 100), (2, 40), (2, 60), (3, 25), (5, 10)):
+            self.post(('1100', amount, 0), ('4100', 0, amount), date=datetime.date(2026, month, 15))
+        self.post(('5100', 30, 0), ('1100', 0, 30), date=datetime.date(2026, 4, 1))
+
+    def _statement(self, code='1100', **kwargs):
+        account = Account.objects.select_related('account_type').get(pk=self.accounts[code].pk)
+        return get_account_statement(account, self.fiscal_year, **kwargs)
+
+    def test_pages_continue_the_running_balance(self):
+        full = self._statement(limit=100)
+        self.assertEqual(
+            [line['balance'] for line in full['lines']],
+            [100, 140, 200, 225, 195, 205]
+        )
+        self.assertIsNone(full['next_cursor'])
+
+        # Later pages cost the balance up to the cursor, the earlier
+        # years and the page itself.
+        pages = [self._statement(limit=4)]
+        account = Account.objects.select_related('account_type').get(pk=self.accounts['1100'].pk)
+        with self.assertNumQueries(4):
+            pages.append(get_account_statement(
+                account,
+                self.fiscal_year,
+                limit=4,
+                cursor=pages[0]['next_cursor']
+            ))
+
+        self.assertEqual(pages[1]['opening_balance'], pages[0]['closing_balance'])
+        self.assertIsNone(pages[1]['next_cursor'])
+        self.assertEqual([line for page in pages for line in page['lines']], full['lines'])
+
+        for limit in (1, 2, 3):
+            lines, cursor = [], None
+            while True:
+                page = self._statement(limit=limit, cursor=cursor)
+                lines.extend(page['lines'])
+                cursor = page['next_cursor']
+                if not cursor:
+                    break
+            self.assertEqual(lines, full['lines'])
+
+    def test_date_range_opens_with_the_balance_before_it(self):
+        statement = self._statement(
+            date_from=datetime.date(2026, 2, 16),
+            date_to=datetime.date(2026, 4, 30)
+        )
+        self.assertEqual(statement['opening_balance'], 200)
+        self.assertEqual([line['balance'] for line in statement['lines']], [225, 195])
+        self.assertEqual(statement['closing_balance'], 195)
+
+    def test_balance_of_an_unclosed_prior_year_is_brought_forward(self):
+        prior_year = create_fiscal_year(self.company, 2025, is_active=False)
+        create_entry(
+            self.company,
+            prior_year,
+            [(self.accounts['1100'], 70, 0), (self.accounts['4100'], 0, 70)],
+            date=datetime.date(2025, 6, 1)
+        )
+
+        self.assertEqual(self._statement()['opening_balance'], 70)
+        self.assertEqual(self._statement()['closing_balance'], 275)
+        self.assertEqual(self._statement('4100')['opening_balance'], 0)
+        self.assertEqual(self._statement(date_from=datetime.date(2026, 3, 1))['opening_balance'], 270)
+
+        close_fiscal_year(prior_year, self.fiscal_year, self.accounts['3100'])
+
+        statement = self._statement()
+        self.assertEqual(statement['opening_balance'], 0)
+        self.assertEqual(statement['lines'][0]['debit'], 70)
+        self.assertEqual(statement['closing_balance'], 275)
+
+
+class LedgerAnalyticsTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = Project.objects.create(
+            company=self.company,
+            fiscal_year=self.fiscal_year,
+            code='P1',
+            name="Tower",
+            start_date=datetime.date(2026, 1, 1)
+        )
+        self.cost_center = ProjectCostCenter.objects.create(project=self.project, code='CC1', name="Civil")
+        self.post(('1100', '100.10', 0), ('4100', 0, '100.10'), date=datetime.date(2026, 1, 31))
+        self.post(
+            ('5100', '30.05', 0, self.project, self.cost_center),
+            ('5200', '0.01', 0, self.project),
+            ('1100', 0, '30.06'),
+            date=datetime.date(2026, 2, 1)
+        )
+        self.post(('5100', '12.34', 0, self.project, self.cost_center), ('2100', 0, '12.34'), date=datetime.date(2026, 12, 31))
+        create_entry(self.company, self.fiscal_year, [(self.accounts['1100'], 999, 0)], post=False)
+
+    def _orm_net(self, *keys, **filters):
+        rows = (
+            JournalLine.objects
+            .filter(fiscal_year=self.fiscal_year, is_posted=True, **filters)
+            .values(*keys)
+            .annotate(debit=Sum('debit'), credit=Sum('credit'))
+            .order_by()
+        )
+        return {
+            tuple(row[key] or 0 for key in keys): row['debit'] - row['credit']
+            for row in rows
+        }
+
+    def test_group_sums_and_pivots_equal_the_orm(self):
+        frame = load_ledger(self.company, self.fiscal_year)
+        self.assertEqual(len(frame), 7)
+
+        groups, sums = frame.group_sum('account')
+        self.assertEqual(
+            {(int(account),): total for (account,), total in zip(groups, to_decimal(sums))},
+            self._orm_net('account')
+        )
+
+        project_ids, cost_center_ids, matrix = frame.pivot('project', 'cost_center')
+        pivot = {
+            (int(project), int(cost_center)): to_decimal(matrix[row, column])
+            for row, project in enumerate(project_ids)
+            for column, cost_center in enumerate(cost_center_ids)
+            if matrix[row, column]
+        }
+        expected = {key: net for key, net in self._orm_net('project', 'cost_center').items() if net}
+        self.assertEqual(pivot, expected)
+
+    def test_period_matrix_equals_the_balance_table(self):
+        frame = load_ledger(self.company, self.fiscal_year)
+        account_ids, matrix = frame.period_matrix()
+        self.assertEqual(matrix.shape, (len(account_ids), 12))
+
+        balances = {
+            (balance.account_id, balance.period): balance.debit - balance.credit
+            for balance in AccountPeriodBalance.objects.filter(fiscal_year=self.fiscal_year)
+            if balance.debit - balance.credit
+        }
+        self.assertEqual(
+            {
+                (int(account_ids[row]), column + 1): to_decimal(matrix[row, column])
+                for row in range(len(account_ids))
+                for column in range(12)
+                if matrix[row, column]
+            },
+            balances
+        )
+
+        _, cumulative = frame.period_matrix(cumulative=True)
+        cash = list(account_ids).index(self.accounts['1100'].pk)
+        self.assertEqual(to_decimal(cumulative[cash, [0, 1, 11]]), [Decimal('100.10'), Decimal('70.04'), Decimal('70.04')])
+
+    def test_filters_match_the_orm(self):
+        frame = load_ledger(
+            self.company,
+            self.fiscal_year,
+            projects=[self.project],
+            date_from=datetime.date(2026, 2, 1),
+            date_to=datetime.date(2026, 6, 30)
+        )
+        groups, sums = frame.group_sum('account', 'period', value='debit')
+        self.assertEqual(
+            [(int(account), int(period), amount) for (account, period), amount in zip(groups, to_decimal(sums))],
+            [
+                (self.accounts['5100'].pk, 2, Decimal('30.05')),
+                (self.accounts['5200'].pk, 2, Decimal('0.01')),
+            ]
+        )
+
+
+class ReportCacheTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.post(('1100', 100, 0), ('4100', 0, 100))
+
+    def test_cached_trial_balance_is_recomputed_after_a_posting(self):
+        first = get_trial_balance(self.company, self.fiscal_year)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_trial_balance(self.company, self.fiscal_year), first)
+
+        self.post(('5100', 30, 0), ('1100', 0, 30))
+
+        self.assertEqual(_totals(get_trial_balance(self.company, self.fiscal_year)), {
+            '1100': (100, 30),
+            '4100': (0, 100),
+            '5100': (30, 0),
+        })
+
+    def test_cached_trial_balance_is_recomputed_after_chart_edits(self):
+        get_trial_balance(self.company, self.fiscal_year, rollup=True)
+
+        cash = self.accounts['1100']
+        cash.name = "Cash at bank"
+        cash.parent = self.accounts['2000']
+        cash.save()
+
+        rows = {row['account_code']: row for row in get_trial_balance(self.company, self.fiscal_year, rollup=True)}
+        self.assertEqual(rows['1100']['account_name'], "Cash at bank")
+        self.assertEqual((rows['1000']['debit'], rows['1000']['credit']), (0, 0))
+        self.assertEqual((rows['2000']['debit'], rows['2000']['credit']), (100, 0))
+
+    def test_cached_profitability_is_recomputed_after_cost_center_edits(self):
+        project = Project.objects.create(
+            company=self.company,
+            fiscal_year=self.fiscal_year,
+            code='P1',
+            name="Tower",
+            start_date=datetime.date(2026, 1, 1)
+        )
+        civil = ProjectCostCenter.objects.create(project=project, code='CC1', name="Civil")
+        steel = ProjectCostCenter.objects.create(project=project, code='CC2', name="Steel")
+        self.post(('5100', 30, 0, project, steel), ('1100', 0, 30))
+
+        [before] = get_project_profitability(self.company, self.fiscal_year)
+        self.assertEqual([row['cost'] for row in before['cost_centers']], [0, 30])
+
+        steel.parent = civil
+        steel.save()
+
+        [after] = get_project_profitability(self.company, self.fiscal_year)
+        self.assertEqual(
+            [(row['cost_center_code'], row['depth'], row['cost']) for row in after['cost_centers']],
+            [('CC1', 0, 30), ('CC2', 1, 30)]
+        )
+
+    def test_ledger_version_is_bumped_as_the_last_statement_of_a_posting(self):
+        version = ledger_version(self.company, self.fiscal_year)
+        entry = create_entry(
+            self.company,
+            self.fiscal_year,
+            [(self.accounts['5100'], 30, 0), (self.accounts['1100'], 0, 30)],
+            post=False
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            entry.post(get_document_type('JE'))
+
+        statements = [
+            query['sql'] for query in queries.captured_queries
+            if 'SAVEPOINT' not in query['sql']
+        ]
+        self.assertIn('"finance_ledgerversion"', statements[-1])
+        self.assertTrue(statements[-1].startswith('UPDATE'))
+        self.assertEqual(ledger_version(self.company, self.fiscal_year), version + 1)
+
+
+class LedgerIntegrityTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Commit the postings, so their edits are flushed now rather
+        # than by the first commit of the test.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post(('1100', 100, 0), ('4100', 0, 100), date=datetime.date(2026, 2, 10))
+            self.post(('5100', 30, 0), ('1100', 0, 30), date=datetime.date(2026, 3, 10))
+
+    def _checksums(self):
+        return {
+            checksum.period: checksum
+            for checksum in PeriodChecksum.objects.filter(company=self.company)
+        }
+
+    def _problems(self, checksums):
+        return {checksum.period: checksum.problem for checksum in checksums if not checksum.is_valid}
+
+    def test_postings_are_sealed_and_verified(self):
+        self.assertEqual(PeriodChecksumDelta.objects.count(), 2)
+        self.assertEqual(integrity.ledger_health(self.company)['pending_periods'], 0)
+
+        checksums = integrity.verify_ledger(self.company)
+        self.assertEqual([(checksum.period, checksum.is_valid) for checksum in checksums], [(2, True), (3, True)])
+        self.assertFalse(PeriodChecksumDelta.objects.exists())
+        self.assertEqual(self._checksums()[2].line_count, 2)
+
+        self.post(('1100', 5, 0), ('4100', 0, 5), date=datetime.date(2026, 2, 20))
+        self.assertEqual(integrity.ledger_health(self.company)['pending_periods'], 1)
+        [checksum] = integrity.verify_ledger(self.company)
+        self.assertEqual((checksum.period, checksum.line_count, checksum.is_valid), (2, 4, True))
+        self.assertEqual(integrity.verify_ledger(self.company), [])
+
+    def test_tampered_line_is_found_by_the_full_verification(self):
+        integrity.verify_ledger(self.company)
+
+        JournalLine.objects.filter(account=self.accounts['5100']).update(debit=31)
+        self.assertEqual(integrity.verify_ledger(self.company), [])
+
+        problems = self._problems(integrity.verify_ledger(self.company, full=True))
+        self.assertEqual(list(problems), [3])
+        self.assertIn("debits 31.00 do not equal credits 30.00", problems[3])
+        self.assertIn("line content differs from the sealed digest", problems[3])
+        self.assertIn("account period balances differ from the ledger", problems[3])
+        self.assertEqual(integrity.ledger_health(self.company)['status'], 'failing')
+
+        with self.assertRaisesMessage(CommandError, "1 of 2 periods failed verification."):
+            call_command('verify_ledger_integrity', full=True, stderr=io.StringIO())
+
+    def test_saved_edits_flag_their_period(self):
+        integrity.verify_ledger(self.company)
+
+        line = JournalLine.objects.get(account=self.accounts['4100'])
+        with self.captureOnCommitCallbacks(execute=True):
+            line.credit = 99
+            line.save()
+        self.assertTrue(self._checksums()[2].is_dirty)
+
+        problems = self._problems(integrity.verify_ledger(self.company))
+        self.assertEqual(list(problems), [2])
+        self.assertFalse(any(checksum.is_dirty for checksum in self._checksums().values()))
+
+    def test_edits_of_another_thread_are_flagged_by_its_own_commit(self):
+        integrity.verify_ledger(self.company)
+
+        def edit_without_committing():
+            # The transaction of this thread never commits.
+            with mock.patch.object(integrity.transaction, 'on_commit'):
+                integrity.mark_dirty(self.company.pk, self.fiscal_year.pk, datetime.date(2026, 3, 10))
+
+        thread = threading.Thread(target=edit_without_committing)
+        thread.start()
+        thread.join()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            integrity.mark_dirty(self.company.pk, self.fiscal_year.pk, datetime.date(2026, 2, 10))
+
+        checksums = self._checksums()
+        self.assertEqual((checksums[2].is_dirty, checksums[3].is_dirty), (True, False))
+
+    def test_reseal_accepts_the_ledger(self):
+        # Period 3 was never sealed.
+        PeriodChecksumDelta.objects.filter(period=3).delete()
+
+        problems = self._problems(integrity.verify_ledger(self.company, full=True))
+        self.assertEqual(problems, {
+            3: "2 posted lines, 0 sealed; totals 30.00/30.00 differ from sealed 0.00/0.00; "
+               "line content differs from the sealed digest"
+        })
+
+        self.assertEqual(integrity.reseal_ledger(self.company), 2)
+        self.assertFalse(PeriodChecksumDelta.objects.exists())
+        self.assertEqual(self._problems(integrity.verify_ledger(self.company, full=True)), {})
+
+    def test_postings_during_the_verification_are_read_again(self):
+        checksum = PeriodChecksum.objects.create(company=self.company, fiscal_year=self.fiscal_year, period=2)
+        check = integrity._check
+        calls = []
+
+        def check_while_posting(checksum, sealed):
+            calls.append(sealed[2])
+            if len(calls) == 1:
+                # A posting commits between the reads of the ledger and the deltas.
+                self.post(('1100', 5, 0), ('4100', 0, 5), date=datetime.date(2026, 2, 20))
+            return check(checksum, sealed)
+
+        with mock.patch.object(integrity, '_check', check_while_posting):
+            checksum = integrity.verify_period(checksum)
+
+        self.assertEqual(calls, [2, 4])
+        self.assertEqual((checksum.line_count, checksum.is_valid), (4, True))
+        self.assertFalse(PeriodChecksumDelta.objects.filter(period=2).exists())
@@ -0,0 +1,28 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'finance'
+
+urlpatterns = [
+    path(
+        'general-ledger/export/',
+        views.general_ledger_export,
+        name='general-ledger-export'
+    ),
+    path(
+        'projects/profitability/',
+        views.project_profitability,
+        name='project-profitability'
+    ),
+    path(
+        'accounts/<str:code>/statement/',
+        views.account_statement,
+        name='account-statement'
+    ),
+    path(
+        'health/ledger/',
+        views.ledger_integrity_health,
+        name='ledger-integrity-health'
+    ),
+]
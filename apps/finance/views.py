@@ -1,3 +1,146 @@
-from django.shortcuts import render
+import datetime
 
-# Create your views here.
+from django.contrib.auth.decorators import login_required, permission_required
+from django.core.exceptions import BadRequest
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from apps.core.models import FiscalYear
+from apps.finance.models import Account
+from apps.finance.services.account_statement import (
+    decode_cursor,
+    get_account_statement,
+)
+from apps.finance.services.gl_export import general_ledger_rows, iter_gzip_csv
+from apps.finance.services.integrity import ledger_health
+from apps.finance.services.project_profitability import get_project_profitability
+
+
+def _parse_date(value):
+    return datetime.date.fromisoformat(value) if value else None
+
+
+def _company(request):
+    if request.company is None:
+        raise Http404("No company for this user.")
+    return request.company
+
+
+def _report_params(request, year_required=False):
+    """
+    The user's company, the fiscal year named by the `year` query
+    parameter and the `date_from`/`date_to` ISO dates.
+    Raises BadRequest for malformed values, Http404 for an unknown
+    company or fiscal year.
+    Returns (company, fiscal_year, date_from, date_to).
+    """
+    company = _company(request)
+
+    try:
+        date_from = _parse_date(request.GET.get('date_from'))
+        date_to = _parse_date(request.GET.get('date_to'))
+        year = int(request.GET['year']) if request.GET.get('year') else None
+    except ValueError:
+        raise BadRequest("Invalid year or date.")
+
+    if year is None:
+        if year_required:
+            raise BadRequest("Missing year.")
+        return company, None, date_from, date_to
+
+    fiscal_year = FiscalYear.objects.filter(company=company, year=year).first()
+    if fiscal_year is None:
+        raise Http404("Unknown fiscal year.")
+    return company, fiscal_year, date_from, date_to
+
+
+@require_GET
+@login_required
+@permission_required('finance.view_journalline', raise_exception=True)
+def general_ledger_export(request):
+    """
+    Stream the posted general ledger of the user's company as gzip CSV.
+    Query parameters: year, date_from, date_to (ISO dates).
+    """
+    company, fiscal_year, date_from, date_to = _report_params(request)
+
+    rows = general_ledger_rows(
+        company,
+        fiscal_year=fiscal_year,
+        date_from=date_from,
+        date_to=date_to
+    )
+
+    filename = f"gl-{company.code}-{fiscal_year.year if fiscal_year else 'all'}.csv.gz"
+    response = StreamingHttpResponse(iter_gzip_csv(rows), content_type='application/gzip')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@require_GET
+@login_required
+@permission_required('finance.view_journalline', raise_exception=True)
+def project_profitability(request):
+    """
+    Revenue, cost and margin per project and WBS cost center of the
+    user's company as JSON.
+    Query parameters: year, date_from, date_to (ISO dates).
+    """
+    company, fiscal_year, date_from, date_to = _report_params(request)
+
+    projects = get_project_profitability(
+        company,
+        fiscal_year=fiscal_year,
+        date_from=date_from,
+        date_to=date_to
+    )
+    return JsonResponse({'projects': projects})
+
+
+@require_GET
+@login_required
+@permission_required('finance.view_journalline', raise_exception=True)
+def account_statement(request, code):
+    """
+    One page of an account statement of the user's company as JSON.
+    Query parameters: year (required), date_from, date_to (ISO dates),
+    cursor (next_cursor of the previous page), limit.
+    """
+    company, fiscal_year, date_from, date_to = _report_params(request, year_required=True)
+
+    cursor = request.GET.get('cursor')
+    try:
+        limit = int(request.GET.get('limit', 100))
+        if cursor:
+            decode_cursor(cursor)
+    except ValueError:
+        raise BadRequest("Invalid cursor or limit.")
+
+    account = Account.objects.select_related('account_type').filter(
+        company=company,
+        code=code
+    ).first()
+    if account is None:
+        raise Http404("Unknown account.")
+
+    statement = get_account_statement(
+        account,
+        fiscal_year,
+        date_from=date_from,
+        date_to=date_to,
+        cursor=cursor,
+        limit=limit
+    )
+    return JsonResponse(statement)
+
+
+@require_GET
+@login_required
+@permission_required('finance.view_journalline', raise_exception=True)
+def ledger_integrity_health(request):
+    """
+    Ledger integrity state of the user's company as recorded by the
+    last verify_ledger_integrity run; 503 while any period fails.
+    """
+    health = ledger_health(_company(request))
+    return JsonResponse(health, status=503 if health['invalid_periods'] else 200)
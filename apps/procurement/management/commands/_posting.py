@@ -0,0 +1,124 @@
+import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from apps.common.processes import init_process
+from apps.core.models import Company
+from apps.procurement.services import draft_documents, post_company_drafts
+
+
+def _failure(company_id, exc):
+    # Failures of a chunk are reported by post_documents with the
+    # documents posted before it; this covers the rest (the company
+    # lookup, a crashed pool process).
+    return company_id, 0, {None: f"{type(exc).__name__}: {exc}"}
+
+
+class PostDocumentsCommand(BaseCommand):
+    """
+    Post the drafts of one postable document type, one company per
+    pool process. Subclasses set `document_type_code` and `label`.
+    """
+    document_type_code = None
+    label = None
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company',
+            action='append',
+            help="Company code (repeatable; default: every company with drafts)"
+        )
+        parser.add_argument('--date-from', type=datetime.date.fromisoformat)
+        parser.add_argument('--date-to', type=datetime.date.fromisoformat)
+        parser.add_argument('--chunk-size', type=int, default=500, help="Drafts per transaction")
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help="Companies posted in parallel, one per process"
+        )
+
+    def handle(self, *args, **options):
+        drafts = draft_documents(
+            self.document_type_code,
+            date_from=options['date_from'],
+            date_to=options['date_to']
+        )
+        if options['company']:
+            companies = Company.objects.filter(code__in=options['company'])
+            unknown = set(options['company']) - set(companies.values_list('code', flat=True))
+            if unknown:
+                raise CommandError(f"Unknown company {', '.join(sorted(unknown))}.")
+            drafts = drafts.filter(company__in=companies)
+
+        company_ids = sorted(set(drafts.values_list('company', flat=True)))
+        if not company_ids:
+            self.stdout.write(f"No draft {self.label} to post.")
+            return
+
+        tasks = [
+            (
+                self.document_type_code,
+                company_id,
+                options['date_from'],
+                options['date_to'],
+                max(1, options['chunk_size']),
+            )
+            for company_id in company_ids
+        ]
+        processes = min(max(1, options['processes']), len(tasks))
+
+        if processes == 1:
+            self._report(self._serial_results(tasks), drafts)
+            return
+
+        # Spawned processes do not inherit this process's connections.
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_process
+        ) as pool:
+            futures = {
+                pool.submit(post_company_drafts, *task): task[1]
+                for task in tasks
+            }
+            self._report(self._results(futures), drafts)
+
+    # A failing company stops at its current chunk, which is rolled
+    # back; earlier chunks stay posted, are counted in the report, and
+    # a rerun picks up the rest.
+
+    def _serial_results(self, tasks):
+        for task in tasks:
+            try:
+                yield post_company_drafts(*task)
+            except Exception as exc:
+                yield _failure(task[1], exc)
+
+    def _results(self, futures):
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as exc:
+                yield _failure(futures[future], exc)
+
+    def _report(self, results, drafts):
+        codes = dict(Company.objects.values_list('pk', 'code'))
+        total = 0
+        failed = False
+        for company_id, posted, errors in results:
+            total += posted
+            failed = failed or bool(errors)
+            self.stdout.write(f"{codes.get(company_id, company_id)}: {posted} {self.label} posted")
+            for pk, message in errors.items():
+                self.stderr.write(f"  {pk or 'stopped'}: {message}")
+
+        self.stdout.write(self.style.SUCCESS(f"Posted {total} {self.label}."))
+        if failed:
+            # A stopped company leaves its failing chunk and every later
+            # one unposted: count what is left rather than the errors.
+            raise CommandError(f"{drafts.count()} {self.label} were not posted.")
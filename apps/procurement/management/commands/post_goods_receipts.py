@@ -0,0 +1,7 @@
+from ._posting import PostDocumentsCommand
+
+
+class Command(PostDocumentsCommand):
+    help = "Post draft goods receipts in chunks, companies in parallel processes."
+    document_type_code = 'GR'
+    label = "goods receipts"
@@ -0,0 +1,7 @@
+from ._posting import PostDocumentsCommand
+
+
+class Command(PostDocumentsCommand):
+    help = "Post draft vendor invoices in chunks, companies in parallel processes."
+    document_type_code = 'VI'
+    label = "vendor invoices"
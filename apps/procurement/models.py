@@ -3,8 +3,14 @@ from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
-from apps.core.models import Company, TimeStampedModel, DocumentType
-from apps.core.services import get_next_document_number
+from apps.core.models import Company, CompanyQuerySet, TimeStampedModel
+from apps.core.services import (
+    get_document_type,
+    get_next_document_number,
+    get_next_document_numbers_by_type,
+    get_open_fiscal_year,
+    get_settings,
+)
 from apps.finance.models import Account
 from apps.projects.models import Project, ProjectCostCenter
 
@@ -32,6 +38,8 @@ class Vendor(TimeStampedModel):
 
     is_active = models.BooleanField(default=True)
 
+    objects = CompanyQuerySet.as_manager()
+
     class Meta:
         unique_together = ('company', 'code')
         ordering = ('code',)
@@ -103,6 +111,8 @@ class PurchaseRequest(TimeStampedModel):
         default=STATUS_DRAFT
     )
 
+    objects = CompanyQuerySet.as_manager()
+
     class Meta:
         ordering = ('-created_at',)
         verbose_name = "Purchase Request"
@@ -187,6 +197,8 @@ class PurchaseOrder(TimeStampedModel):
 
     issued_at = models.DateTimeField(null=True, blank=True)
 
+    objects = CompanyQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Purchase Order"
         verbose_name_plural = "Purchase Orders"
@@ -195,8 +207,8 @@ class PurchaseOrder(TimeStampedModel):
         if self.status != self.STATUS_DRAFT:
             raise ValidationError("Only draft PO can be issued.")
 
-        fiscal_year = self.purchase_request.project.fiscal_year
-        doc_type = DocumentType.objects.get(code='PO')
+        fiscal_year = get_open_fiscal_year(self.company, self.order_date)
+        doc_type = get_document_type('PO')
 
         self.document_number = get_next_document_number(
             company=self.company,
@@ -209,10 +221,68 @@ class PurchaseOrder(TimeStampedModel):
         self.save()
 
 
+# =========================================================
+# Posting helpers
+# =========================================================
+
+def _reserve_posting_numbers(document, fiscal_year, document_type_code,
+                             document_number=None, entry_number=None):
+    """
+    Reserve the numbers a posting still needs, the document's and,
+    if it creates one, its journal entry's, in one go.
+    Returns (document_number, entry_number).
+    """
+    counts = {}
+    doc_type = je_type = None
+    if not document_number:
+        doc_type = get_document_type(document_type_code)
+        counts[doc_type] = 1
+    if not entry_number and document.creates_journal_entry():
+        je_type = get_document_type('JE')
+        counts[je_type] = 1
+
+    if counts:
+        numbers = get_next_document_numbers_by_type(
+            document.company, fiscal_year, counts
+        )
+        if doc_type:
+            document_number = numbers[doc_type][0]
+        if je_type:
+            entry_number = numbers[je_type][0]
+
+    return document_number, entry_number
+
+
+def _save_journal_entry(entry, lines):
+    """
+    Save a built entry, bulk-create its lines and add them
+    to the account balances.
+    """
+    from apps.finance.models import JournalLine
+    from apps.finance.services.balances import apply_journal_lines
+
+    entry.save()
+    for line in lines:
+        line.journal_entry = entry
+        line.copy_entry_fields()
+    JournalLine.objects.bulk_create(lines)
+    apply_journal_lines(lines)
+
+
 # =========================================================
 # Goods Receipt
 # =========================================================
 
+class GoodsReceiptQuerySet(CompanyQuerySet):
+
+    def for_posting(self):
+        """
+        Load the company, vendor and AP account that posting reads
+        together with the receipts.
+        """
+        return self.select_related('company', 'purchase_order__vendor__ap_account')
+
+
 class GoodsReceipt(TimeStampedModel):
     STATUS_DRAFT = 'draft'
     STATUS_POSTED = 'posted'
@@ -246,69 +316,89 @@ class GoodsReceipt(TimeStampedModel):
 
     posted_at = models.DateTimeField(null=True, blank=True)
 
+    objects = GoodsReceiptQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Goods Receipt"
         verbose_name_plural = "Goods Receipts"
 
+    def get_fiscal_year(self):
+        return get_open_fiscal_year(self.company, self.receipt_date)
+
+    def creates_journal_entry(self):
+        return get_settings(self.company).posts_on_goods_receipt
+
     @transaction.atomic
-    def post(self):
+    def post(self, document_number=None, entry_number=None):
+        """
+        Post the receipt and, if the company's accounting trigger
+        asks for it, its GRNI journal entry.
+        Callers may pass numbers reserved up front; load receipts
+        with GoodsReceipt.objects.for_posting() to avoid lazy queries.
+        For many receipts use apps.procurement.services.
+        """
         if self.status != self.STATUS_DRAFT:
             raise ValidationError("Only draft GR can be posted.")
 
-        fiscal_year = self.purchase_order.purchase_request.project.fiscal_year
-        gr_type = DocumentType.objects.get(code='GR')
-
-        self.document_number = get_next_document_number(
-            company=self.company,
-            fiscal_year=fiscal_year,
-            document_type=gr_type
+        fiscal_year = self.get_fiscal_year()
+        document_number, entry_number = _reserve_posting_numbers(
+            self, fiscal_year, 'GR', document_number, entry_number
         )
 
+        self.document_number = document_number
         self.status = self.STATUS_POSTED
         self.posted_at = timezone.now()
-        self.save()
+        self.save(update_fields=['document_number', 'status', 'posted_at', 'updated_at'])
 
-        self._post_grni_entry(fiscal_year)
+        if self.creates_journal_entry():
+            _save_journal_entry(*self.build_journal_entry(fiscal_year, entry_number))
 
-    def _post_grni_entry(self, fiscal_year):
+    def build_journal_entry(self, fiscal_year, entry_number):
+        """
+        The unsaved GRNI entry of the posted receipt and its lines.
+        """
         from apps.finance.models import JournalEntry, JournalLine
 
-        je_type = DocumentType.objects.get(code='JE')
-
-        entry = JournalEntry.objects.create(
+        entry = JournalEntry(
             company=self.company,
             fiscal_year=fiscal_year,
-            document_number=get_next_document_number(
-                company=self.company,
-                fiscal_year=fiscal_year,
-                document_type=je_type
-            ),
+            document_number=entry_number,
             date=self.receipt_date,
             description=f"Goods Receipt {self.document_number}",
             is_posted=True
         )
 
-        vendor = self.purchase_order.vendor
-
-        JournalLine.objects.create(
-            journal_entry=entry,
-            account=vendor.ap_account,
-            debit=self.amount,
-            credit=0
-        )
+        account = self.purchase_order.vendor.ap_account
 
-        JournalLine.objects.create(
-            journal_entry=entry,
-            account=vendor.ap_account,
-            debit=0,
-            credit=self.amount
-        )
+        lines = [
+            JournalLine(
+                account=account,
+                debit=self.amount,
+                credit=0
+            ),
+            JournalLine(
+                account=account,
+                debit=0,
+                credit=self.amount
+            ),
+        ]
+        return entry, lines
 
 
 # =========================================================
 # Vendor Invoice
 # =========================================================
 
+class VendorInvoiceQuerySet(CompanyQuerySet):
+
+    def for_posting(self):
+        """
+        Load the company, vendor and AP account that posting reads
+        together with the invoices.
+        """
+        return self.select_related('company', 'vendor__ap_account')
+
+
 class VendorInvoice(TimeStampedModel):
     STATUS_DRAFT = 'draft'
     STATUS_POSTED = 'posted'
@@ -348,58 +438,70 @@ class VendorInvoice(TimeStampedModel):
 
     posted_at = models.DateTimeField(null=True, blank=True)
 
+    objects = VendorInvoiceQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Vendor Invoice"
         verbose_name_plural = "Vendor Invoices"
 
+    def get_fiscal_year(self):
+        return get_open_fiscal_year(self.company, self.invoice_date)
+
+    def creates_journal_entry(self):
+        return get_settings(self.company).posts_on_vendor_invoice
+
     @transaction.atomic
-    def post(self):
+    def post(self, document_number=None, entry_number=None):
+        """
+        Post the invoice and, if the company's accounting trigger
+        asks for it, its AP journal entry.
+        Callers may pass numbers reserved up front; load invoices
+        with VendorInvoice.objects.for_posting() to avoid lazy queries.
+        For many invoices use apps.procurement.services.
+        """
         if self.status != self.STATUS_DRAFT:
             raise ValidationError("Only draft invoices can be posted.")
 
-        fiscal_year = self.goods_receipt.purchase_order.purchase_request.project.fiscal_year
-        vi_type = DocumentType.objects.get(code='VI')
-
-        self.document_number = get_next_document_number(
-            company=self.company,
-            fiscal_year=fiscal_year,
-            document_type=vi_type
+        fiscal_year = self.get_fiscal_year()
+        document_number, entry_number = _reserve_posting_numbers(
+            self, fiscal_year, 'VI', document_number, entry_number
         )
 
+        self.document_number = document_number
         self.status = self.STATUS_POSTED
         self.posted_at = timezone.now()
-        self.save()
+        self.save(update_fields=['document_number', 'status', 'posted_at', 'updated_at'])
 
-        self._post_ap_entry(fiscal_year)
+        if self.creates_journal_entry():
+            _save_journal_entry(*self.build_journal_entry(fiscal_year, entry_number))
 
-    def _post_ap_entry(self, fiscal_year):
+    def build_journal_entry(self, fiscal_year, entry_number):
+        """
+        The unsaved AP entry of the posted invoice and its lines.
+        """
         from apps.finance.models import JournalEntry, JournalLine
 
-        je_type = DocumentType.objects.get(code='JE')
-
-        entry = JournalEntry.objects.create(
+        entry = JournalEntry(
             company=self.company,
             fiscal_year=fiscal_year,
-            document_number=get_next_document_number(
-                company=self.company,
-                fiscal_year=fiscal_year,
-                document_type=je_type
-            ),
+            document_number=entry_number,
             date=self.invoice_date,
             description=f"Vendor Invoice {self.document_number}",
             is_posted=True
         )
 
-        JournalLine.objects.create(
-            journal_entry=entry,
-            account=self.vendor.ap_account,
-            debit=self.amount,
-            credit=0
-        )
+        account = self.vendor.ap_account
 
-        JournalLine.objects.create(
-            journal_entry=entry,
-            account=self.vendor.ap_account,
-            debit=0,
-            credit=self.amount
-        )
+        lines = [
+            JournalLine(
+                account=account,
+                debit=self.amount,
+                credit=0
+            ),
+            JournalLine(
+                account=account,
+                debit=0,
+                credit=self.amount
+            ),
+        ]
+        return entry, lines
@@ -0,0 +1,187 @@
+from collections import defaultdict
+from itertools import repeat
+
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from apps.core.models import Company
+from apps.core.services import get_document_type, get_next_document_numbers_by_type
+from apps.finance.models import JournalEntry, JournalLine
+from apps.finance.services.balances import apply_journal_lines
+
+from .models import GoodsReceipt, VendorInvoice
+
+
+# Postable document models by document type code, with the date field
+# that decides their fiscal year.
+POSTABLE_DOCUMENTS = {
+    'GR': (GoodsReceipt, 'receipt_date'),
+    'VI': (VendorInvoice, 'invoice_date'),
+}
+
+
+def draft_documents(document_type_code, company=None, date_from=None, date_to=None):
+    """
+    Draft documents of a postable type, in posting order (by date).
+    """
+    model, date_field = POSTABLE_DOCUMENTS[document_type_code]
+    drafts = model.objects.filter(status=model.STATUS_DRAFT)
+    if company:
+        drafts = drafts.filter(company=company)
+    if date_from:
+        drafts = drafts.filter(**{f'{date_field}__gte': date_from})
+    if date_to:
+        drafts = drafts.filter(**{f'{date_field}__lte': date_to})
+    return drafts.order_by(date_field, 'pk')
+
+
+def _post_chunk(document_type_code, pks):
+    """
+    Post one chunk of drafts in one transaction, so gapless sequences
+    stay gapless if anything fails:
+
+    - the drafts are reloaded with for_posting() and locked;
+    - numbers are reserved as one range per company and fiscal year,
+      documents and journal entries together;
+    - documents are updated with bulk_update, journal entries and
+      their lines written with bulk_create.
+
+    Returns (documents posted, {pk: error message}).
+    """
+    model, date_field = POSTABLE_DOCUMENTS[document_type_code]
+    doc_type = get_document_type(document_type_code)
+    je_type = get_document_type('JE')
+    errors = {}
+
+    with transaction.atomic():
+        documents = list(
+            model.objects
+            .for_posting()
+            .select_for_update(of=('self',))
+            .filter(pk__in=pks, status=model.STATUS_DRAFT)
+            .order_by(date_field, 'pk')
+        )
+        locked = {document.pk for document in documents}
+        for pk in pks:
+            if pk not in locked:
+                errors[pk] = "Document is not a draft."
+
+        groups = defaultdict(list)
+        for document in documents:
+            try:
+                fiscal_year = document.get_fiscal_year()
+            except ValidationError as exc:
+                errors[document.pk] = exc.messages[0]
+                continue
+            groups[(document.company, fiscal_year)].append(document)
+
+        now = timezone.now()
+        posted = []
+        entries = []
+        lines = []
+        for (company, fiscal_year), group in groups.items():
+            counts = {doc_type: len(group)}
+            if group[0].creates_journal_entry():
+                counts[je_type] = len(group)
+            numbers = get_next_document_numbers_by_type(company, fiscal_year, counts)
+
+            for document, document_number, entry_number in zip(
+                group,
+                numbers[doc_type],
+                numbers.get(je_type, repeat(None))
+            ):
+                document.document_number = document_number
+                document.status = model.STATUS_POSTED
+                document.posted_at = now
+                document.updated_at = now
+
+                if entry_number:
+                    entry, entry_lines = document.build_journal_entry(fiscal_year, entry_number)
+                    for line in entry_lines:
+                        line.journal_entry = entry
+                    entries.append(entry)
+                    lines.extend(entry_lines)
+            posted.extend(group)
+
+        model.objects.bulk_update(
+            posted,
+            ['document_number', 'status', 'posted_at', 'updated_at'],
+            batch_size=1000
+        )
+        JournalEntry.objects.bulk_create(entries, batch_size=1000)
+        for line in lines:
+            line.copy_entry_fields()
+        JournalLine.objects.bulk_create(lines, batch_size=2000)
+        apply_journal_lines(lines)
+
+    return len(posted), errors
+
+
+def post_documents(document_type_code, documents, chunk_size=500, on_chunk=None):
+    """
+    Post draft documents (instances, pks or a queryset) of a postable
+    type in chunks of `chunk_size`, each in its own transaction.
+    `on_chunk(posted, errors)` is called with the running totals.
+
+    A chunk that fails is rolled back and stops the posting: earlier
+    chunks stay posted, and the error is reported under the key None.
+    Returns (documents posted, {pk: error message}).
+    """
+    if hasattr(documents, 'values_list'):
+        pks = list(documents.values_list('pk', flat=True))
+    else:
+        pks = [getattr(document, 'pk', document) for document in documents]
+
+    posted = 0
+    errors = {}
+    for start in range(0, len(pks), chunk_size):
+        try:
+            chunk_posted, chunk_errors = _post_chunk(
+                document_type_code, pks[start:start + chunk_size]
+            )
+        except Exception as exc:
+            errors[None] = f"{type(exc).__name__}: {exc}"
+            break
+        posted += chunk_posted
+        errors.update(chunk_errors)
+        if on_chunk:
+            on_chunk(posted, errors)
+
+    return posted, errors
+
+
+def post_goods_receipts(receipts, chunk_size=500):
+    """
+    Post several draft goods receipts.
+    Returns (receipts posted, {pk: error message}).
+    """
+    return post_documents('GR', receipts, chunk_size=chunk_size)
+
+
+def post_vendor_invoices(invoices, chunk_size=500):
+    """
+    Post several draft vendor invoices.
+    Returns (invoices posted, {pk: error message}).
+    """
+    return post_documents('VI', invoices, chunk_size=chunk_size)
+
+
+def post_company_drafts(document_type_code, company_id, date_from=None, date_to=None, chunk_size=500):
+    """
+    Post the drafts of one company. Runs in a pool process: companies
+    have their own sequences and balance rows, so postings of different
+    companies never wait for each other's locks.
+    Returns (company_id, documents posted, {pk: error message}).
+    """
+    close_old_connections()
+    try:
+        company = Company.objects.get(pk=company_id)
+        posted, errors = post_documents(
+            document_type_code,
+            draft_documents(document_type_code, company, date_from, date_to),
+            chunk_size=chunk_size
+        )
+    finally:
+        close_old_connections()
+    return company_id, posted, errors
@@ -1,3 +1,327 @@
+import datetime
+import io
+from unittest import mock
+
+from django.core.management import CommandError, call_command
 from django.test import TestCase
+from django.utils import timezone
+
+from apps.core.models import DocumentSequence, SystemSettings
+from apps.core.testing import create_company, create_fiscal_year, create_user, reset_caches
+from apps.finance.models import Account, AccountType, JournalEntry, JournalLine
+from apps.finance.services.balances import verify_account_balances
+from apps.finance.services.integrity import verify_ledger
+from apps.projects.models import Project, ProjectCostCenter
+
+from . import services
+from .models import GoodsReceipt, PurchaseOrder, PurchaseRequest, Vendor, VendorInvoice
+from .services import draft_documents, post_goods_receipts, post_vendor_invoices
+
+
+class ProcurementTestCase(TestCase):
+    """
+    A company with a vendor, a project and a cost center, and helpers
+    creating draft receipts and invoices.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.fiscal_year = create_company()
+
+        ap_account = Account.objects.create(
+            company=cls.company,
+            account_type=AccountType.objects.create(code='LIAB', name="Liability"),
+            code='2100',
+            name="Accounts Payable"
+        )
+        cls.vendor = Vendor.objects.create(
+            company=cls.company,
+            code='V1',
+            name="Vendor",
+            ap_account=ap_account
+        )
+        cls.project = Project.objects.create(
+            company=cls.company,
+            fiscal_year=cls.fiscal_year,
+            code='P1',
+            name="Tower",
+            start_date=datetime.date(2026, 1, 1)
+        )
+        cls.cost_center = ProjectCostCenter.objects.create(
+            project=cls.project,
+            code='CC1',
+            name="Civil"
+        )
+        cls.user = create_user('buyer')
+
+    def setUp(self):
+        reset_caches()
+
+    def _receipt(self, amount=100, receipt_date=datetime.date(2026, 3, 2)):
+        purchase_request = PurchaseRequest.objects.create(
+            company=self.company,
+            project=self.project,
+            cost_center=self.cost_center,
+            description="Steel",
+            requested_by=self.user,
+            status=PurchaseRequest.STATUS_APPROVED
+        )
+        purchase_order = PurchaseOrder.objects.create(
+            company=self.company,
+            purchase_request=purchase_request,
+            vendor=self.vendor,
+            order_date=datetime.date(2026, 3, 1),
+            total_amount=amount
+        )
+        return GoodsReceipt.objects.create(
+            company=self.company,
+            purchase_order=purchase_order,
+            amount=amount,
+            receipt_date=receipt_date
+        )
+
+    def _invoice(self, receipt):
+        return VendorInvoice.objects.create(
+            company=self.company,
+            vendor=self.vendor,
+            goods_receipt=receipt,
+            amount=receipt.amount,
+            invoice_date=datetime.date(2026, 3, 5)
+        )
+
+
+class AccountingTriggerTests(ProcurementTestCase):
+
+    def _set_trigger(self, trigger):
+        SystemSettings.objects.update_or_create(
+            company=self.company,
+            defaults={'accounting_trigger': trigger}
+        )
+
+    def _entries(self):
+        return JournalEntry.objects.filter(company=self.company).count()
+
+    def test_goods_receipt_posts_an_entry_only_when_the_trigger_asks(self):
+        self._set_trigger('VI')
+        receipt = self._receipt()
+        receipt.post()
+        self.assertEqual(receipt.status, GoodsReceipt.STATUS_POSTED)
+        self.assertEqual(self._entries(), 0)
+
+        self._set_trigger('GR')
+        self._receipt().post()
+        self.assertEqual(self._entries(), 1)
+
+    def test_vendor_invoice_posts_an_entry_only_when_the_trigger_asks(self):
+        self._set_trigger('GR')
+        receipt = self._receipt()
+        receipt.post()
+        self._invoice(receipt).post()
+        self.assertEqual(self._entries(), 1)
+
+        self._set_trigger('BOTH')
+        receipt = self._receipt()
+        receipt.post()
+        self._invoice(receipt).post()
+        self.assertEqual(self._entries(), 3)
+
+
+class PostingQueryBudgetTests(ProcurementTestCase):
+    """
+    Posting a receipt or an invoice loaded with for_posting() runs a
+    fixed number of queries. Raise the budgets only on purpose.
+    """
+
+    # Inside the test transaction: 2 savepoint statements per atomic
+    # block, plus the document update, the entry and line inserts, the
+    # two sequence queries, the fiscal year lock, the balance updates,
+    # the period seal insert and the ledger version update.
+    GOODS_RECEIPT_BUDGET = 15
+    VENDOR_INVOICE_BUDGET = 15
+
+    def test_goods_receipt_posting_budget(self):
+        # The first posting creates the balance and ledger version rows.
+        GoodsReceipt.objects.for_posting().get(pk=self._receipt().pk).post()
+
+        receipt = GoodsReceipt.objects.for_posting().get(pk=self._receipt().pk)
+        with self.assertNumQueries(self.GOODS_RECEIPT_BUDGET):
+            receipt.post()
+
+        self.assertEqual(receipt.status, GoodsReceipt.STATUS_POSTED)
+        self.assertEqual(receipt.document_number, "BURJ-GR-2026-000002")
+        self.assertEqual(
+            JournalLine.objects.filter(
+                journal_entry__document_number="BURJ-JE-2026-000002"
+            ).count(),
+            2
+        )
+
+    def test_vendor_invoice_posting_budget(self):
+        first, second = self._receipt(), self._receipt()
+        VendorInvoice.objects.for_posting().get(pk=self._invoice(first).pk).post()
+
+        invoice = VendorInvoice.objects.for_posting().get(pk=self._invoice(second).pk)
+        with self.assertNumQueries(self.VENDOR_INVOICE_BUDGET):
+            invoice.post()
+
+        self.assertEqual(invoice.status, VendorInvoice.STATUS_POSTED)
+        self.assertEqual(invoice.document_number, "BURJ-VI-2026-000002")
+        self.assertTrue(
+            JournalLine.objects.filter(
+                journal_entry__document_number="BURJ-JE-2026-000002",
+                is_posted=True
+            ).exists()
+        )
+
+
+class PostingSealTests(ProcurementTestCase):
+
+    def test_documents_dated_with_a_datetime_are_sealed_by_their_date(self):
+        # receipt_date and invoice_date default to timezone.now.
+        moment = datetime.datetime(2026, 3, 31, 23, 30, tzinfo=datetime.timezone.utc)
+        receipt = self._receipt(receipt_date=moment)
+        receipt.post()
+        invoice = self._invoice(receipt)
+        invoice.invoice_date = moment
+        invoice.post()
+
+        checksums = verify_ledger(self.company)
+        self.assertEqual(
+            [(checksum.period, checksum.line_count, checksum.problem) for checksum in checksums],
+            [(timezone.localdate(moment).month, 4, '')]
+        )
+
+
+class BulkPostingTests(ProcurementTestCase):
+
+    def _receipts(self, count):
+        return [
+            self._receipt(receipt_date=datetime.date(2026, 3, count - day))
+            for day in range(count)
+        ]
+
+    def _numbers(self, model):
+        return list(model.objects.order_by('document_number').values_list('document_number', flat=True))
+
+    def _last_number(self, code):
+        return DocumentSequence.objects.get(
+            company=self.company,
+            fiscal_year=self.fiscal_year,
+            document_type__code=code
+        ).last_number
+
+    def _fail_chunk(self, chunk):
+        """
+        Make the `chunk`-th chunk fail after its entries were written.
+        """
+        apply_journal_lines = services.apply_journal_lines
+        calls = []
+
+        def apply(lines):
+            calls.append(lines)
+            if len(calls) == chunk:
+                raise RuntimeError("disk full")
+            apply_journal_lines(lines)
+
+        return mock.patch.object(services, 'apply_journal_lines', apply)
+
+    def test_drafts_are_posted_in_chunks_in_date_order(self):
+        receipts = self._receipts(5)
+        progress = []
+
+        posted, errors = services.post_documents(
+            'GR',
+            draft_documents('GR', self.company),
+            chunk_size=2,
+            on_chunk=lambda posted, errors: progress.append((posted, dict(errors)))
+        )
+
+        self.assertEqual((posted, errors), (5, {}))
+        self.assertEqual(progress, [(2, {}), (4, {}), (5, {})])
+        self.assertEqual(
+            [GoodsReceipt.objects.get(pk=receipt.pk).document_number for receipt in reversed(receipts)],
+            [f"BURJ-GR-2026-00000{number}" for number in range(1, 6)]
+        )
+        self.assertEqual(JournalLine.objects.filter(company=self.company, is_posted=True).count(), 10)
+        self.assertEqual(verify_account_balances(self.company), [])
+
+    def test_invoices_are_posted_with_their_entries(self):
+        invoices = [self._invoice(receipt) for receipt in self._receipts(3)]
+
+        self.assertEqual(post_vendor_invoices(invoices, chunk_size=2), (3, {}))
+        self.assertEqual(self._numbers(VendorInvoice), [f"BURJ-VI-2026-00000{number}" for number in range(1, 4)])
+        self.assertEqual(self._numbers(JournalEntry), [f"BURJ-JE-2026-00000{number}" for number in range(1, 4)])
+
+    def test_documents_that_cannot_be_posted_are_reported_by_pk(self):
+        create_fiscal_year(self.company, 2025, is_active=False, is_closed=True)
+        posted_already = self._receipt()
+        posted_already.post()
+        last_year = self._receipt(receipt_date=datetime.date(2025, 12, 30))
+        draft = self._receipt()
+
+        self.assertEqual(
+            post_goods_receipts([posted_already, last_year, draft]),
+            (1, {
+                posted_already.pk: "Document is not a draft.",
+                last_year.pk: "Fiscal year 2025 is closed.",
+            })
+        )
+        self.assertEqual(
+            GoodsReceipt.objects.get(pk=draft.pk).document_number,
+            "BURJ-GR-2026-000002"
+        )
+
+    def test_failed_chunk_is_rolled_back_and_its_numbers_are_reused(self):
+        self._receipts(4)
+
+        with self._fail_chunk(2):
+            posted, errors = post_goods_receipts(draft_documents('GR', self.company), chunk_size=2)
+
+        self.assertEqual((posted, errors), (2, {None: "RuntimeError: disk full"}))
+        self.assertEqual((self._last_number('GR'), self._last_number('JE')), (2, 2))
+        self.assertEqual(draft_documents('GR', self.company).count(), 2)
+
+        self.assertEqual(post_goods_receipts(draft_documents('GR', self.company), chunk_size=2), (2, {}))
+        self.assertEqual(self._numbers(GoodsReceipt), [f"BURJ-GR-2026-00000{number}" for number in range(1, 5)])
+        self.assertEqual(self._numbers(JournalEntry), [f"BURJ-JE-2026-00000{number}" for number in range(1, 5)])
+        self.assertEqual(verify_account_balances(self.company), [])
+
+    def _command(self, *args):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        try:
+            call_command('post_goods_receipts', *args, stdout=stdout, stderr=stderr)
+        finally:
+            self.output = stdout.getvalue() + stderr.getvalue()
+
+    def test_command_posts_the_drafts_of_each_company(self):
+        self._command()
+        self.assertIn("No draft goods receipts to post.", self.output)
+
+        self._receipts(3)
+        self._command('--company', 'BURJ', '--chunk-size', '2', '--date-to', '2026-03-02')
+        self.assertIn("BURJ: 2 goods receipts posted", self.output)
+        self.assertEqual(draft_documents('GR', self.company).count(), 1)
+
+        with self.assertRaisesMessage(CommandError, "Unknown company NOPE."):
+            self._command('--company', 'NOPE')
+
+    def test_command_reports_what_was_posted_before_a_failure(self):
+        self._receipts(5)
+
+        with self._fail_chunk(2), self.assertRaisesMessage(CommandError, "3 goods receipts were not posted."):
+            self._command('--chunk-size', '2')
+
+        self.assertIn("BURJ: 2 goods receipts posted", self.output)
+        self.assertIn("  stopped: RuntimeError: disk full", self.output)
+        self.assertIn("Posted 2 goods receipts.", self.output)
+
+    def test_command_counts_drafts_that_could_not_be_posted(self):
+        create_fiscal_year(self.company, 2025, is_active=False, is_closed=True)
+        self._receipts(2)
+        self._receipt(receipt_date=datetime.date(2025, 12, 30))
+
+        with self.assertRaisesMessage(CommandError, "1 goods receipts were not posted."):
+            self._command()
 
-# Create your tests here.
+        self.assertIn("BURJ: 2 goods receipts posted", self.output)
+        self.assertIn("Fiscal year 2025 is closed.", self.output)
@@ -1,5 +1,5 @@
 from django.db import models
-from apps.core.models import Company, FiscalYear, TimeStampedModel
+from apps.core.models import Company, CompanyQuerySet, FiscalYear, TimeStampedModel
 
 
 class Project(TimeStampedModel):
@@ -46,6 +46,8 @@ class Project(TimeStampedModel):
 
     is_active = models.BooleanField(default=True)
 
+    objects = CompanyQuerySet.as_manager()
+
     class Meta:
         unique_together = ('company', 'code')
         ordering = ('code',)
@@ -54,6 +56,12 @@ class Project(TimeStampedModel):
 
     def __str__(self):
         return f"{self.code} - {self.name}"
+
+
+class ProjectCostCenterQuerySet(CompanyQuerySet):
+    company_field = 'project__company'
+
+
 class ProjectCostCenter(TimeStampedModel):
     """
     Work Breakdown Structure (WBS) / Cost Center within a project.
@@ -81,6 +89,8 @@ class ProjectCostCenter(TimeStampedModel):
     )
     is_active = models.BooleanField(default=True)
 
+    objects = ProjectCostCenterQuerySet.as_manager()
+
     class Meta:
         unique_together = ('project', 'code')
         ordering = ('code',)
@@ -1,3 +1,16 @@
 from .base import *
 
 DEBUG = False
+
+# Process caches are invalidated through the default cache, which must
+# be shared by every worker (see apps.core.checks). The database cache
+# needs no extra service; create its table with createcachetable.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.db.DatabaseCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION') or 'burj_cache',
+    }
+}